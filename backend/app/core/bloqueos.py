@@ -0,0 +1,115 @@
+"""
+Bloqueos cortos de horario mientras se cobra una reserva en línea.
+
+El checkout toma un bloqueo (cancha, intervalo) antes de llamar a Culqi: la
+verificación de solape y el alta del bloqueo van en una misma transacción,
+serializada por cancha con `SELECT ... FOR UPDATE` sobre la fila de la
+cancha, así que dos clientes que van por el mismo horario se resuelven antes
+del cobro lento y el segundo recibe 409 sin que se le cobre.
+
+El bloqueo se reemplaza por la reserva en la misma transacción que la crea
+(`promover`), se libera si el cobro falla y, si el proceso muere, deja de
+contar al vencer (`BLOQUEO_CHECKOUT_SECONDS`); `barrer` borra los vencidos.
+La disponibilidad pública y el alta manual del panel respetan los vigentes;
+el alta manual toma el mismo candado de la cancha (`serializar`) antes de
+verificar, hasta su commit.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.conexion import engine
+from app.modelos.modelos import BloqueoHorario, Cancha, Reserva
+
+logger = logging.getLogger("app.bloqueos")
+
+_tabla = BloqueoHorario.__table__
+
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def vigentes(cancha_id: int, start_at: datetime, end_at: datetime):
+    """Condiciones de los bloqueos vigentes que se cruzan con el intervalo."""
+    return (
+        BloqueoHorario.cancha_id == cancha_id,
+        BloqueoHorario.start_at < end_at,
+        BloqueoHorario.end_at > start_at,
+        BloqueoHorario.expira_at > _ahora(),
+    )
+
+
+def retenido(db: Session, cancha_id: int, start_at: datetime, end_at: datetime) -> bool:
+    return db.execute(select(BloqueoHorario.id).where(*vigentes(cancha_id, start_at, end_at)).limit(1)).first() is not None
+
+
+def serializar(db, cancha_id: int) -> None:
+    """
+    `SELECT ... FOR UPDATE` sobre la fila de la cancha, dentro de la transacción
+    de `db` (Session o Connection). Todo el que verifica solapes y escribe
+    reservas o bloqueos de una cancha lo toma primero, así el checkout y el
+    alta manual del panel no pueden pasar los dos la verificación a la vez.
+    """
+    db.execute(select(Cancha.id).where(Cancha.id == cancha_id).with_for_update())
+
+
+def tomar(cancha_id: int, start_at: datetime, end_at: datetime) -> int:
+    """Bloquea el horario o responde 409 si ya hay una reserva o un bloqueo vigente. Devuelve el id del bloqueo."""
+    ahora = _ahora()
+    with engine.begin() as conn:
+        # serializa por cancha: nadie más verifica ni bloquea esta cancha hasta el commit
+        serializar(conn, cancha_id)
+        solape = conn.execute(
+            select(Reserva.id)
+            .where(
+                Reserva.cancha_id == cancha_id,
+                Reserva.payment_status != "cancelada",
+                Reserva.start_at < end_at,
+                Reserva.end_at > start_at,
+            )
+            .limit(1)
+        ).first()
+        if solape:
+            raise HTTPException(status_code=409, detail="Ya existe una reserva en ese horario.")
+        if conn.execute(select(BloqueoHorario.id).where(*vigentes(cancha_id, start_at, end_at)).limit(1)).first():
+            raise HTTPException(status_code=409, detail="Otro cliente está pagando ese horario. Intenta en unos minutos.")
+        return conn.execute(
+            insert(_tabla)
+            .values(
+                cancha_id=cancha_id,
+                start_at=start_at,
+                end_at=end_at,
+                created_at=ahora,
+                expira_at=ahora + timedelta(seconds=settings.BLOQUEO_CHECKOUT_SECONDS),
+            )
+            .returning(_tabla.c.id)
+        ).scalar_one()
+
+
+def promover(db: Session, bloqueo_id: int) -> None:
+    """Quita el bloqueo dentro de la transacción de `db` que crea la reserva (ambos en el mismo commit)."""
+    db.execute(delete(_tabla).where(_tabla.c.id == bloqueo_id))
+
+
+def liberar(bloqueo_id: int) -> None:
+    try:
+        with engine.begin() as conn:
+            conn.execute(delete(_tabla).where(_tabla.c.id == bloqueo_id))
+    except Exception:
+        # vence solo; no tapar el error original del checkout
+        logger.exception("No se pudo liberar el bloqueo %s", bloqueo_id)
+
+
+def barrer() -> int:
+    """Tarea periódica: borra los bloqueos vencidos. Devuelve cuántos borró."""
+    with engine.begin() as conn:
+        res = conn.execute(delete(_tabla).where(_tabla.c.expira_at <= _ahora()))
+    return res.rowcount or 0
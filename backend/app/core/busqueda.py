@@ -0,0 +1,265 @@
+"""
+Búsqueda en proceso sobre el catálogo público (complejos y canchas).
+
+Los textos se normalizan con `normalizar_texto` (sin tildes ni mayúsculas) y se
+parten en palabras. El índice guarda:
+
+- palabra -> documentos (con el peso del campo donde aparece),
+- vocabulario ordenado, para prefijos/autocompletado con `bisect`,
+- trigrama -> palabras, para tolerar errores de tipeo (similitud de trigramas
+  al estilo pg_trgm).
+
+Cada término de la consulta debe encontrarse (exacto, prefijo o aproximado) en
+el documento; el puntaje suma peso del campo × calidad del match. Los postings
+de cada palabra están en el orden del ranking (peso desc., tipo, nombre), así
+que con un solo término basta con los `MAX_CANDIDATOS` primeros de cada palabra
+expandida para acotar la latencia con palabras muy comunes ("cancha"). Con
+varios términos no se corta: un documento fuera de ese corte puede coincidir
+en todos y quedar arriba, así que se recorren completos los postings del
+término más selectivo y los demás se verifican sobre ellos. `tipo` se filtra
+al recorrer los postings, antes de cualquier corte. Igual que el
+índice geográfico, se marca obsoleto con los cambios del catálogo y se
+reconstruye en la siguiente consulta.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import islice
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import catalogo
+from app.core.config import settings
+from app.core.slug import normalizar_texto
+from app.modelos.modelos import Cancha, Complejo
+
+PESOS_COMPLEJO = {"nombre": 3.0, "distrito": 2.0, "direccion": 1.0, "descripcion": 0.5}
+PESOS_CANCHA = {"nombre": 3.0, "complejo": 1.5, "distrito": 1.0}
+SIMILITUD_MINIMA = 0.4
+MAX_PREFIJOS = 20
+MAX_APROXIMADOS = 10
+# en consultas de un solo término, por palabra expandida se consideran a lo sumo estos documentos (los de mayor peso)
+MAX_CANDIDATOS = 1_000
+MAX_PALABRAS_TRIGRAMA = 5_000
+
+
+@dataclass(frozen=True, slots=True)
+class Documento:
+    tipo: str  # "complejo" | "cancha"
+    id: int
+    nombre: str
+    slug: str | None
+    complejo_id: int | None
+    distrito: str | None
+
+
+def trigramas(palabra: str) -> set[str]:
+    p = f"  {palabra} "
+    return {p[i : i + 3] for i in range(len(p) - 2)}
+
+
+class IndiceBusqueda:
+    def __init__(self):
+        self.docs: list[Documento] = []
+        self._pesos: dict[str, dict[int, float]] = defaultdict(dict)
+        # misma información ordenada por peso desc., para cortar temprano en palabras muy comunes
+        self._postings: dict[str, list[tuple[float, int]]] = {}
+        self._trigramas: dict[str, list[str]] = {}
+        self._vocabulario: list[str] = []
+
+    def agregar(self, doc: Documento, campos: dict[str, str | None], pesos: dict[str, float]) -> None:
+        idx = len(self.docs)
+        self.docs.append(doc)
+        for campo, texto in campos.items():
+            for palabra in normalizar_texto(texto or "").split():
+                actual = self._pesos[palabra].get(idx, 0.0)
+                self._pesos[palabra][idx] = max(actual, pesos[campo])
+
+    def cerrar(self) -> "IndiceBusqueda":
+        self._vocabulario = sorted(self._pesos)
+        trigramas_palabras: dict[str, list[str]] = defaultdict(list)
+        for palabra, docs in self._pesos.items():
+            # mismo orden que el ranking final, para que el corte de MAX_CANDIDATOS no cambie el resultado
+            self._postings[palabra] = sorted(
+                ((peso, idx) for idx, peso in docs.items()),
+                key=lambda x: (-x[0], self.docs[x[1]].tipo, self.docs[x[1]].nombre, x[1]),
+            )
+            for t in trigramas(palabra):
+                trigramas_palabras[t].append(palabra)
+        self._trigramas = dict(trigramas_palabras)
+        return self
+
+    # -------- expansión de términos --------
+    def _prefijos(self, termino: str, limite: int) -> list[str]:
+        i = bisect_left(self._vocabulario, termino)
+        out = []
+        while i < len(self._vocabulario) and len(out) < limite and self._vocabulario[i].startswith(termino):
+            out.append(self._vocabulario[i])
+            i += 1
+        return out
+
+    def _aproximados(self, termino: str) -> list[tuple[str, float]]:
+        tri = trigramas(termino)
+        # los candidatos salen de los trigramas menos frecuentes (los comunes no discriminan y solo
+        # cuestan); la similitud se calcula después con todos los trigramas
+        listas = sorted((self._trigramas.get(t, []) for t in tri), key=len)
+        raros = [l for l in listas if len(l) <= MAX_PALABRAS_TRIGRAMA] or listas[:2]
+        vistos: set[str] = set()
+        candidatos = []
+        for palabras in raros:
+            for palabra in palabras:
+                if palabra in vistos or abs(len(palabra) - len(termino)) > 2:
+                    continue
+                vistos.add(palabra)
+                otros = trigramas(palabra)
+                comunes = len(tri & otros)
+                sim = comunes / (len(tri) + len(otros) - comunes)
+                if sim >= SIMILITUD_MINIMA:
+                    candidatos.append((palabra, sim))
+        candidatos.sort(key=lambda x: -x[1])
+        return candidatos[:MAX_APROXIMADOS]
+
+    def _expandir(self, termino: str, *, difuso: bool) -> dict[str, float]:
+        """palabra del vocabulario -> calidad del match (1 exacto, 0.8 prefijo, sim*0.7 aproximado)."""
+        out: dict[str, float] = {}
+        if termino in self._pesos:
+            out[termino] = 1.0
+        for palabra in self._prefijos(termino, MAX_PREFIJOS):
+            out.setdefault(palabra, 0.8)
+        if difuso and not out and len(termino) >= 3:
+            for palabra, sim in self._aproximados(termino):
+                out[palabra] = sim * 0.7
+        return out
+
+    # -------- consultas --------
+    def buscar(self, consulta: str, *, tipo: str | None = None, limite: int = 20, difuso: bool = True) -> list[tuple[float, Documento]]:
+        terminos = normalizar_texto(consulta).split()
+        if not terminos:
+            return []
+        expansiones = [self._expandir(t, difuso=difuso) for t in terminos]
+        if not all(expansiones):
+            return []
+        # se empieza por el término más selectivo; los demás solo se verifican sobre sus candidatos
+        expansiones.sort(key=lambda e: sum(len(self._postings[p]) for p in e))
+
+        # con un término el top-`limite` está entre los primeros postings de cada palabra; con varios
+        # la intersección ya acota y cortar antes perdería documentos que coinciden en todos
+        tope = max(MAX_CANDIDATOS, limite) if len(expansiones) == 1 else None
+        puntajes: dict[int, float] = {}
+        for palabra, calidad in expansiones[0].items():
+            postings = self._postings[palabra]
+            if tipo is not None:
+                postings = (p for p in postings if self.docs[p[1]].tipo == tipo)
+            for peso, idx in islice(postings, tope):
+                valor = peso * calidad
+                if valor > puntajes.get(idx, 0.0):
+                    puntajes[idx] = valor
+
+        for expansion in expansiones[1:]:
+            siguientes: dict[int, float] = {}
+            for idx, acumulado in puntajes.items():
+                mejor = 0.0
+                for palabra, calidad in expansion.items():
+                    peso = self._pesos[palabra].get(idx)
+                    if peso is not None and peso * calidad > mejor:
+                        mejor = peso * calidad
+                if mejor:
+                    siguientes[idx] = acumulado + mejor
+            puntajes = siguientes
+            if not puntajes:
+                return []
+
+        resultados = [(score, self.docs[idx]) for idx, score in puntajes.items()]
+        return heapq.nsmallest(limite, resultados, key=lambda x: (-x[0], x[1].tipo, x[1].nombre))
+
+    def autocompletar(self, prefijo: str, limite: int = 10) -> list[Documento]:
+        # el último término es un prefijo a medio escribir; sin búsqueda aproximada para que sea inmediato
+        vistos: set[str] = set()
+        out: list[Documento] = []
+        for _, doc in self.buscar(prefijo, limite=limite * 3, difuso=False):
+            clave = f"{doc.tipo}:{doc.nombre}:{doc.complejo_id}"
+            if clave in vistos:
+                continue
+            vistos.add(clave)
+            out.append(doc)
+            if len(out) >= limite:
+                break
+        return out
+
+
+_indice: IndiceBusqueda | None = None
+_construido_en = 0.0
+_obsoleto = True
+_lock = asyncio.Lock()
+
+
+def _marcar_obsoleto(cambios: dict) -> None:
+    global _obsoleto
+    if cambios["todo"] or cambios["complejos"] or cambios["canchas"]:
+        _obsoleto = True
+
+
+catalogo.al_cambiar(_marcar_obsoleto)
+
+
+def _vigente() -> bool:
+    return (
+        _indice is not None
+        and not _obsoleto
+        and time.monotonic() - _construido_en < settings.BUSQUEDA_INDICE_TTL_SECONDS
+    )
+
+
+async def _cargar(db: AsyncSession) -> IndiceBusqueda:
+    idx = IndiceBusqueda()
+    complejos = await db.execute(
+        select(
+            Complejo.id,
+            Complejo.nombre,
+            Complejo.slug,
+            Complejo.descripcion,
+            Complejo.direccion,
+            Complejo.distrito,
+        ).where(Complejo.is_active == True)
+    )
+    for cid, nombre, slug, descripcion, direccion, distrito in complejos:
+        idx.agregar(
+            Documento("complejo", cid, nombre, slug, cid, distrito),
+            {"nombre": nombre, "distrito": distrito, "direccion": direccion, "descripcion": descripcion},
+            PESOS_COMPLEJO,
+        )
+    canchas = await db.execute(
+        select(Cancha.id, Cancha.nombre, Complejo.id, Complejo.nombre, Complejo.slug, Complejo.distrito)
+        .join(Complejo, Complejo.id == Cancha.complejo_id)
+        .where(Cancha.is_active == True, Complejo.is_active == True)
+    )
+    for cancha_id, nombre, cid, complejo_nombre, slug, distrito in canchas:
+        idx.agregar(
+            Documento("cancha", cancha_id, nombre, slug, cid, distrito),
+            {"nombre": nombre, "complejo": complejo_nombre, "distrito": distrito},
+            PESOS_CANCHA,
+        )
+    return idx.cerrar()
+
+
+async def indice(db: AsyncSession) -> IndiceBusqueda:
+    global _indice, _construido_en, _obsoleto
+    if _vigente():
+        return _indice
+    async with _lock:
+        if not _vigente():
+            _obsoleto = False
+            try:
+                _indice = await _cargar(db)
+            except Exception:
+                _obsoleto = True
+                raise
+            _construido_en = time.monotonic()
+    return _indice
@@ -0,0 +1,73 @@
+"""
+Cache LRU con TTL, en proceso y thread-safe.
+
+Pensado para valores pequeños y baratos de recalcular: cada worker tiene su
+propia copia, así que la invalidación explícita solo alcanza al worker que
+atendió la escritura y el TTL acota cuánto puede quedar desactualizado el resto.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+V = TypeVar("V")
+
+_FALTA = object()
+
+
+class CacheTTL(Generic[V]):
+    def __init__(self, max_items: int, ttl_s: float):
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self._datos: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave: Hashable, default=None):
+        ahora = time.monotonic()
+        with self._lock:
+            item = self._datos.get(clave, _FALTA)
+            if item is _FALTA:
+                return default
+            expira, valor = item
+            if expira <= ahora:
+                del self._datos[clave]
+                return default
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave: Hashable, valor: V) -> None:
+        if self.ttl_s <= 0 or self.max_items <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl_s, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave: Hashable) -> None:
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def invalidar_donde(self, predicado: Callable[[Hashable, V], bool]) -> int:
+        """Quita las entradas para las que `predicado(clave, valor)` es verdadero."""
+        with self._lock:
+            claves = [k for k, (_, v) in self._datos.items() if predicado(k, v)]
+            for k in claves:
+                del self._datos[k]
+        return len(claves)
+
+    def valores(self) -> list[V]:
+        """Copia de los valores vigentes (sin tocar el orden LRU)."""
+        ahora = time.monotonic()
+        with self._lock:
+            return [v for expira, v in self._datos.values() if expira > ahora]
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
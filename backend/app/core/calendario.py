@@ -0,0 +1,135 @@
+"""
+Feed del calendario del panel: reservas de un mes de un propietario.
+
+Cada mes tiene una versión barata de calcular (máximo `updated_at`, cantidad
+de reservas del mes y último cambio de las canchas involucradas) que se usa
+como ETag: el frontend consulta con `If-None-Match` y recibe 304 mientras
+nada cambie. El payload (compacto: filas en arrays y nombres de cancha una
+sola vez) se guarda en un LRU en proceso junto a su versión y se reutiliza
+mientras la versión siga igual, así una escritura lo invalida en todos los
+workers sin coordinación.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.cache import CacheTTL
+from app.core.config import settings
+from app.modelos.modelos import Cancha, Complejo, Reserva
+
+CAMPOS = ("id", "cancha_id", "start_at", "end_at", "payment_status", "payment_method", "total_amount", "paid_amount")
+
+_meses: CacheTTL[tuple[str, dict, bytes]] = CacheTTL(
+    max_items=settings.CALENDARIO_CACHE_MAX, ttl_s=settings.CALENDARIO_CACHE_TTL_SECONDS
+)
+
+
+def rango_mes(year: int, month: int) -> tuple[datetime, datetime]:
+    inicio = datetime(year, month, 1)
+    fin = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return inicio, fin
+
+
+def _del_mes(q, u, year: int, month: int):
+    """Mismo alcance que el resto del panel: canchas de complejos del propietario (admin ve todo)."""
+    inicio, fin = rango_mes(year, month)
+    q = q.join(Cancha, Reserva.cancha_id == Cancha.id)
+    if u.role != "admin":
+        q = q.join(Complejo, Cancha.complejo_id == Complejo.id).filter(Complejo.owner_id == u.id)
+    return q.filter(Reserva.start_at >= inicio, Reserva.start_at < fin)
+
+
+def version(db: Session, u, year: int, month: int) -> str:
+    q = db.query(func.max(Reserva.updated_at), func.count(Reserva.id), func.max(Cancha.updated_at))
+    ultimo, total, canchas = _del_mes(q, u, year, month).one()
+    base = f"{u.id}:{year}-{month:02d}:{ultimo and ultimo.isoformat()}:{total}:{canchas and canchas.isoformat()}"
+    return hashlib.sha1(base.encode()).hexdigest()[:20]
+
+
+def _construir(db: Session, u, year: int, month: int, ver: str) -> dict:
+    q = db.query(
+        Reserva.id,
+        Reserva.cancha_id,
+        Reserva.start_at,
+        Reserva.end_at,
+        Reserva.payment_status,
+        Reserva.payment_method,
+        Reserva.total_amount,
+        Reserva.paid_amount,
+        Cancha.nombre,
+    )
+    filas = []
+    canchas: dict[str, str] = {}
+    for rid, cid, start, end, status, method, total, paid, nombre in _del_mes(q, u, year, month).order_by(
+        Reserva.start_at.asc(), Reserva.id.asc()
+    ):
+        canchas[str(cid)] = nombre
+        filas.append(
+            [
+                int(rid),
+                int(cid),
+                start.isoformat(),
+                end.isoformat(),
+                status,
+                method,
+                float(total or 0),
+                float(paid or 0),
+            ]
+        )
+    return {"year": year, "month": month, "version": ver, "campos": list(CAMPOS), "canchas": canchas, "reservas": filas}
+
+
+def mes(db: Session, u, year: int, month: int, ver: str | None = None) -> tuple[dict, bytes]:
+    """Payload del mes y su JSON ya serializado; usa el cache si la versión guardada sigue vigente."""
+    ver = ver or version(db, u, year, month)
+    clave = (u.id, year, month)
+    guardado = _meses.get(clave)
+    if guardado is not None and guardado[0] == ver:
+        return guardado[1], guardado[2]
+    doc = _construir(db, u, year, month, ver)
+    cuerpo = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode()
+    _meses.set(clave, (ver, doc, cuerpo))
+    return doc, cuerpo
+
+
+# -------- iCalendar --------
+def _escapar(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fecha_ical(iso: str) -> str:
+    return datetime.fromisoformat(iso).strftime("%Y%m%dT%H%M%S")
+
+
+def a_ical(doc: dict) -> str:
+    """VCALENDAR con un VEVENT por reserva (horas locales de Lima, como se guardan)."""
+    ahora = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    lineas = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//MiFuturo//Calendario de reservas//ES",
+        "CALSCALE:GREGORIAN",
+        "X-WR-TIMEZONE:America/Lima",
+    ]
+    for rid, cid, start, end, status, method, total, paid in doc["reservas"]:
+        cancha = doc["canchas"].get(str(cid)) or f"Cancha {cid}"
+        metodo = method or "sin método"
+        lineas += [
+            "BEGIN:VEVENT",
+            f"UID:reserva-{rid}@mifuturo",
+            f"DTSTAMP:{ahora}",
+            f"DTSTART;TZID=America/Lima:{_fecha_ical(start)}",
+            f"DTEND;TZID=America/Lima:{_fecha_ical(end)}",
+            f"SUMMARY:{_escapar(f'{cancha} ({status})')}",
+            f"DESCRIPTION:{_escapar(f'Total S/ {total:.2f} - pagado S/ {paid:.2f} - {metodo}')}",
+            "STATUS:CANCELLED" if status == "cancelada" else "STATUS:CONFIRMED",
+            "END:VEVENT",
+        ]
+    lineas.append("END:VCALENDAR")
+    return "\r\n".join(lineas) + "\r\n"
@@ -0,0 +1,195 @@
+"""
+Documentos precalculados del perfil público de complejos (`/public/complejos/{slug}`).
+
+El documento por slug (complejo, imágenes ordenadas, canchas activas, contador
+de likes y llave pública de Culqi) se guarda ya serializado en un LRU en
+proceso. Se invalida solo: los listeners de sesión anotan en cada flush qué
+complejos, canchas o propietarios cambiaron y al hacer commit se descartan
+los documentos afectados. Así cualquier ruta que escriba con el ORM (panel,
+admin, perfil, integración Culqi) mantiene el cache al día sin llamadas
+explícitas. Los UPDATE/DELETE masivos sobre esas entidades vacían el cache
+completo, salvo que se marquen con `SIN_INVALIDAR` y se notifiquen a mano
+(p. ej. el contador de likes).
+
+Con réplica de lectura, un documento reconstruido dentro de
+`READ_AFTER_WRITE_SECONDS` tras una invalidación se sirve pero no se guarda,
+para no fijar en cache una lectura atrasada.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from itertools import chain
+from typing import Callable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.cache import CacheTTL
+from app.core.config import settings
+from app.db.conexion import replica_configurada
+from app.modelos.modelos import Cancha, CanchaImagen, Complejo, ComplejoImagen, PaymentIntegration, User
+
+logger = logging.getLogger("app.catalogo")
+
+# execution_options para UPDATE/DELETE masivos que notifican sus cambios por su cuenta
+SIN_INVALIDAR = {"catalogo_sin_invalidar": True}
+
+_ENTIDADES = (Complejo, Cancha, CanchaImagen, ComplejoImagen, PaymentIntegration, User)
+_CLAVE_INFO = "catalogo_cambios"
+_MAX_MARCAS = 10_000
+
+_oyentes: list[Callable[[dict], None]] = []
+_perfiles: CacheTTL[dict] = CacheTTL(max_items=settings.PERFIL_CACHE_MAX, ttl_s=settings.PERFIL_CACHE_TTL_SECONDS)
+_invalidado_en: dict[int, float] = {}
+_lock = threading.Lock()
+
+
+# -------- lectura / escritura del cache --------
+def obtener_perfil(slug: str) -> dict | None:
+    return _perfiles.get(slug)
+
+
+def guardar_perfil(doc: dict) -> None:
+    if replica_configurada():
+        with _lock:
+            marca = _invalidado_en.get(doc["id"])
+        if marca is not None and time.monotonic() - marca < settings.READ_AFTER_WRITE_SECONDS:
+            return
+    _perfiles.set(doc["slug"], doc)
+
+
+def actualizar_likes(complejo_id: int, likes_count: int) -> None:
+    """El toggle de likes no reconstruye el documento: solo ajusta el contador."""
+    for doc in _perfiles.valores():
+        if doc["id"] == complejo_id:
+            doc["likes_count"] = likes_count
+
+
+def _marcar(complejo_ids: set[int]) -> None:
+    if not replica_configurada() or not complejo_ids:
+        return
+    ahora = time.monotonic()
+    with _lock:
+        if len(_invalidado_en) > _MAX_MARCAS:
+            limite = ahora - settings.READ_AFTER_WRITE_SECONDS
+            for cid in [k for k, t in _invalidado_en.items() if t < limite]:
+                del _invalidado_en[cid]
+        for cid in complejo_ids:
+            _invalidado_en[cid] = ahora
+
+
+def invalidar(complejos: set[int] = frozenset(), canchas: set[int] = frozenset(), owners: set[int] = frozenset()) -> int:
+    if not (complejos or canchas or owners):
+        return 0
+
+    afectados = set(complejos)
+
+    def _afectado(_slug, doc) -> bool:
+        if (
+            doc["id"] in complejos
+            or doc.get("owner_id") in owners
+            or any(cx["id"] in canchas for cx in doc.get("canchas") or [])
+        ):
+            afectados.add(doc["id"])
+            return True
+        return False
+
+    quitados = _perfiles.invalidar_donde(_afectado)
+    _marcar(afectados)
+    return quitados
+
+
+def invalidar_todo() -> None:
+    _perfiles.limpiar()
+
+
+def cambio_masivo() -> None:
+    """Para escrituras que no pasan por el ORM (COPY, SQL crudo): vacía el cache y avisa a los oyentes."""
+    invalidar_todo()
+    _notificar({"complejos": set(), "canchas": set(), "owners": set(), "todo": True})
+
+
+def al_cambiar(oyente: Callable[[dict], None]) -> None:
+    """Registra un oyente que recibe los cambios confirmados:
+    `{"complejos": set, "canchas": set, "owners": set, "todo": bool}`.
+    Otros índices en memoria (geo, búsqueda) lo usan para marcarse como obsoletos."""
+    _oyentes.append(oyente)
+
+
+def _notificar(cambios: dict) -> None:
+    for oyente in _oyentes:
+        try:
+            oyente(cambios)
+        except Exception:
+            logger.exception("Oyente de catálogo falló")
+
+
+# -------- notificación de cambios desde la sesión --------
+def _cambios(session: Session) -> dict:
+    return session.info.setdefault(
+        _CLAVE_INFO, {"complejos": set(), "canchas": set(), "owners": set(), "todo": False}
+    )
+
+
+def _valor_previo(obj, attr: str):
+    hist = inspect(obj).attrs[attr].history
+    return hist.deleted[0] if hist.deleted else None
+
+
+@event.listens_for(Session, "after_flush")
+def _recolectar(session: Session, flush_context) -> None:
+    # en after_flush new/dirty/deleted y el historial siguen con el estado previo, y los ids ya existen
+    cambios = None
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, _ENTIDADES):
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        cambios = cambios or _cambios(session)
+        if isinstance(obj, Complejo):
+            cambios["complejos"].add(obj.id)
+        elif isinstance(obj, Cancha):
+            cambios["canchas"].add(obj.id)
+            for cid in (obj.complejo_id, _valor_previo(obj, "complejo_id")):
+                if cid is not None:
+                    cambios["complejos"].add(cid)
+        elif isinstance(obj, CanchaImagen):
+            cambios["canchas"].add(obj.cancha_id)
+        elif isinstance(obj, ComplejoImagen):
+            cambios["complejos"].add(obj.complejo_id)
+        elif isinstance(obj, PaymentIntegration):
+            cambios["owners"].add(obj.user_id)
+        elif isinstance(obj, User):
+            cambios["owners"].add(obj.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _masivos(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get("catalogo_sin_invalidar"):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _ENTIDADES:
+        _cambios(orm_execute_state.session)["todo"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar(session: Session) -> None:
+    cambios = session.info.pop(_CLAVE_INFO, None)
+    if not cambios:
+        return
+    if cambios["todo"]:
+        invalidar_todo()
+    else:
+        invalidar(cambios["complejos"], cambios["canchas"], cambios["owners"])
+    _notificar(cambios)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_CLAVE_INFO, None)
@@ -0,0 +1,104 @@
+"""
+Circuit breaker en proceso para dependencias externas (Culqi).
+
+- cerrado: las llamadas pasan; `fallos` fallos seguidos (red, timeout o 5xx)
+  lo abren.
+- abierto: las llamadas se rechazan sin intentar (`CircuitoAbierto`) durante
+  `enfriamiento_s`, así un Culqi caído o lento no deja a los workers colgados
+  en timeouts.
+- semiabierto: pasado el enfriamiento se deja pasar una sola sonda a la vez;
+  si sale bien se cierra, si falla vuelve a abrirse otro enfriamiento.
+
+Cada worker tiene su propio estado (se abre con sus propios fallos). Estado,
+aperturas y rechazos se exportan en /metrics.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from app.core import metricas
+from app.core.config import settings
+
+logger = logging.getLogger("app.circuito")
+
+CERRADO, SEMIABIERTO, ABIERTO = "cerrado", "semiabierto", "abierto"
+_VALOR_ESTADO = {CERRADO: 0, SEMIABIERTO: 1, ABIERTO: 2}
+
+
+class CircuitoAbierto(Exception):
+    def __init__(self, nombre: str, reintentar_en_s: float):
+        super().__init__(f"circuito {nombre} abierto")
+        self.reintentar_en_s = reintentar_en_s
+
+
+class Circuito:
+    def __init__(self, nombre: str, fallos: int, enfriamiento_s: float):
+        self.nombre = nombre
+        self.fallos = fallos
+        self.enfriamiento_s = enfriamiento_s
+        self._estado = CERRADO
+        self._fallos_seguidos = 0
+        self._abierto_desde = 0.0
+        self._sonda_en_curso = False
+        self._lock = threading.Lock()
+        metricas.CIRCUITO_ESTADO.labels(nombre).set(0)
+
+    @property
+    def estado(self) -> str:
+        return self._estado
+
+    def _cambiar(self, estado: str) -> None:
+        if estado != self._estado:
+            logger.warning("Circuito %s: %s -> %s", self.nombre, self._estado, estado)
+        self._estado = estado
+        metricas.CIRCUITO_ESTADO.labels(self.nombre).set(_VALOR_ESTADO[estado])
+
+    def permitir(self, operacion: str = "") -> None:
+        """Deja pasar la llamada o lanza `CircuitoAbierto`; toda llamada permitida debe cerrar con exito()/fallo()."""
+        if self.fallos <= 0:
+            return
+        with self._lock:
+            if self._estado == CERRADO:
+                return
+            restante = self._abierto_desde + self.enfriamiento_s - time.monotonic()
+            if self._estado == ABIERTO and restante <= 0:
+                self._cambiar(SEMIABIERTO)
+            if self._estado == SEMIABIERTO and not self._sonda_en_curso:
+                self._sonda_en_curso = True
+                return
+        metricas.CIRCUITO_RECHAZOS.labels(self.nombre, operacion).inc()
+        raise CircuitoAbierto(self.nombre, max(restante, 1.0))
+
+    def exito(self) -> None:
+        with self._lock:
+            self._fallos_seguidos = 0
+            self._sonda_en_curso = False
+            if self._estado != CERRADO:
+                self._cambiar(CERRADO)
+
+    def fallo(self) -> None:
+        with self._lock:
+            self._fallos_seguidos += 1
+            sonda_fallida = self._estado == SEMIABIERTO
+            self._sonda_en_curso = False
+            if sonda_fallida or (self._estado == CERRADO and self.fallos > 0 and self._fallos_seguidos >= self.fallos):
+                self._abierto_desde = time.monotonic()
+                self._cambiar(ABIERTO)
+                metricas.CIRCUITO_APERTURAS.labels(self.nombre).inc()
+
+
+culqi = Circuito("culqi", fallos=settings.CULQI_CIRCUITO_FALLOS, enfriamiento_s=settings.CULQI_CIRCUITO_ENFRIAMIENTO_SECONDS)
+
+
+def presupuesto_culqi(method: str, operacion: str) -> tuple[float, float]:
+    """Timeout (conexión, lectura) por operación: el cobro espera más que una consulta."""
+    if method == "GET":
+        lectura = settings.CULQI_TIMEOUT_CONSULTA_SECONDS
+    elif operacion.startswith("/v2/charges"):
+        lectura = settings.CULQI_TIMEOUT_COBRO_SECONDS
+    else:
+        lectura = settings.CULQI_TIMEOUT_GESTION_SECONDS
+    return settings.CULQI_TIMEOUT_CONEXION_SECONDS, lectura
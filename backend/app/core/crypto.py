@@ -1,22 +1,52 @@
-from cryptography.fernet import Fernet, InvalidToken
+"""
+Cifrado de secretos guardados en BD (p. ej. `payment_integrations.culqi_sk_enc`).
+
+El cifrador se arma una sola vez por juego de claves: `DATA_ENCRYPTION_KEY` es
+la clave vigente (con la que se cifra) y `DATA_ENCRYPTION_KEYS_ANTERIORES`
+(separadas por coma) solo sirven para descifrar lo que aún no se re-cifró.
+Para rotar: se pone la clave nueva como vigente, la vieja en anteriores, y
+`app.core.secretos.reencriptar` pasa los tokens a la nueva.
+"""
+
+import threading
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 
 from app.core.config import settings
 
+_lock = threading.Lock()
+_cifrador: tuple[tuple[str, ...], Fernet, MultiFernet] | None = None
+
 
-def _get_fernet() -> Fernet:
-    key = (settings.DATA_ENCRYPTION_KEY or "").strip()
-    if not key:
+def _claves() -> tuple[str, ...]:
+    vigente = (settings.DATA_ENCRYPTION_KEY or "").strip()
+    if not vigente:
         raise ValueError("DATA_ENCRYPTION_KEY no configurada")
-    try:
-        return Fernet(key.encode("utf-8"))
-    except Exception as exc:
-        raise ValueError("DATA_ENCRYPTION_KEY invalida") from exc
+    anteriores = [k.strip() for k in (settings.DATA_ENCRYPTION_KEYS_ANTERIORES or "").split(",") if k.strip()]
+    return (vigente, *[k for k in anteriores if k != vigente])
+
+
+def _get_fernet() -> tuple[Fernet, MultiFernet]:
+    """(Fernet de la clave vigente, MultiFernet con todas); se reconstruye solo si cambian las claves."""
+    global _cifrador
+    claves = _claves()
+    actual = _cifrador
+    if actual is not None and actual[0] == claves:
+        return actual[1], actual[2]
+    with _lock:
+        if _cifrador is None or _cifrador[0] != claves:
+            try:
+                fernets = [Fernet(k.encode("utf-8")) for k in claves]
+            except Exception as exc:
+                raise ValueError("DATA_ENCRYPTION_KEY invalida") from exc
+            _cifrador = (claves, fernets[0], MultiFernet(fernets))
+        return _cifrador[1], _cifrador[2]
 
 
 def encrypt_secret(value: str) -> str:
     if value is None:
         raise ValueError("valor invalido")
-    token = _get_fernet().encrypt(value.encode("utf-8"))
+    token = _get_fernet()[1].encrypt(value.encode("utf-8"))
     return token.decode("utf-8")
 
 
@@ -24,7 +54,24 @@ def decrypt_secret(token: str) -> str:
     if not token:
         raise ValueError("token invalido")
     try:
-        value = _get_fernet().decrypt(token.encode("utf-8"))
+        value = _get_fernet()[1].decrypt(token.encode("utf-8"))
     except InvalidToken as exc:
         raise ValueError("token invalido") from exc
     return value.decode("utf-8")
+
+
+def necesita_rotacion(token: str) -> bool:
+    """True si el token no está cifrado con la clave vigente."""
+    try:
+        _get_fernet()[0].decrypt(token.encode("utf-8"))
+    except InvalidToken:
+        return True
+    return False
+
+
+def rotar_token(token: str) -> str:
+    """Re-cifra con la clave vigente un token cifrado con cualquiera de las claves configuradas."""
+    try:
+        return _get_fernet()[1].rotate(token.encode("utf-8")).decode("utf-8")
+    except InvalidToken as exc:
+        raise ValueError("token invalido") from exc
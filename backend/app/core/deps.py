@@ -1,8 +1,15 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
-from app.db.conexion import SessionLocal
+from app.core.config import settings
+from app.db.conexion import (
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+    escritura_reciente,
+)
 from app.core.seguridad import decodificar_token
 from app.modelos.modelos import User
 
@@ -17,6 +24,69 @@ def get_db():
         db.close()
 
 
+def ip_cliente(request: Request) -> str:
+    # Detrás del proxy de Next/Render la IP real llega en X-Forwarded-For
+    forwarded = request.headers.get("x-forwarded-for") or ""
+    primera = forwarded.split(",", 1)[0].strip()
+    if primera:
+        return primera
+    return request.client.host if request.client else ""
+
+
+def ip_confiable(request: Request) -> str:
+    """
+    IP del cliente para los límites de tasa: no se puede falsificar desde el
+    cliente. Cada proxy propio agrega al final de X-Forwarded-For la dirección
+    de la que recibió la conexión, así que se toma la entrada que está
+    TRUSTED_PROXY_HOPS posiciones desde la derecha; lo que haya a su izquierda
+    lo escribió el cliente. Con 0 (o sin la cabecera) se usa la dirección de
+    la conexión, p. ej. detrás de uvicorn con `--proxy-headers`.
+    """
+    saltos = settings.TRUSTED_PROXY_HOPS
+    if saltos > 0:
+        entradas = [e.strip() for e in (request.headers.get("x-forwarded-for") or "").split(",") if e.strip()]
+        if len(entradas) >= saltos:
+            return entradas[-saltos]
+    return request.client.host if request.client else ""
+
+
+def clave_cliente(request: Request) -> str:
+    """
+    Identifica al cliente para la guardia read-your-writes: el token si viene
+    autenticado, si no la IP.
+    """
+    auth = request.headers.get("authorization") or ""
+    if auth:
+        return f"auth:{auth}"
+    ip = ip_cliente(request)
+    return f"ip:{ip}" if ip else ""
+
+
+def get_read_db(request: Request):
+    """
+    Sesión para endpoints de solo lectura: usa la réplica salvo que el cliente
+    haya escrito hace menos de READ_AFTER_WRITE_SECONDS (lag de replicación).
+    """
+    fabrica = SessionLocal if escritura_reciente(clave_cliente(request)) else ReadSessionLocal
+    db = fabrica()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    # Igual que get_read_db, pero para los endpoints async (catálogo/disponibilidad)
+    fabrica = AsyncSessionLocal if escritura_reciente(clave_cliente(request)) else AsyncReadSessionLocal
+    async with fabrica() as db:
+        yield db
+
+
 def get_usuario_actual(token: str = Depends(oauth2), db: Session = Depends(get_db)) -> User:
     try:
         data = decodificar_token(token)
@@ -0,0 +1,317 @@
+"""
+Estadísticas de ocupación e ingresos para propietarios PRO.
+
+Las consultas no recorren `reservas`: leen `estadisticas_diarias`, un rollup
+por (cancha, día) con reservas, canceladas, minutos, montos y minutos por
+hora del día. Cada fila se recalcula completa a partir de las reservas de ese
+día de esa cancha (pocas filas, por el índice cancha_id+start_at):
+
+- al confirmar cada sesión, para los días que tocan las reservas creadas,
+  modificadas o borradas (valores nuevos y previos). Va en su propia
+  transacción después del commit: un fallo de las estadísticas nunca revierte
+  la reserva (queda logueado y lo corrige la reconciliación),
+- en la tarea periódica `reconciliar`, para los días con reservas cambiadas
+  fuera del ORM desde la pasada anterior,
+- y a mano con `python -m app.scripts.recalcular_estadisticas` (backfill).
+
+Los recálculos de una misma cancha se serializan con `SELECT ... FOR UPDATE`
+sobre su fila (igual que `bloqueos.tomar`) y escriben con upsert, así dos
+reservas simultáneas no chocan en la PK ni dejan un rollup calculado antes
+del commit de la otra.
+
+Una reserva cuenta entera en el día en que empieza. Los borrados hechos
+fuera del ORM solo se corrigen con el script.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import delete, event, inspect, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.conexion import engine
+from app.modelos.modelos import Cancha, Complejo, EstadisticaDiaria, Reserva
+from app.utils.time import HORA_APERTURA, HORA_CIERRE
+
+logger = logging.getLogger("app.estadisticas")
+
+HORAS_OPERACION = HORA_CIERRE - HORA_APERTURA
+LOTE = 1_000
+
+_marca_reconciliacion: datetime | None = None
+
+
+# -------- cálculo del rollup --------
+def _fila_vacia(cancha_id: int, fecha: date) -> dict:
+    return {
+        "cancha_id": cancha_id,
+        "fecha": fecha,
+        "reservas": 0,
+        "canceladas": 0,
+        "minutos": 0,
+        "monto_total": Decimal("0"),
+        "monto_pagado": Decimal("0"),
+        "minutos_por_hora": [0] * 24,
+    }
+
+
+def _acumular(fila: dict, start_at: datetime, end_at: datetime, total, pagado, estado: str) -> None:
+    if estado == "cancelada":
+        fila["canceladas"] += 1
+        return
+    fila["reservas"] += 1
+    fila["monto_total"] += Decimal(total or 0)
+    fila["monto_pagado"] += Decimal(pagado or 0)
+    # reparte los minutos por hora del reloj (lo que pasa de medianoche cae en las primeras horas)
+    actual = start_at
+    while actual < end_at:
+        corte = min(end_at, actual.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+        minutos = int((corte - actual).total_seconds() // 60)
+        fila["minutos_por_hora"][actual.hour] += minutos
+        fila["minutos"] += minutos
+        actual = corte
+
+
+def calcular(filas_reservas: Iterable) -> dict[tuple[int, date], dict]:
+    out: dict[tuple[int, date], dict] = {}
+    for cancha_id, start_at, end_at, total, pagado, estado in filas_reservas:
+        clave = (cancha_id, start_at.date())
+        fila = out.get(clave)
+        if fila is None:
+            fila = out[clave] = _fila_vacia(*clave)
+        _acumular(fila, start_at, end_at, total, pagado, estado)
+    return out
+
+
+COLUMNAS_RESERVA = (
+    Reserva.cancha_id,
+    Reserva.start_at,
+    Reserva.end_at,
+    Reserva.total_amount,
+    Reserva.paid_amount,
+    Reserva.payment_status,
+)
+
+
+def recalcular_dias(conn, dias: Iterable[tuple[int, date]]) -> int:
+    """Reescribe los rollups de los (cancha_id, fecha) indicados. Devuelve filas escritas."""
+    por_cancha: dict[int, set[date]] = defaultdict(set)
+    for cancha_id, fecha in dias:
+        if cancha_id is not None and fecha is not None:
+            por_cancha[cancha_id].add(fecha)
+
+    tabla = EstadisticaDiaria.__table__
+    escritas = 0
+    for cancha_id in sorted(por_cancha):
+        fechas = por_cancha[cancha_id]
+        # un recálculo a la vez por cancha: el siguiente lee las reservas ya confirmadas por este
+        conn.execute(select(Cancha.id).where(Cancha.id == cancha_id).with_for_update())
+        desde, hasta = min(fechas), max(fechas) + timedelta(days=1)
+        filas = conn.execute(
+            select(*COLUMNAS_RESERVA).where(
+                Reserva.cancha_id == cancha_id,
+                Reserva.start_at >= datetime.combine(desde, datetime.min.time()),
+                Reserva.start_at < datetime.combine(hasta, datetime.min.time()),
+            )
+        ).all()
+        nuevas = [f for (cid, fecha), f in calcular(filas).items() if fecha in fechas]
+        vacias = fechas - {f["fecha"] for f in nuevas}
+        if vacias:
+            conn.execute(delete(tabla).where(tabla.c.cancha_id == cancha_id, tabla.c.fecha.in_(vacias)))
+        if nuevas:
+            stmt = pg_insert(tabla)
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[tabla.c.cancha_id, tabla.c.fecha],
+                    set_={c.name: stmt.excluded[c.name] for c in tabla.c if not c.primary_key},
+                ),
+                nuevas,
+            )
+            escritas += len(nuevas)
+    return escritas
+
+
+def recalcular_rango(desde: date | None = None, hasta: date | None = None) -> int:
+    """Backfill: reconstruye todos los rollups entre `desde` y `hasta` (inclusive) en lotes."""
+    tabla = EstadisticaDiaria.__table__
+    condiciones, borrar = [], []
+    if desde:
+        condiciones.append(Reserva.start_at >= datetime.combine(desde, datetime.min.time()))
+        borrar.append(tabla.c.fecha >= desde)
+    if hasta:
+        condiciones.append(Reserva.start_at < datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+        borrar.append(tabla.c.fecha <= hasta)
+
+    escritas = 0
+    with engine.begin() as conn:
+        conn.execute(delete(tabla).where(*borrar))
+        filas = conn.execution_options(yield_per=5_000).execute(
+            select(*COLUMNAS_RESERVA).where(*condiciones).order_by(Reserva.cancha_id, Reserva.start_at)
+        )
+        pendientes: dict[tuple[int, date], dict] = {}
+        for cancha_id, start_at, end_at, total, pagado, estado in filas:
+            clave = (cancha_id, start_at.date())
+            if clave not in pendientes and len(pendientes) >= LOTE:
+                # filas ordenadas por cancha y fecha: las ya acumuladas están completas
+                conn.execute(insert(tabla), list(pendientes.values()))
+                escritas += len(pendientes)
+                pendientes = {}
+            fila = pendientes.get(clave)
+            if fila is None:
+                fila = pendientes[clave] = _fila_vacia(*clave)
+            _acumular(fila, start_at, end_at, total, pagado, estado)
+        if pendientes:
+            conn.execute(insert(tabla), list(pendientes.values()))
+            escritas += len(pendientes)
+    return escritas
+
+
+def reconciliar(ventana_inicial: timedelta = timedelta(hours=2)) -> int:
+    """Tarea periódica: recalcula los días con reservas cambiadas desde la pasada anterior."""
+    global _marca_reconciliacion
+    ahora = datetime.now(timezone.utc)
+    # con un margen: updated_at lo pone el reloj de la base, no el del worker
+    desde = (_marca_reconciliacion - timedelta(minutes=1)) if _marca_reconciliacion else ahora - ventana_inicial
+    with engine.begin() as conn:
+        dias = {
+            (cancha_id, start_at.date())
+            for cancha_id, start_at in conn.execute(
+                select(Reserva.cancha_id, Reserva.start_at).where(Reserva.updated_at >= desde)
+            )
+        }
+        escritas = recalcular_dias(conn, dias)
+    _marca_reconciliacion = ahora
+    if escritas:
+        logger.info("Estadísticas reconciliadas: %s días", escritas)
+    return escritas
+
+
+# -------- sincronización desde la sesión --------
+def _dia(start_at) -> date | None:
+    return start_at.date() if isinstance(start_at, datetime) else None
+
+
+def _previo(obj, attr: str):
+    hist = inspect(obj).attrs[attr].history
+    return hist.deleted[0] if hist.deleted else getattr(obj, attr)
+
+
+_CLAVE_INFO = "estadisticas_dias"
+
+
+@event.listens_for(Session, "after_flush")
+def _recolectar(session: Session, flush_context) -> None:
+    dias: set[tuple[int, date]] = set()
+    for obj in session.new:
+        if isinstance(obj, Reserva):
+            dias.add((obj.cancha_id, _dia(obj.start_at)))
+    for obj in session.dirty:
+        if isinstance(obj, Reserva) and session.is_modified(obj, include_collections=False):
+            dias.add((obj.cancha_id, _dia(obj.start_at)))
+            dias.add((_previo(obj, "cancha_id"), _dia(_previo(obj, "start_at"))))
+    for obj in session.deleted:
+        if isinstance(obj, Reserva):
+            dias.add((obj.cancha_id, _dia(obj.start_at)))
+    if dias:
+        session.info.setdefault(_CLAVE_INFO, set()).update(dias)
+
+
+@event.listens_for(Session, "after_commit")
+def _sincronizar(session: Session) -> None:
+    dias = session.info.pop(_CLAVE_INFO, None)
+    if not dias:
+        return
+    try:
+        with engine.begin() as conn:
+            recalcular_dias(conn, dias)
+    except Exception:
+        # la reserva ya está confirmada; `reconciliar` rehace estos días en su próxima pasada
+        logger.exception("No se pudieron recalcular las estadísticas de %s días", len(dias))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_CLAVE_INFO, None)
+
+
+# -------- consultas --------
+def canchas_del_propietario(db: Session, u, complejo_id: int | None = None, cancha_id: int | None = None) -> dict[int, str]:
+    q = db.query(Cancha.id, Cancha.nombre).join(Complejo, Cancha.complejo_id == Complejo.id)
+    if u.role != "admin":
+        q = q.filter(Complejo.owner_id == u.id)
+    if complejo_id is not None:
+        q = q.filter(Complejo.id == complejo_id)
+    if cancha_id is not None:
+        q = q.filter(Cancha.id == cancha_id)
+    return {int(cid): nombre for cid, nombre in q.all()}
+
+
+def _totales(reservas: int, canceladas: int, minutos: int, monto_total: Decimal, monto_pagado: Decimal, capacidad_h: float) -> dict:
+    horas = minutos / 60
+    return {
+        "reservas": reservas,
+        "canceladas": canceladas,
+        "tasa_cancelacion": round(canceladas / (reservas + canceladas), 4) if reservas + canceladas else 0.0,
+        "horas_reservadas": round(horas, 2),
+        "ocupacion": round(horas / capacidad_h, 4) if capacidad_h else 0.0,
+        "monto_total": float(monto_total),
+        "monto_pagado": float(monto_pagado),
+        "monto_pendiente": float(monto_total - monto_pagado),
+    }
+
+
+def consultar(db: Session, canchas: dict[int, str], desde: date, hasta: date) -> dict:
+    """Resumen del rango sobre los rollups: totales, por cancha, por día y mapa de calor día-semana × hora."""
+    dias = (hasta - desde).days + 1
+    filas = (
+        db.query(EstadisticaDiaria)
+        .filter(
+            EstadisticaDiaria.cancha_id.in_(list(canchas)),
+            EstadisticaDiaria.fecha >= desde,
+            EstadisticaDiaria.fecha <= hasta,
+        )
+        .all()
+        if canchas
+        else []
+    )
+
+    def _acumulador():
+        return {"reservas": 0, "canceladas": 0, "minutos": 0, "monto_total": Decimal("0"), "monto_pagado": Decimal("0")}
+
+    total = _acumulador()
+    por_cancha = defaultdict(_acumulador)
+    por_dia = defaultdict(_acumulador)
+    mapa = [[0] * 24 for _ in range(7)]
+    for f in filas:
+        for acc in (total, por_cancha[f.cancha_id], por_dia[f.fecha]):
+            acc["reservas"] += f.reservas
+            acc["canceladas"] += f.canceladas
+            acc["minutos"] += f.minutos
+            acc["monto_total"] += f.monto_total
+            acc["monto_pagado"] += f.monto_pagado
+        fila_mapa = mapa[f.fecha.weekday()]
+        for hora, minutos in enumerate(f.minutos_por_hora or ()):
+            fila_mapa[hora] += minutos
+
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "totales": _totales(**total, capacidad_h=len(canchas) * dias * HORAS_OPERACION),
+        "por_cancha": [
+            {"cancha_id": cid, "cancha_nombre": nombre, **_totales(**por_cancha[cid], capacidad_h=dias * HORAS_OPERACION)}
+            for cid, nombre in canchas.items()
+        ],
+        "por_dia": [
+            {"fecha": fecha, **_totales(**por_dia[fecha], capacidad_h=len(canchas) * HORAS_OPERACION)}
+            for fecha in sorted(por_dia)
+        ],
+        # horas reservadas por [día de la semana (0 = lunes)][hora del día]
+        "mapa_calor": [[round(m / 60, 2) for m in fila] for fila in mapa],
+    }
@@ -0,0 +1,148 @@
+"""
+Índice espacial en memoria para "complejos cerca de mí".
+
+Rejilla de celdas de `PASO_GRADOS` (≈5.5 km) con los complejos activos que
+tienen coordenadas. Una consulta solo recorre las celdas que cubren el radio y
+filtra/ordena por distancia haversine, así el costo depende de la densidad
+local y no del tamaño del catálogo. El índice se marca obsoleto cuando el
+catálogo cambia (ver `app.core.catalogo.al_cambiar`) y se reconstruye en la
+siguiente consulta; `GEO_INDICE_TTL_SECONDS` acota el desfase entre workers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import catalogo
+from app.core.config import settings
+from app.modelos.modelos import Complejo
+
+PASO_GRADOS = 0.05
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO_LAT = 111.32
+
+
+@dataclass(frozen=True, slots=True)
+class PuntoComplejo:
+    id: int
+    lat: float
+    lng: float
+    nombre: str
+    slug: str
+    distrito: str | None
+    provincia: str | None
+    departamento: str | None
+    foto_url: str | None
+
+
+def distancia_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _celda(lat: float, lng: float) -> tuple[int, int]:
+    return math.floor(lat / PASO_GRADOS), math.floor(lng / PASO_GRADOS)
+
+
+class IndiceGeo:
+    def __init__(self, puntos: Iterable[PuntoComplejo] = ()):
+        self._celdas: dict[tuple[int, int], list[PuntoComplejo]] = defaultdict(list)
+        self.total = 0
+        for p in puntos:
+            self._celdas[_celda(p.lat, p.lng)].append(p)
+            self.total += 1
+
+    def cerca(self, lat: float, lng: float, radio_km: float, limite: int) -> list[tuple[float, PuntoComplejo]]:
+        dlat = radio_km / KM_POR_GRADO_LAT
+        # cerca de los polos el cos tiende a 0: se limita para no recorrer medio mundo
+        dlng = radio_km / (KM_POR_GRADO_LAT * max(math.cos(math.radians(lat)), 0.01))
+        f0, c0 = _celda(lat - dlat, lng - dlng)
+        f1, c1 = _celda(lat + dlat, lng + dlng)
+
+        # prefiltro equirectangular (barato) y haversine solo para los candidatos
+        kx = KM_POR_GRADO_LAT * math.cos(math.radians(lat))
+        margen2 = (radio_km * 1.01 + 0.1) ** 2
+        encontrados: list[tuple[float, int, PuntoComplejo]] = []
+        for f in range(f0, f1 + 1):
+            for c in range(c0, c1 + 1):
+                for p in self._celdas.get((f, c), ()):
+                    dy = (p.lat - lat) * KM_POR_GRADO_LAT
+                    dx = (p.lng - lng) * kx
+                    if dx * dx + dy * dy > margen2:
+                        continue
+                    d = distancia_km(lat, lng, p.lat, p.lng)
+                    if d <= radio_km:
+                        encontrados.append((d, p.id, p))
+        return [(d, p) for d, _, p in heapq.nsmallest(limite, encontrados)]
+
+
+_indice: IndiceGeo | None = None
+_construido_en = 0.0
+_obsoleto = True
+_lock = asyncio.Lock()
+
+
+def _marcar_obsoleto(cambios: dict) -> None:
+    global _obsoleto
+    if cambios["todo"] or cambios["complejos"]:
+        _obsoleto = True
+
+
+catalogo.al_cambiar(_marcar_obsoleto)
+
+
+def _vigente() -> bool:
+    return (
+        _indice is not None
+        and not _obsoleto
+        and time.monotonic() - _construido_en < settings.GEO_INDICE_TTL_SECONDS
+    )
+
+
+async def _cargar(db: AsyncSession) -> IndiceGeo:
+    filas = await db.execute(
+        select(
+            Complejo.id,
+            Complejo.latitud,
+            Complejo.longitud,
+            Complejo.nombre,
+            Complejo.slug,
+            Complejo.distrito,
+            Complejo.provincia,
+            Complejo.departamento,
+            Complejo.foto_url,
+        ).where(Complejo.is_active == True, Complejo.latitud.isnot(None), Complejo.longitud.isnot(None))
+    )
+    return IndiceGeo(
+        PuntoComplejo(cid, float(lat), float(lng), nombre, slug, distrito, provincia, departamento, foto_url)
+        for cid, lat, lng, nombre, slug, distrito, provincia, departamento, foto_url in filas
+    )
+
+
+async def indice(db: AsyncSession) -> IndiceGeo:
+    global _indice, _construido_en, _obsoleto
+    if _vigente():
+        return _indice
+    async with _lock:
+        if not _vigente():
+            # se baja la marca antes de leer: un cambio durante la carga vuelve a marcarlo
+            _obsoleto = False
+            try:
+                _indice = await _cargar(db)
+            except Exception:
+                _obsoleto = True
+                raise
+            _construido_en = time.monotonic()
+    return _indice
@@ -0,0 +1,214 @@
+"""
+Claves de idempotencia para endpoints que cobran (cabecera `Idempotency-Key`).
+
+La primera petición con una clave la "reclama": inserta una fila
+(clave, endpoint) en `claves_idempotencia` con la huella del cuerpo, en su
+propia transacción, antes de llamar a Culqi. Un reintento con la misma clave:
+
+- si la primera terminó, recibe la misma respuesta guardada (cabecera
+  `Idempotent-Replayed: true`) sin volver a cobrar;
+- si sigue en curso, espera hasta `IDEMPOTENCIA_ESPERA_SECONDS` a que termine
+  y la repite; si no termina a tiempo, 409 con `Retry-After`;
+- si trae otro cuerpo, 422: la clave no se reutiliza para otra operación.
+
+Solo se guardan respuestas definitivas (éxito, un error después de haber
+cobrado o uno en que no se sabe si Culqi cobró); ante cualquier otro error
+la clave se libera y el cliente puede reintentar. Una reclamación que quedó en curso más de
+`IDEMPOTENCIA_ABANDONO_SECONDS` (worker caído) puede volver a reclamarse.
+Las claves vencen a las `IDEMPOTENCIA_TTL_HORAS` y `barrer` las borra por lotes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.conexion import engine
+from app.modelos.modelos import ClaveIdempotencia
+
+logger = logging.getLogger("app.idempotencia")
+
+CABECERA = "Idempotency-Key"
+LARGO_MAXIMO = 128
+SONDEO_S = 0.25
+LOTE_BARRIDO = 1_000
+
+_tabla = ClaveIdempotencia.__table__
+
+
+def huella(cuerpo) -> str:
+    crudo = json.dumps(jsonable_encoder(cuerpo), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(crudo.encode()).hexdigest()
+
+
+@dataclass
+class Reclamo:
+    clave: str
+    endpoint: str
+    # respuesta guardada de una petición anterior con la misma clave (None = esta petición la procesa)
+    repetida: JSONResponse | None = None
+    # ya hubo efectos externos (p. ej. cobro en Culqi): un error desde aquí es definitivo
+    comprometido: bool = field(default=False)
+
+    def comprometer(self) -> None:
+        self.comprometido = True
+
+    def completar(self, status_code: int, cuerpo) -> None:
+        with engine.begin() as conn:
+            conn.execute(
+                update(_tabla)
+                .where(_tabla.c.clave == self.clave, _tabla.c.endpoint == self.endpoint)
+                .values(estado="completa", status_code=status_code, respuesta=jsonable_encoder(cuerpo))
+            )
+
+    def liberar(self) -> None:
+        with engine.begin() as conn:
+            conn.execute(
+                delete(_tabla).where(
+                    _tabla.c.clave == self.clave,
+                    _tabla.c.endpoint == self.endpoint,
+                    _tabla.c.estado == "en_curso",
+                )
+            )
+
+    def fallo(self, exc: HTTPException) -> None:
+        """Error del endpoint: se guarda si ya hubo cobro, si no se libera la clave para reintentar."""
+        try:
+            if self.comprometido:
+                self.completar(exc.status_code, {"detail": exc.detail})
+            else:
+                self.liberar()
+        except Exception:
+            logger.exception("No se pudo cerrar la clave de idempotencia %s/%s", self.endpoint, self.clave)
+
+
+def _respuesta_guardada(fila) -> JSONResponse:
+    return JSONResponse(
+        status_code=fila.status_code or 200,
+        content=fila.respuesta,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _intentar_insertar(clave: str, endpoint: str, huella_peticion: str, ahora: datetime) -> bool:
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                insert(_tabla).values(
+                    clave=clave,
+                    endpoint=endpoint,
+                    huella=huella_peticion,
+                    estado="en_curso",
+                    created_at=ahora,
+                    expira_at=ahora + timedelta(hours=settings.IDEMPOTENCIA_TTL_HORAS),
+                )
+            )
+        return True
+    except IntegrityError:
+        return False
+
+
+def _retomar(fila, huella_peticion: str, ahora: datetime) -> bool:
+    """Reclama una fila vencida o abandonada; condicionada a que nadie la haya tomado antes."""
+    with engine.begin() as conn:
+        res = conn.execute(
+            update(_tabla)
+            .where(
+                _tabla.c.clave == fila.clave,
+                _tabla.c.endpoint == fila.endpoint,
+                _tabla.c.created_at == fila.created_at,
+            )
+            .values(
+                huella=huella_peticion,
+                estado="en_curso",
+                status_code=None,
+                respuesta=None,
+                created_at=ahora,
+                expira_at=ahora + timedelta(hours=settings.IDEMPOTENCIA_TTL_HORAS),
+            )
+        )
+    return bool(res.rowcount)
+
+
+def reclamar(clave: str, endpoint: str, cuerpo) -> Reclamo:
+    clave = (clave or "").strip()
+    if not clave or len(clave) > LARGO_MAXIMO:
+        raise HTTPException(status_code=400, detail=f"{CABECERA} inválida (1 a {LARGO_MAXIMO} caracteres)")
+    huella_peticion = huella(cuerpo)
+    limite = time.monotonic() + settings.IDEMPOTENCIA_ESPERA_SECONDS
+
+    while True:
+        ahora = datetime.now(timezone.utc)
+        if _intentar_insertar(clave, endpoint, huella_peticion, ahora):
+            return Reclamo(clave, endpoint)
+
+        with engine.connect() as conn:
+            fila = conn.execute(
+                select(_tabla).where(_tabla.c.clave == clave, _tabla.c.endpoint == endpoint)
+            ).first()
+        if fila is None:
+            continue  # liberada entre el INSERT y el SELECT: volver a reclamar
+
+        vencida = _aware(fila.expira_at) <= ahora
+        abandonada = fila.estado == "en_curso" and _aware(fila.created_at) <= ahora - timedelta(
+            seconds=settings.IDEMPOTENCIA_ABANDONO_SECONDS
+        )
+        if vencida or abandonada:
+            if _retomar(fila, huella_peticion, ahora):
+                return Reclamo(clave, endpoint)
+            continue
+
+        if fila.huella != huella_peticion:
+            raise HTTPException(status_code=422, detail=f"{CABECERA} ya usada con otra petición")
+        if fila.estado == "completa":
+            return Reclamo(clave, endpoint, repetida=_respuesta_guardada(fila))
+        if time.monotonic() >= limite:
+            raise HTTPException(
+                status_code=409,
+                detail="La petición original con esta clave sigue en curso",
+                headers={"Retry-After": "2"},
+            )
+        time.sleep(SONDEO_S)
+
+
+def _aware(valor: datetime) -> datetime:
+    # sqlite devuelve fechas sin zona aunque se guarden en UTC
+    return valor if valor.tzinfo else valor.replace(tzinfo=timezone.utc)
+
+
+def barrer() -> int:
+    """Tarea periódica: borra claves vencidas en lotes cortos. Devuelve cuántas borró."""
+    borradas = 0
+    while True:
+        ahora = datetime.now(timezone.utc)
+        with engine.begin() as conn:
+            claves = conn.execute(
+                select(_tabla.c.clave, _tabla.c.endpoint)
+                .where(_tabla.c.expira_at < ahora)
+                .limit(LOTE_BARRIDO)
+            ).all()
+            for endpoint in {e for _, e in claves}:
+                conn.execute(
+                    delete(_tabla).where(
+                        _tabla.c.endpoint == endpoint,
+                        _tabla.c.clave.in_([c for c, e in claves if e == endpoint]),
+                        _tabla.c.expira_at < ahora,  # no borrar una que se retomó entretanto
+                    )
+                )
+        borradas += len(claves)
+        if len(claves) < LOTE_BARRIDO:
+            break
+    if borradas:
+        logger.info("Claves de idempotencia vencidas borradas: %s", borradas)
+    return borradas
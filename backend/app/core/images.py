@@ -11,6 +11,8 @@ from botocore.exceptions import BotoCoreError, ClientError
 
 from PIL import Image, ImageOps
 
+from app.core import metricas
+
 _UPLOADS_ROOT = Path("uploads").resolve()
 
 
@@ -57,23 +59,35 @@ def save_upload(data: bytes, content_type: str, key: str) -> str:
     key = key.lstrip("/")
     if s3_enabled():
         try:
-            _s3_client().put_object(
-                Bucket=_s3_bucket(),
-                Key=key,
-                Body=data,
-                ContentType=content_type,
-            )
+            with metricas.cronometrar(metricas.UPLOAD_DURACION, backend="s3"):
+                _s3_client().put_object(
+                    Bucket=_s3_bucket(),
+                    Key=key,
+                    Body=data,
+                    ContentType=content_type,
+                )
         except (BotoCoreError, ClientError):
+            metricas.UPLOAD_ERRORES.labels("s3").inc()
             raise
         return build_public_url(key)
 
     path = (_UPLOADS_ROOT / key).resolve()
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_bytes(data)
+    try:
+        with metricas.cronometrar(metricas.UPLOAD_DURACION, backend="local"):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+    except OSError:
+        metricas.UPLOAD_ERRORES.labels("local").inc()
+        raise
     return f"/uploads/{key}"
 
 
 def resize_square_image(data: bytes, size: int, ext: str) -> bytes:
+    with metricas.cronometrar(metricas.IMAGEN_RESIZE):
+        return _resize_square_image(data, size, ext)
+
+
+def _resize_square_image(data: bytes, size: int, ext: str) -> bytes:
     with Image.open(BytesIO(data)) as img:
         if ext == ".png":
             img = img.convert("RGBA")
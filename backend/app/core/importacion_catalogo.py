@@ -0,0 +1,340 @@
+"""
+Importación masiva de complejos desde los CSV de OSM (`generar_inserts.py`).
+
+El CSV (`distrito,nombre,latitud,longitud,direccion`; `provincia` y
+`departamento` opcionales) se lee en streaming y cada fila se normaliza:
+nombre sin espacios de más, coordenadas válidas y distrito resuelto contra
+las tablas de ubigeo (nombre canónico, provincia y departamento), prefiriendo
+la provincia/departamento indicados cuando el nombre se repite en el país.
+
+Dos filas son el mismo complejo si su nombre normalizado coincide y están a
+menos de `IMPORTACION_DUPLICADO_METROS`. Contra los complejos existentes eso
+es una actualización, que solo completa campos vacíos (dirección, distrito,
+provincia, departamento) y nunca pisa lo que cargó un propietario. Dentro del
+CSV se queda la primera fila y se le suman los datos de las repetidas.
+
+`analizar` arma el plan sin escribir: es el modo simulación y devuelve el
+mismo diff que se aplicaría. `aplicar` reserva los slugs por lotes
+(`slug.reservar_lote`), inserta con `COPY` en lotes de `LOTE` filas y
+actualiza con un executemany, todo en una transacción. Después del commit
+avisa al catálogo para que se vacíen los caches y los índices en memoria.
+"""
+
+from __future__ import annotations
+
+import csv
+import math
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Iterator, TextIO
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core import catalogo
+from app.core.config import settings
+from app.core.geo import KM_POR_GRADO_LAT, distancia_km
+from app.core.slug import normalizar_texto, reservar_lote
+from app.modelos.modelos import Complejo, UbigeoDepartment, UbigeoDistrict, UbigeoProvince
+
+LOTE = 5_000
+MUESTRA = 20
+CAMPOS_COMPLETABLES = ("direccion", "distrito", "provincia", "departamento")
+COLUMNAS_COPY = (
+    "nombre", "slug", "direccion", "distrito", "provincia", "departamento", "latitud", "longitud",
+    "techada", "iluminacion", "vestuarios", "estacionamiento", "cafeteria",
+    "is_active", "likes_count", "created_at", "updated_at",
+)
+
+_tabla = Complejo.__table__
+
+
+@dataclass(slots=True)
+class FilaCSV:
+    linea: int
+    nombre: str
+    clave: str
+    lat: float
+    lng: float
+    direccion: str | None
+    distrito: str | None
+    provincia: str | None
+    departamento: str | None
+    ubigeo_id: str | None
+
+    def resumen(self) -> dict:
+        return {
+            "linea": self.linea,
+            "nombre": self.nombre,
+            "distrito": self.distrito,
+            "ubigeo_id": self.ubigeo_id,
+            "latitud": self.lat,
+            "longitud": self.lng,
+        }
+
+
+@dataclass
+class Plan:
+    leidas: int = 0
+    descartadas: Counter = field(default_factory=Counter)
+    duplicadas: int = 0
+    sin_ubigeo: Counter = field(default_factory=Counter)
+    insertar: list[FilaCSV] = field(default_factory=list)
+    # (id, nombre, {campo: (antes, después)})
+    actualizar: list[tuple[int, str, dict[str, tuple]]] = field(default_factory=list)
+
+    def resumen(self, *, simulacion: bool, segundos: float) -> dict:
+        return {
+            "simulacion": simulacion,
+            "leidas": self.leidas,
+            "descartadas": dict(self.descartadas),
+            "duplicadas_en_csv": self.duplicadas,
+            "insertar": len(self.insertar),
+            "actualizar": len(self.actualizar),
+            "sin_ubigeo": dict(self.sin_ubigeo.most_common()),
+            "muestra_insertar": [f.resumen() for f in self.insertar[:MUESTRA]],
+            "muestra_actualizar": [
+                {"id": cid, "nombre": nombre, "cambios": {k: list(v) for k, v in cambios.items()}}
+                for cid, nombre, cambios in self.actualizar[:MUESTRA]
+            ],
+            "segundos": round(segundos, 2),
+        }
+
+
+# -------- ubigeo --------
+def _ubigeo(db: Session) -> dict[str, list[tuple[str, str, str, str]]]:
+    """nombre normalizado del distrito -> [(id, distrito, provincia, departamento)]."""
+    filas = db.execute(
+        select(UbigeoDistrict.id, UbigeoDistrict.name, UbigeoProvince.name, UbigeoDepartment.name)
+        .join(UbigeoProvince, UbigeoProvince.id == UbigeoDistrict.province_id)
+        .join(UbigeoDepartment, UbigeoDepartment.id == UbigeoDistrict.department_id)
+        .where(UbigeoDistrict.name.is_not(None))
+    ).all()
+    mapa: dict[str, list[tuple[str, str, str, str]]] = defaultdict(list)
+    for ubigeo_id, distrito, provincia, departamento in filas:
+        mapa[normalizar_texto(distrito)].append((ubigeo_id, distrito, provincia, departamento))
+    return mapa
+
+
+def _resolver(mapa, distrito: str, provincia: str, departamento: str) -> tuple[str, str, str, str] | None:
+    candidatos = mapa.get(normalizar_texto(distrito))
+    if not candidatos:
+        return None
+    if len(candidatos) == 1:
+        return candidatos[0]
+    prov, dep = normalizar_texto(provincia), normalizar_texto(departamento)
+    for exigir_provincia in (True, False):
+        elegidos = [
+            c for c in candidatos
+            if normalizar_texto(c[3]) == dep and (not exigir_provincia or normalizar_texto(c[2]) == prov)
+        ]
+        if len(elegidos) == 1:
+            return elegidos[0]
+    return None
+
+
+# -------- lectura --------
+def _texto(fila: dict, campo: str, largo: int) -> str | None:
+    valor = " ".join((fila.get(campo) or "").split())
+    return valor[:largo] or None
+
+
+def _coordenada(valor: str | None, limite: float) -> float | None:
+    try:
+        numero = float((valor or "").strip())
+    except ValueError:
+        return None
+    return numero if math.isfinite(numero) and -limite <= numero <= limite else None
+
+
+def leer(archivo: TextIO, plan: Plan, mapa, provincia: str, departamento: str) -> Iterator[FilaCSV]:
+    """Filas válidas y normalizadas del CSV; las descartadas se cuentan en `plan` por motivo."""
+    lector = csv.DictReader(archivo)
+    lector.fieldnames = [(c or "").strip().lstrip("\ufeff").lower() for c in (lector.fieldnames or [])]
+    faltan = {"nombre", "latitud", "longitud"} - set(lector.fieldnames)
+    if faltan:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(sorted(faltan))}")
+
+    # pocos distritos distintos por archivo: cada combinación se resuelve una vez
+    resueltos: dict[tuple, tuple] = {}
+    for fila in lector:
+        plan.leidas += 1
+        nombre = _texto(fila, "nombre", 160)
+        if not nombre:
+            plan.descartadas["sin_nombre"] += 1
+            continue
+        lat = _coordenada(fila.get("latitud"), 90)
+        lng = _coordenada(fila.get("longitud"), 180)
+        if lat is None or lng is None or (lat == 0 and lng == 0):
+            plan.descartadas["coordenadas_invalidas"] += 1
+            continue
+
+        crudo = (fila.get("distrito"), fila.get("provincia"), fila.get("departamento"))
+        if crudo not in resueltos:
+            distrito, prov, dep = (_texto(fila, c, 120) for c in ("distrito", "provincia", "departamento"))
+            ubigeo = _resolver(mapa, distrito, prov or provincia, dep or departamento) if distrito else None
+            resueltos[crudo] = ubigeo or (None, distrito, prov, dep)
+        ubigeo_id, distrito, prov, dep = resueltos[crudo]
+        if ubigeo_id is None:
+            plan.sin_ubigeo[distrito or "(vacío)"] += 1
+
+        yield FilaCSV(
+            linea=lector.line_num,
+            nombre=nombre,
+            clave=normalizar_texto(nombre),
+            lat=lat,
+            lng=lng,
+            direccion=_texto(fila, "direccion", 240),
+            distrito=distrito,
+            provincia=prov,
+            departamento=dep,
+            ubigeo_id=ubigeo_id,
+        )
+
+
+# -------- duplicados por nombre + cercanía --------
+class _Rejilla:
+    """Puntos por (nombre normalizado, celda); las celdas miden al menos `metros` en ambos ejes."""
+
+    def __init__(self, metros: float):
+        self.km = metros / 1000
+        # en longitud un grado mide menos que en latitud: con el doble del paso cubre hasta ~60° de latitud
+        self.paso = 2 * self.km / KM_POR_GRADO_LAT
+        self._celdas: dict[tuple, list] = defaultdict(list)
+
+    def _celda(self, lat: float, lng: float) -> tuple[int, int]:
+        return math.floor(lat / self.paso), math.floor(lng / self.paso)
+
+    def agregar(self, clave: str, lat: float, lng: float, valor) -> None:
+        self._celdas[(clave, *self._celda(lat, lng))].append((lat, lng, valor))
+
+    def buscar(self, clave: str, lat: float, lng: float):
+        f0, c0 = self._celda(lat, lng)
+        for f in (f0 - 1, f0, f0 + 1):
+            for c in (c0 - 1, c0, c0 + 1):
+                for plat, plng, valor in self._celdas.get((clave, f, c), ()):
+                    if distancia_km(lat, lng, plat, plng) <= self.km:
+                        return valor
+        return None
+
+
+def analizar(
+    db: Session,
+    archivo: TextIO,
+    *,
+    provincia: str = "Lima",
+    departamento: str = "Lima",
+) -> Plan:
+    """Plan de la importación (inserciones y actualizaciones) sin escribir nada."""
+    plan = Plan()
+    mapa = _ubigeo(db)
+
+    existentes = _Rejilla(settings.IMPORTACION_DUPLICADO_METROS)
+    filas = db.execute(
+        select(
+            _tabla.c.id, _tabla.c.nombre, _tabla.c.latitud, _tabla.c.longitud,
+            *(_tabla.c[campo] for campo in CAMPOS_COMPLETABLES),
+        ).where(_tabla.c.latitud.is_not(None), _tabla.c.longitud.is_not(None))
+    )
+    for fila in filas:
+        existentes.agregar(normalizar_texto(fila.nombre), float(fila.latitud), float(fila.longitud), fila)
+
+    nuevas = _Rejilla(settings.IMPORTACION_DUPLICADO_METROS)
+    cambios_por_id: dict[int, tuple[str, dict[str, tuple]]] = {}
+    for fila in leer(archivo, plan, mapa, provincia, departamento):
+        actual = existentes.buscar(fila.clave, fila.lat, fila.lng)
+        if actual is not None:
+            if actual.id in cambios_por_id:
+                plan.duplicadas += 1
+            _, cambios = cambios_por_id.setdefault(actual.id, (actual.nombre, {}))
+            for campo in CAMPOS_COMPLETABLES:
+                nuevo = getattr(fila, campo)
+                if nuevo and not getattr(actual, campo) and campo not in cambios:
+                    cambios[campo] = (getattr(actual, campo), nuevo)
+            continue
+
+        repetida = nuevas.buscar(fila.clave, fila.lat, fila.lng)
+        if repetida is not None:
+            plan.duplicadas += 1
+            for campo in CAMPOS_COMPLETABLES:
+                if not getattr(repetida, campo) and getattr(fila, campo):
+                    setattr(repetida, campo, getattr(fila, campo))
+            continue
+        nuevas.agregar(fila.clave, fila.lat, fila.lng, fila)
+        plan.insertar.append(fila)
+
+    plan.actualizar = [(cid, nombre, cambios) for cid, (nombre, cambios) in cambios_por_id.items() if cambios]
+    return plan
+
+
+# -------- escritura --------
+def _copiar(db: Session, filas: list[tuple]) -> None:
+    conn = db.connection()
+    if conn.dialect.name != "postgresql":
+        conn.execute(insert(_tabla), [dict(zip(COLUMNAS_COPY, f)) for f in filas])
+        return
+    # COPY por la misma conexión (y transacción) de la sesión
+    with conn.connection.driver_connection.cursor() as cur:
+        with cur.copy(f"COPY public.complejos ({', '.join(COLUMNAS_COPY)}) FROM STDIN") as copia:
+            for f in filas:
+                copia.write_row(f)
+
+
+def aplicar(db: Session, plan: Plan, *, activos: bool = True) -> None:
+    """Escribe el plan en la transacción de `db` (sin commit)."""
+    ahora = datetime.now(timezone.utc)
+    for i in range(0, len(plan.insertar), LOTE):
+        lote = plan.insertar[i : i + LOTE]
+        slugs = reservar_lote(db, [f.nombre for f in lote])
+        _copiar(
+            db,
+            [
+                (
+                    f.nombre, s, f.direccion, f.distrito, f.provincia, f.departamento, f.lat, f.lng,
+                    False, True, False, False, False,
+                    activos, 0, ahora, ahora,
+                )
+                for f, s in zip(lote, slugs)
+            ],
+        )
+
+    if plan.actualizar:
+        # executemany: todas las filas llevan las mismas columnas
+        params = []
+        for cid, _nombre, cambios in plan.actualizar:
+            p = {"_id": cid, "_ahora": ahora}
+            for campo in CAMPOS_COMPLETABLES:
+                p["_" + campo] = cambios[campo][1] if campo in cambios else None
+            params.append(p)
+        db.connection().execute(
+            update(_tabla)
+            .where(_tabla.c.id == bindparam("_id"))
+            .values(
+                updated_at=bindparam("_ahora"),
+                # campo sin cambio -> parámetro NULL -> conserva el valor actual
+                **{c: func.coalesce(bindparam("_" + c), _tabla.c[c]) for c in CAMPOS_COMPLETABLES},
+            ),
+            params,
+        )
+
+
+def importar(
+    db: Session,
+    archivo: TextIO,
+    *,
+    simular: bool = True,
+    activos: bool = True,
+    provincia: str = "Lima",
+    departamento: str = "Lima",
+) -> dict:
+    """Analiza el CSV y, si no es simulación, lo aplica y confirma. Devuelve el resumen del diff."""
+    t0 = time.perf_counter()
+    plan = analizar(db, archivo, provincia=provincia, departamento=departamento)
+    if not simular and (plan.insertar or plan.actualizar):
+        aplicar(db, plan, activos=activos)
+        db.commit()
+        # COPY y el UPDATE por lotes no pasan por los eventos del ORM
+        catalogo.cambio_masivo()
+    return plan.resumen(simulacion=simular, segundos=time.perf_counter() - t0)
@@ -0,0 +1,120 @@
+"""
+Instrumentación SQL por petición: cuenta consultas y tiempo de BD con los
+eventos de cursor de SQLAlchemy y los agrega por ruta (plantilla, no URL).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.sql")
+
+SIN_RUTA = "sin_ruta"
+
+
+@dataclass
+class MedicionPeticion:
+    scope: dict = field(default_factory=dict)
+    consultas: int = 0
+    db_ms: float = 0.0
+    lentas: int = 0
+
+    @property
+    def ruta(self) -> str:
+        # FastAPI deja la APIRoute en el scope tras enrutar: usamos la plantilla
+        route = self.scope.get("route")
+        path = getattr(route, "path", None)
+        return path or SIN_RUTA
+
+    def server_timing(self, total_ms: float) -> str:
+        return f'db;dur={self.db_ms:.1f};desc="{self.consultas} queries", app;dur={total_ms:.1f}'
+
+
+_medicion_actual: ContextVar[MedicionPeticion | None] = ContextVar("medicion_sql", default=None)
+
+
+def iniciar_medicion(scope: dict) -> tuple[MedicionPeticion, Token]:
+    medicion = MedicionPeticion(scope=scope)
+    return medicion, _medicion_actual.set(medicion)
+
+
+def finalizar_medicion(token: Token) -> None:
+    _medicion_actual.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    pila = conn.info.get("inicio_consulta")
+    if not pila:
+        return
+    ms = (time.perf_counter() - pila.pop()) * 1000
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        medicion.consultas += 1
+        medicion.db_ms += ms
+    umbral = settings.SQL_SLOW_MS
+    if umbral > 0 and ms >= umbral:
+        if medicion is not None:
+            medicion.lentas += 1
+        ruta = medicion.ruta if medicion is not None else "-"
+        logger.warning("SQL lenta (%.1f ms) en %s: %s", ms, ruta, " ".join(statement.split())[:500])
+
+
+# -------- Agregados por ruta --------
+_agregados: dict[str, dict] = {}
+_agregados_lock = threading.Lock()
+
+
+def registrar_peticion(medicion: MedicionPeticion, metodo: str, total_ms: float) -> None:
+    clave = f"{metodo} {medicion.ruta}"
+    with _agregados_lock:
+        fila = _agregados.get(clave)
+        if fila is None:
+            fila = _agregados[clave] = {
+                "ruta": clave,
+                "peticiones": 0,
+                "consultas": 0,
+                "max_consultas": 0,
+                "db_ms": 0.0,
+                "total_ms": 0.0,
+                "consultas_lentas": 0,
+            }
+        fila["peticiones"] += 1
+        fila["consultas"] += medicion.consultas
+        fila["max_consultas"] = max(fila["max_consultas"], medicion.consultas)
+        fila["db_ms"] += medicion.db_ms
+        fila["total_ms"] += total_ms
+        fila["consultas_lentas"] += medicion.lentas
+
+
+def resumen_por_ruta() -> list[dict]:
+    with _agregados_lock:
+        filas = [dict(f) for f in _agregados.values()]
+    for f in filas:
+        n = f["peticiones"] or 1
+        f["consultas_promedio"] = round(f["consultas"] / n, 2)
+        f["db_ms_promedio"] = round(f["db_ms"] / n, 2)
+        f["total_ms_promedio"] = round(f["total_ms"] / n, 2)
+        f["db_ms"] = round(f["db_ms"], 2)
+        f["total_ms"] = round(f["total_ms"], 2)
+    filas.sort(key=lambda f: f["consultas_promedio"], reverse=True)
+    return filas
+
+
+def reiniciar_agregados() -> None:
+    with _agregados_lock:
+        _agregados.clear()
@@ -0,0 +1,66 @@
+"""
+Serialización JSON rápida para listados grandes (catálogo y panel).
+
+Por defecto FastAPI valida lo que devuelve el endpoint contra `response_model`,
+lo convierte a tipos Python (`mode="json"`) y recién ahí lo pasa por el
+`json.dumps` de la stdlib. En listados de miles de canchas o reservas ese
+doble recorrido domina el tiempo de respuesta. Los endpoints que lo piden
+devuelven en cambio:
+
+- `lista(tipo, filas)`: valida y serializa en una sola pasada de
+  pydantic-core con un `TypeAdapter` precompilado por tipo. Misma forma y
+  mismos valores que `response_model` (acepta objetos ORM anidados), sin los
+  objetos intermedios.
+- `RespuestaORJSON` / `dumps`: orjson directo para datos internos que ya
+  tienen la forma final (dicts de filas), sin validar. `Decimal` sale como
+  número. Es el `response_class` de `/panel/estadisticas` y
+  `/panel/reservas/mes` (dicts armados por el propio endpoint, sin
+  `response_model`) y lo usa el NDJSON de los exportes.
+
+El `response_model` del decorador se mantiene para la documentación OpenAPI;
+FastAPI no lo vuelve a aplicar cuando el endpoint devuelve un `Response`.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+
+OPCIONES = orjson.OPT_NON_STR_KEYS
+
+
+def _por_defecto(valor: Any):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    raise TypeError(f"{type(valor).__name__} no es serializable a JSON")
+
+
+def dumps(contenido: Any) -> bytes:
+    return orjson.dumps(contenido, default=_por_defecto, option=OPCIONES)
+
+
+class RespuestaORJSON(JSONResponse):
+    """JSONResponse que serializa con orjson (datetime, date y UUID nativos; Decimal como número)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def adaptador(tipo) -> TypeAdapter:
+    """TypeAdapter compilado una sola vez por tipo (p. ej. `list[CanchaOut]`)."""
+    return TypeAdapter(tipo)
+
+
+def lista(tipo, filas, *, status_code: int = 200, headers: dict[str, str] | None = None) -> Response:
+    """Valida `filas` contra `tipo` y las serializa en una sola pasada, como lo haría `response_model`."""
+    ad = adaptador(tipo)
+    cuerpo = ad.dump_json(ad.validate_python(filas, from_attributes=True))
+    return Response(cuerpo, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,131 @@
+"""
+Likes de complejos con contador desnormalizado (`complejos.likes_count`).
+
+El toggle es un DELETE ... RETURNING o un INSERT ... ON CONFLICT DO NOTHING
+(apoyado en el índice único complejo_id+user_id) más un UPDATE atómico del
+contador, todo en la misma transacción. `reconciliar_likes_count` corrige
+cualquier desvío (borrados en cascada, escrituras fuera de la API) y también
+lo lleva a los perfiles cacheados.
+"""
+
+from __future__ import annotations
+
+import base64
+from bisect import bisect_left
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core import catalogo
+from app.core.cache import CacheTTL
+from app.core.config import settings
+from app.db.conexion import SessionLocal
+from app.modelos.modelos import Complejo, ComplejoLike
+
+
+def alternar_like(db: Session, complejo_id: int, user_id: int) -> tuple[bool, int]:
+    """Da o quita el like del usuario. Devuelve (liked, likes_count) ya confirmados."""
+    borrado = db.execute(
+        delete(ComplejoLike)
+        .where(ComplejoLike.complejo_id == complejo_id, ComplejoLike.user_id == user_id)
+        .returning(ComplejoLike.id)
+    ).first()
+    if borrado:
+        liked, delta = False, -1
+    else:
+        insertado = db.execute(
+            pg_insert(ComplejoLike)
+            .values(complejo_id=complejo_id, user_id=user_id)
+            .on_conflict_do_nothing(index_elements=["complejo_id", "user_id"])
+            .returning(ComplejoLike.id)
+        ).first()
+        # si otra petición concurrente ganó el insert, el like ya existe y no se cuenta dos veces
+        liked, delta = True, (1 if insertado else 0)
+
+    likes_count = db.execute(
+        update(Complejo)
+        .where(Complejo.id == complejo_id)
+        # updated_at se conserva: un like no es una edición del complejo
+        .values(likes_count=func.greatest(Complejo.likes_count + delta, 0), updated_at=Complejo.updated_at)
+        .returning(Complejo.likes_count)
+        .execution_options(**catalogo.SIN_INVALIDAR)
+    ).scalar_one()
+    db.commit()
+    _likes_por_usuario.invalidar(user_id)
+    catalogo.actualizar_likes(complejo_id, likes_count)
+    return liked, likes_count
+
+
+# ids de complejos likeados por usuario (tupla ordenada), para pintar corazones en el catálogo
+_likes_por_usuario: CacheTTL[tuple[int, ...]] = CacheTTL(
+    max_items=settings.LIKES_CACHE_USUARIOS, ttl_s=settings.LIKES_CACHE_TTL_SECONDS
+)
+
+
+def like_en_cache(user_id: int, complejo_id: int) -> bool | None:
+    """None si no hay lista cacheada para el usuario (hay que consultar)."""
+    ids = _likes_por_usuario.get(user_id)
+    if ids is None:
+        return None
+    i = bisect_left(ids, complejo_id)
+    return i < len(ids) and ids[i] == complejo_id
+
+
+def complejos_likeados(db: Session, user_id: int) -> tuple[int, ...]:
+    ids = _likes_por_usuario.get(user_id)
+    if ids is None:
+        ids = tuple(
+            db.execute(
+                select(ComplejoLike.complejo_id)
+                .where(ComplejoLike.user_id == user_id)
+                .order_by(ComplejoLike.complejo_id)
+            ).scalars()
+        )
+        _likes_por_usuario.set(user_id, ids)
+    return ids
+
+
+def a_bitmap(ids: tuple[int, ...]) -> dict:
+    """Bit i del bitmap (LSB primero dentro de cada byte) = complejo `base + i`."""
+    if not ids:
+        return {"base": 0, "bits": 0, "bitmap": ""}
+    base = ids[0]
+    bits = ids[-1] - base + 1
+    buf = bytearray((bits + 7) // 8)
+    for cid in ids:
+        i = cid - base
+        buf[i >> 3] |= 1 << (i & 7)
+    return {"base": base, "bits": bits, "bitmap": base64.b64encode(bytes(buf)).decode("ascii")}
+
+
+_SQL_RECONCILIAR = text(
+    """
+    UPDATE public.complejos c
+    SET likes_count = coalesce(l.total, 0)
+    FROM public.complejos c2
+    LEFT JOIN (
+        SELECT complejo_id, count(*) AS total
+        FROM public.complejo_likes
+        GROUP BY complejo_id
+    ) l ON l.complejo_id = c2.id
+    WHERE c.id = c2.id AND c.likes_count IS DISTINCT FROM coalesce(l.total, 0)
+    RETURNING c.id, c.likes_count
+    """
+)
+
+
+def reconciliar_likes_count(db: Session) -> int:
+    """Recalcula el contador donde no coincide con complejo_likes. Devuelve filas corregidas."""
+    corregidas = db.execute(_SQL_RECONCILIAR).all()
+    db.commit()
+    # SQL crudo: catalogo no lo ve, así que los perfiles cacheados se ajustan igual que en el toggle
+    for complejo_id, likes_count in corregidas:
+        catalogo.actualizar_likes(complejo_id, likes_count)
+    return len(corregidas)
+
+
+def reconciliar() -> int:
+    """Punto de entrada para la tarea periódica y el script."""
+    with SessionLocal() as db:
+        return reconciliar_likes_count(db)
@@ -0,0 +1,220 @@
+"""
+Límites de tasa para los endpoints de /auth (login, registro y OTP).
+
+Cada política define, por dimensión (`ip` y/o `email`), cuántas peticiones se
+aceptan por ventana (`LIMITE_*` en la config, formato "<peticiones>/<segundos>").
+Se cuenta con una ventana deslizante aproximada: dos ventanas fijas
+consecutivas y la anterior pesa lo que le falta por salir,
+
+    estimado = actual + anterior * (1 - transcurrido / ventana)
+
+así no hay ráfagas del doble en el borde de una ventana fija y basta con dos
+contadores por clave. Los rechazos también cuentan: quien sigue insistiendo
+sigue bloqueado hasta que baja el ritmo.
+
+`verificar` se llama al principio del endpoint, antes de bcrypt, de la base y
+del correo; si alguna dimensión se pasa responde 429 con `Retry-After`.
+
+Backends (`LIMITES_BACKEND`):
+
+- `memoria`: contadores en el proceso, acotados a
+  `LIMITES_MEMORIA_MAX_CLAVES` claves (se descartan las menos usadas). Cada
+  worker cuenta por su lado, el límite efectivo es el configurado por número
+  de workers.
+- `postgres`: tabla `contadores_limite`, compartida por todos los workers e
+  instancias, un solo upsert por dimensión. Si la base falla se deja pasar la
+  petición (el límite no debe tumbar el login); `barrer` borra las ventanas
+  vencidas.
+
+La IP es la que agregó el proxy propio (`deps.ip_confiable`, según
+`TRUSTED_PROXY_HOPS`), no la primera de X-Forwarded-For: esa la escribe el
+cliente y cambiándola en cada petición tendría un contador nuevo cada vez.
+Los valores (IP, email) se guardan como hash, nunca en claro.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, Request
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core import metricas
+from app.core.config import settings
+from app.core.deps import ip_confiable
+from app.db.conexion import engine
+from app.modelos.modelos import ContadorLimite
+
+logger = logging.getLogger("app.limites")
+
+_tabla = ContadorLimite.__table__
+
+
+@dataclass(frozen=True)
+class Limite:
+    peticiones: int
+    ventana_s: int
+
+    @classmethod
+    def parsear(cls, texto: str) -> "Limite | None":
+        """Parsea "10/600" -> Limite(10, 600); vacío o "0" -> None (sin límite)."""
+        texto = (texto or "").strip()
+        if not texto or texto == "0":
+            return None
+        try:
+            peticiones, ventana = (int(p) for p in texto.split("/", 1))
+        except ValueError:
+            raise ValueError(f"Límite inválido {texto!r}: se espera '<peticiones>/<segundos>'") from None
+        if peticiones <= 0 or ventana <= 0:
+            return None
+        return cls(peticiones, ventana)
+
+
+def _politicas() -> dict[str, dict[str, Limite | None]]:
+    return {
+        "login": {"ip": Limite.parsear(settings.LIMITE_LOGIN_IP), "email": Limite.parsear(settings.LIMITE_LOGIN_EMAIL)},
+        "registro": {"ip": Limite.parsear(settings.LIMITE_REGISTRO_IP)},
+        "otp": {"ip": Limite.parsear(settings.LIMITE_OTP_IP), "email": Limite.parsear(settings.LIMITE_OTP_EMAIL)},
+        "otp_verificar": {"ip": Limite.parsear(settings.LIMITE_OTP_VERIFICAR_IP)},
+    }
+
+
+POLITICAS = _politicas()
+
+
+class ContadoresMemoria:
+    """Contadores por clave en el proceso: [ventana, cuenta actual, cuenta de la anterior]."""
+
+    def __init__(self, max_claves: int):
+        self.max_claves = max_claves
+        self._datos: OrderedDict[str, list[int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def golpe(self, clave: str, ventana: int, ventana_s: int) -> tuple[int, int]:
+        """Suma una petición en `ventana` y devuelve (cuenta actual, cuenta de la ventana anterior)."""
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is None or item[0] < ventana - 1:
+                item = [ventana, 0, 0]
+                self._datos[clave] = item
+            elif item[0] == ventana - 1:
+                item[:] = [ventana, 0, item[1]]
+            item[1] += 1
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_claves:
+                self._datos.popitem(last=False)
+            return item[1], item[2]
+
+    def barrer(self) -> int:
+        return 0
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+
+class ContadoresPostgres:
+    """Contadores en `contadores_limite`, compartidos entre workers."""
+
+    def golpe(self, clave: str, ventana: int, ventana_s: int) -> tuple[int, int]:
+        expira_at = datetime.now(timezone.utc) + timedelta(seconds=2 * ventana_s)
+        anterior = (
+            select(_tabla.c.cuenta)
+            .where(_tabla.c.clave == clave, _tabla.c.ventana == ventana - 1)
+            .scalar_subquery()
+        )
+        stmt = pg_insert(_tabla).values(clave=clave, ventana=ventana, cuenta=1, expira_at=expira_at)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_tabla.c.clave, _tabla.c.ventana],
+            set_={"cuenta": _tabla.c.cuenta + 1},
+        ).returning(_tabla.c.cuenta, anterior)
+        try:
+            with engine.begin() as conn:
+                actual, previa = conn.execute(stmt).one()
+        except SQLAlchemyError:
+            logger.exception("No se pudo actualizar el contador de límite %s; se deja pasar", clave)
+            return 0, 0
+        return actual, previa or 0
+
+    def barrer(self) -> int:
+        with engine.begin() as conn:
+            res = conn.execute(delete(_tabla).where(_tabla.c.expira_at <= datetime.now(timezone.utc)))
+        return res.rowcount or 0
+
+    def limpiar(self) -> None:
+        with engine.begin() as conn:
+            conn.execute(delete(_tabla))
+
+
+def _crear_contadores(nombre: str):
+    if nombre == "memoria":
+        return ContadoresMemoria(settings.LIMITES_MEMORIA_MAX_CLAVES)
+    if nombre == "postgres":
+        return ContadoresPostgres()
+    raise ValueError(f"LIMITES_BACKEND inválido {nombre!r}: usa 'memoria' o 'postgres'")
+
+
+contadores = _crear_contadores(settings.LIMITES_BACKEND.strip().lower())
+
+
+def _clave(politica: str, dimension: str, valor: str) -> str:
+    huella = hashlib.sha256(valor.encode("utf-8")).hexdigest()[:32]
+    return f"{politica}:{dimension}:{huella}"
+
+
+def _espera(limite: Limite, actual: int, anterior: int, transcurrido: float) -> int:
+    """Segundos hasta que el estimado vuelva a quedar dentro del límite (sin nuevas peticiones)."""
+    if actual < limite.peticiones and anterior:
+        # basta con que la ventana anterior termine de salir lo suficiente
+        falta = 1 - (limite.peticiones - actual) / anterior - transcurrido
+        segundos = falta * limite.ventana_s
+    else:
+        # lo de esta ventana pasa a ser la "anterior" y tiene que ir saliendo
+        segundos = (1 - transcurrido) * limite.ventana_s
+        if actual > limite.peticiones:
+            segundos += (1 - limite.peticiones / actual) * limite.ventana_s
+    return max(1, math.ceil(segundos))
+
+
+def comprobar(politica: str, dimension: str, valor: str, ahora: float | None = None) -> int | None:
+    """Cuenta la petición; devuelve None si entra en el límite o los segundos de espera si no."""
+    limite = POLITICAS[politica].get(dimension)
+    if limite is None or not valor:
+        return None
+    ahora = time.time() if ahora is None else ahora
+    ventana, resto = divmod(ahora, limite.ventana_s)
+    transcurrido = resto / limite.ventana_s
+    actual, anterior = contadores.golpe(_clave(politica, dimension, valor), int(ventana), limite.ventana_s)
+    if actual + anterior * (1 - transcurrido) <= limite.peticiones:
+        return None
+    return _espera(limite, actual, anterior, transcurrido)
+
+
+def verificar(politica: str, request: Request, email: str | None = None) -> None:
+    """Aplica la política a la IP del cliente y, si viene, al email; 429 con `Retry-After` si se pasa."""
+    if not settings.LIMITES_ACTIVOS:
+        return
+    valores = {"ip": ip_confiable(request), "email": (email or "").strip().lower()}
+    for dimension in POLITICAS[politica]:
+        espera = comprobar(politica, dimension, valores[dimension])
+        if espera is not None:
+            metricas.LIMITE_RECHAZOS.labels(politica, dimension).inc()
+            raise HTTPException(
+                status_code=429,
+                detail="Demasiados intentos. Intenta de nuevo en unos minutos.",
+                headers={"Retry-After": str(espera)},
+            )
+
+
+def barrer() -> int:
+    """Tarea periódica: borra las ventanas vencidas del backend compartido. Devuelve cuántas borró."""
+    return contadores.barrer()
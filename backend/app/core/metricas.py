@@ -0,0 +1,154 @@
+"""
+Métricas Prometheus del backend (expuestas en /metrics).
+
+Todas las etiquetas son de cardinalidad acotada: plantillas de ruta (nunca la
+URL cruda), códigos de estado, operaciones de Culqi normalizadas y nombres de
+pool fijos.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+
+from app.db import conexion
+
+# -------- HTTP --------
+HTTP_DURACION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por plantilla de ruta",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_EN_CURSO = Gauge("http_requests_in_progress", "Peticiones HTTP en curso")
+HTTP_CONSULTAS_DB = Histogram(
+    "http_request_db_queries",
+    "Consultas SQL por petición",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+
+# -------- Culqi --------
+CULQI_DURACION = Histogram(
+    "culqi_request_duration_seconds",
+    "Latencia de las llamadas a la API de Culqi",
+    ["operation", "method"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 20, 30),
+)
+CULQI_ERRORES = Counter(
+    "culqi_request_errors_total",
+    "Llamadas a Culqi fallidas (red, 5xx, 4xx o respuesta inválida)",
+    ["operation", "kind"],
+)
+# -------- Circuit breakers (ver app/core/circuito.py) --------
+CIRCUITO_ESTADO = Gauge(
+    "circuit_breaker_state",
+    "Estado del circuit breaker: 0 cerrado, 1 semiabierto, 2 abierto",
+    ["circuit"],
+)
+CIRCUITO_APERTURAS = Counter("circuit_breaker_trips_total", "Veces que el circuit breaker se abrió", ["circuit"])
+CIRCUITO_RECHAZOS = Counter(
+    "circuit_breaker_rejected_total",
+    "Llamadas rechazadas sin intentar porque el circuit breaker estaba abierto",
+    ["circuit", "operation"],
+)
+WEBHOOK_LAG = Histogram(
+    "culqi_webhook_lag_seconds",
+    "Retraso entre la creación del evento en Culqi y su recepción",
+    buckets=(1, 5, 15, 30, 60, 300, 900, 3600, 21600, 86400),
+)
+WEBHOOK_DURACION = Histogram(
+    "culqi_webhook_processing_seconds",
+    "Tiempo de procesamiento de un webhook de Culqi",
+)
+
+# -------- Límites de tasa (ver app/core/limites.py) --------
+LIMITE_RECHAZOS = Counter(
+    "rate_limit_rejected_total",
+    "Peticiones rechazadas con 429 por un límite de tasa",
+    ["policy", "dimension"],
+)
+
+# -------- Imágenes / uploads --------
+IMAGEN_RESIZE = Histogram(
+    "image_resize_seconds",
+    "Tiempo de redimensionado de imágenes",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+UPLOAD_DURACION = Histogram(
+    "upload_duration_seconds",
+    "Tiempo de guardado de archivos subidos",
+    ["backend"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+UPLOAD_ERRORES = Counter("upload_errors_total", "Errores al guardar archivos subidos", ["backend"])
+
+# -------- Correo --------
+MAIL_DURACION = Histogram(
+    "mail_send_duration_seconds",
+    "Tiempo de envío de correos SMTP",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15),
+)
+MAIL_ENVIOS = Counter("mail_send_total", "Correos procesados por resultado", ["result"])
+
+
+@contextmanager
+def cronometrar(histograma, **labels):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrica = histograma.labels(**labels) if labels else histograma
+        metrica.observe(time.perf_counter() - inicio)
+
+
+_SEGMENTO_ID = re.compile(r"^[a-z]{2,4}_|\d")
+_SEGMENTO_VERSION = re.compile(r"^v\d+$")
+
+
+def operacion_culqi(path: str) -> str:
+    """`/v2/recurrent/subscriptions/sxn_live_x?a=b` -> `/v2/recurrent/subscriptions/{id}`."""
+    path = path.split("?", 1)[0]
+    partes = []
+    for seg in path.strip("/").split("/"):
+        if seg and not _SEGMENTO_VERSION.match(seg) and _SEGMENTO_ID.search(seg):
+            partes.append("{id}")
+        else:
+            partes.append(seg)
+    return "/" + "/".join(partes)
+
+
+class _ColectorPoolDB:
+    """Uso de los pools de conexiones, leído en cada scrape."""
+
+    def _pools(self):
+        pools = [("primaria", conexion.engine.pool), ("primaria_async", conexion.async_engine.sync_engine.pool)]
+        if conexion.replica_configurada():
+            pools.append(("replica", conexion.read_engine.pool))
+            pools.append(("replica_async", conexion.async_read_engine.sync_engine.pool))
+        return pools
+
+    def collect(self):
+        tamano = GaugeMetricFamily("db_pool_size", "Tamaño configurado del pool", labels=["pool"])
+        en_uso = GaugeMetricFamily("db_pool_checked_out", "Conexiones prestadas", labels=["pool"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Conexiones por encima del tamaño del pool", labels=["pool"])
+        for nombre, pool in self._pools():
+            if not hasattr(pool, "checkedout"):
+                continue
+            tamano.add_metric([nombre], pool.size())
+            en_uso.add_metric([nombre], pool.checkedout())
+            overflow.add_metric([nombre], max(0, pool.overflow()))
+        yield tamano
+        yield en_uso
+        yield overflow
+
+
+REGISTRY.register(_ColectorPoolDB())
+
+
+def exportar() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
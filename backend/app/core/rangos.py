@@ -0,0 +1,45 @@
+"""
+Filtro de solape de rangos de tiempo que aprovecha el índice GiST de reservas.
+
+`start_at <= fin AND end_at >= inicio` con btree solo acota uno de los dos
+extremos: el plan recorre todo el historial anterior a `fin`. En Postgres se
+emite en cambio `tsrange(start_at, end_at, '[]') && tsrange(inicio, fin, '[]')`
+(mismo resultado, pero es lo que indexa `ix_reservas_rango`, ver
+`app/db/init_db.py`); en otros motores queda la comparación simple.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import Boolean, and_, func, literal_column
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class solapa_rango(FunctionElement):
+    """`solapa_rango(col_inicio, col_fin, inicio, fin)`: intervalos cerrados que se cruzan."""
+
+    name = "solapa_rango"
+    type = Boolean()
+    inherit_cache = True
+
+
+def _partes(element):
+    col_inicio, col_fin, inicio, fin = element.clauses.clauses
+    return col_inicio, col_fin, inicio, fin
+
+
+@compiles(solapa_rango)
+def _comparacion(element, compiler, **kw):
+    col_inicio, col_fin, inicio, fin = _partes(element)
+    return compiler.process(and_(col_inicio <= fin, col_fin >= inicio).self_group(), **kw)
+
+
+@compiles(solapa_rango, "postgresql")
+def _tsrange(element, compiler, **kw):
+    col_inicio, col_fin, inicio, fin = _partes(element)
+    # literal en el SQL (no parámetro) para que la expresión coincida con la del índice
+    cerrado = literal_column("'[]'")
+    return compiler.process(
+        func.tsrange(col_inicio, col_fin, cerrado).op("&&")(func.tsrange(inicio, fin, cerrado)),
+        **kw,
+    )
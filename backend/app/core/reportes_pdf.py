@@ -0,0 +1,287 @@
+"""
+Motor de reportes PDF en tabla sobre reportlab, alimentado por un iterador de filas.
+
+Las filas se leen de la base por páginas (p. ej. `Query.yield_per`) y se
+dibujan al vuelo: no se arma la lista completa ni se guardan objetos ORM, solo
+los acumuladores de totales. reportlab, en cambio, no escribe por partes:
+cada página terminada queda en memoria como su contenido comprimido y el PDF
+entero se emite recién en `cerrar()` (`canvas.save()`), hacia `destino`
+(idealmente un `SpooledTemporaryFile`, que pasa a disco si crece). `respuesta`
+empieza a mandar bytes al cliente solo después de eso.
+
+Soporta:
+- columnas con ancho relativo, alineación y recorte por ancho real del texto,
+- encabezado de tabla repetido en cada página y pie con número de página,
+- subtotales al cambiar el grupo (p. ej. por día) en las columnas con total,
+- una página final de resumen con totales generales y por una clave (p. ej. cancha).
+"""
+
+from __future__ import annotations
+
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import IO, Any, Callable, Iterable, Iterator
+
+from fastapi.responses import StreamingResponse
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+FUENTE = "Helvetica"
+FUENTE_NEGRITA = "Helvetica-Bold"
+TAM = 8
+ALTO_FILA = 12
+MARGEN = 36
+MAX_EN_MEMORIA = 8 * 1024 * 1024  # el PDF pasa a un archivo temporal por encima de esto
+TROZO = 64 * 1024
+
+
+@dataclass
+class Columna:
+    titulo: str
+    valor: Callable[[Any], Any]
+    ancho: float = 1.0  # relativo al resto de columnas
+    alinear: str = "izq"  # "izq" | "der"
+    total: bool = False  # suma la columna en subtotales y resumen (valor numérico)
+    formato: Callable[[Any], str] = field(default=lambda v: "" if v is None else str(v))
+
+
+def soles(v) -> str:
+    return f"S/ {float(v or 0):,.2f}"
+
+
+def fecha_hora(v) -> str:
+    return v.strftime("%Y-%m-%d %H:%M") if isinstance(v, datetime) else ""
+
+
+@lru_cache(maxsize=8192)
+def _recortar(texto: str, ancho: float, fuente: str = FUENTE, tam: int = TAM) -> str:
+    # cacheado: nombres de cancha, estados y métodos se repiten en casi todas las filas
+    if stringWidth(texto, fuente, tam) <= ancho:
+        return texto
+    bajo, alto = 0, len(texto)
+    while bajo < alto:
+        medio = (bajo + alto + 1) // 2
+        if stringWidth(texto[:medio] + "…", fuente, tam) <= ancho:
+            bajo = medio
+        else:
+            alto = medio - 1
+    return texto[:bajo] + "…"
+
+
+class ReportePDF:
+    def __init__(
+        self,
+        destino: IO[bytes],
+        titulo: str,
+        columnas: list[Columna],
+        *,
+        subtitulo: str | None = None,
+        agrupar_por: Callable[[Any], str] | None = None,
+        resumir_por: Callable[[Any], str] | None = None,
+        titulo_resumen: str = "Resumen",
+        horizontal: bool = False,
+    ):
+        self.titulo = titulo
+        self.subtitulo = subtitulo
+        self.columnas = columnas
+        self.agrupar_por = agrupar_por
+        self.resumir_por = resumir_por
+        self.titulo_resumen = titulo_resumen
+        self.tam_pagina = landscape(A4) if horizontal else A4
+        self.c = canvas.Canvas(destino, pagesize=self.tam_pagina, pageCompression=1)
+        self.c.setTitle(titulo)
+
+        ancho_util = self.tam_pagina[0] - 2 * MARGEN
+        suma = sum(col.ancho for col in columnas)
+        self._anchos = [ancho_util * col.ancho / suma for col in columnas]
+        self._x = [MARGEN + sum(self._anchos[:i]) for i in range(len(columnas))]
+        self._totales_idx = [i for i, col in enumerate(columnas) if col.total]
+
+        self.pagina = 0
+        self.filas = 0
+        self._y = 0.0
+        self._grupo: str | None = None
+        self._sub_grupo = self._ceros()
+        self._filas_grupo = 0
+        self._total = self._ceros()
+        self._por_clave: OrderedDict[str, list] = OrderedDict()
+
+    # -------- dibujo --------
+    def _ceros(self) -> list[float]:
+        return [0.0] * len(self.columnas)
+
+    def _nueva_pagina(self) -> None:
+        if self.pagina:
+            self._pie()
+            self.c.showPage()
+        self.pagina += 1
+        alto = self.tam_pagina[1]
+        self._y = alto - MARGEN
+        if self.pagina == 1:
+            self.c.setFont(FUENTE_NEGRITA, 14)
+            self.c.drawString(MARGEN, self._y - 10, self.titulo)
+            self._y -= 24
+            if self.subtitulo:
+                self.c.setFont(FUENTE, 9)
+                self.c.drawString(MARGEN, self._y - 4, self.subtitulo)
+                self._y -= 16
+        self._encabezado()
+
+    def _encabezado(self) -> None:
+        self.c.setFont(FUENTE_NEGRITA, TAM)
+        self._celdas([col.titulo for col in self.columnas], negrita=True)
+        self.c.line(MARGEN, self._y + 3, self.tam_pagina[0] - MARGEN, self._y + 3)
+        self._y -= 2
+        self.c.setFont(FUENTE, TAM)
+
+    def _pie(self) -> None:
+        self.c.setFont(FUENTE, 7)
+        self.c.drawRightString(self.tam_pagina[0] - MARGEN, MARGEN / 2, f"{self.titulo} · Página {self.pagina}")
+
+    def _celdas(self, textos: list[str], *, negrita: bool = False) -> None:
+        fuente = FUENTE_NEGRITA if negrita else FUENTE
+        base = self._y - TAM
+        for i, texto in enumerate(textos):
+            ancho = self._anchos[i] - 4
+            texto = _recortar(texto, ancho, fuente)
+            if self.columnas[i].alinear == "der":
+                self.c.drawRightString(self._x[i] + self._anchos[i] - 2, base, texto)
+            else:
+                self.c.drawString(self._x[i] + 2, base, texto)
+        self._y -= ALTO_FILA
+
+    def _espacio(self, filas: int = 1) -> None:
+        if self.pagina == 0 or self._y - filas * ALTO_FILA < MARGEN:
+            self._nueva_pagina()
+
+    def _fila_totales(self, etiqueta: str, valores: list[float]) -> None:
+        self._espacio()
+        textos = [""] * len(self.columnas)
+        textos[0] = etiqueta
+        for i in self._totales_idx:
+            textos[i] = self.columnas[i].formato(valores[i])
+        self.c.setFont(FUENTE_NEGRITA, TAM)
+        self._celdas(textos, negrita=True)
+        self.c.setFont(FUENTE, TAM)
+
+    def _cerrar_grupo(self) -> None:
+        if self._grupo is not None and self._totales_idx:
+            self._fila_totales(f"Subtotal {self._grupo} ({self._filas_grupo})", self._sub_grupo)
+            self._y -= 4
+        self._sub_grupo = self._ceros()
+        self._filas_grupo = 0
+
+    # -------- API --------
+    def agregar(self, fila: Any) -> None:
+        if self.agrupar_por is not None:
+            grupo = self.agrupar_por(fila)
+            if grupo != self._grupo:
+                self._cerrar_grupo()
+                self._grupo = grupo
+        valores = [col.valor(fila) for col in self.columnas]
+        for i in self._totales_idx:
+            numero = float(valores[i] or 0)
+            self._sub_grupo[i] += numero
+            self._total[i] += numero
+        if self.resumir_por is not None:
+            acc = self._por_clave.setdefault(self.resumir_por(fila), [0, self._ceros()])
+            acc[0] += 1
+            for i in self._totales_idx:
+                acc[1][i] += float(valores[i] or 0)
+
+        self._espacio()
+        self._celdas([col.formato(v) for col, v in zip(self.columnas, valores)])
+        self.filas += 1
+        self._filas_grupo += 1
+
+    def cerrar(self) -> None:
+        if self.agrupar_por is not None:
+            self._cerrar_grupo()
+        if self._totales_idx and self.filas:
+            self._fila_totales(f"Total ({self.filas})", self._total)
+        if self.pagina == 0:
+            self._nueva_pagina()
+            self.c.drawString(MARGEN, self._y - TAM, "Sin registros para los filtros elegidos.")
+        self._resumen()
+        self._pie()
+        self.c.showPage()
+        self.c.save()
+
+    def _resumen(self) -> None:
+        if not self.filas or (self.resumir_por is None and not self._totales_idx):
+            return
+        self._pie()
+        self.c.showPage()
+        self.pagina += 1
+        self._y = self.tam_pagina[1] - MARGEN
+        self.c.setFont(FUENTE_NEGRITA, 13)
+        self.c.drawString(MARGEN, self._y - 10, f"{self.titulo_resumen} · {self.titulo}")
+        self._y -= 30
+
+        lineas = [("Registros", str(self.filas))]
+        lineas += [(f"Total {self.columnas[i].titulo}", self.columnas[i].formato(self._total[i])) for i in self._totales_idx]
+        self.c.setFont(FUENTE, 10)
+        for etiqueta, valor in lineas:
+            self.c.drawString(MARGEN, self._y, etiqueta)
+            self.c.drawRightString(MARGEN + 260, self._y, valor)
+            self._y -= 14
+
+        if self.resumir_por is None:
+            return
+        self._y -= 10
+        ancho = self.tam_pagina[0] - 2 * MARGEN
+        cols = 2 + len(self._totales_idx)
+        xs = [MARGEN + ancho * k / cols for k in range(cols)]
+        cabecera = ["", "Registros"] + [self.columnas[i].titulo for i in self._totales_idx]
+        for clave, (n, sumas) in [(None, (None, None)), *self._por_clave.items()]:
+            if self._y < MARGEN + ALTO_FILA:
+                self._pie()
+                self.c.showPage()
+                self.pagina += 1
+                self._y = self.tam_pagina[1] - MARGEN
+            if clave is None:
+                self.c.setFont(FUENTE_NEGRITA, 9)
+                textos = cabecera
+            else:
+                self.c.setFont(FUENTE, 9)
+                textos = [str(clave), str(n)] + [self.columnas[i].formato(sumas[i]) for i in self._totales_idx]
+            for k, texto in enumerate(textos):
+                if k == 0:
+                    self.c.drawString(xs[k], self._y, _recortar(texto, ancho / cols - 4, tam=9))
+                else:
+                    self.c.drawRightString(xs[k] + ancho / cols - 4, self._y, texto)
+            self._y -= ALTO_FILA
+
+
+def generar(destino: IO[bytes], titulo: str, columnas: list[Columna], filas: Iterable[Any], **opciones) -> ReportePDF:
+    reporte = ReportePDF(destino, titulo, columnas, **opciones)
+    for fila in filas:
+        reporte.agregar(fila)
+    reporte.cerrar()
+    return reporte
+
+
+def respuesta(titulo: str, columnas: list[Columna], filas: Iterable[Any], filename: str, **opciones) -> StreamingResponse:
+    """Genera el reporte en un archivo temporal (en memoria hasta MAX_EN_MEMORIA) y lo entrega por trozos."""
+    destino = tempfile.SpooledTemporaryFile(max_size=MAX_EN_MEMORIA)
+    try:
+        generar(destino, titulo, columnas, filas, **opciones)
+    except Exception:
+        destino.close()
+        raise
+    destino.seek(0)
+
+    def _trozos() -> Iterator[bytes]:
+        with destino:
+            while trozo := destino.read(TROZO):
+                yield trozo
+
+    return StreamingResponse(
+        _trozos(),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,91 @@
+"""
+Texto de búsqueda precalculado de reservas (`reservas.search_text`).
+
+El buscador del panel filtra por cliente (nombre, apellido, email), estado de
+pago y nombre de la cancha. En vez de `lower(...) LIKE '%x%'` sobre cada
+columna con joins (barrido secuencial de todo el historial del dueño), esos
+campos se concatenan ya normalizados en una sola columna con índice GIN
+`pg_trgm`, que resuelve el `LIKE '%x%'` por trigramas.
+
+La columna se mantiene sola desde la sesión: en cada flush se recalcula para
+las reservas creadas o con cliente/cancha/estado cambiados, y para todas las
+reservas de un usuario o cancha cuyo nombre/email cambió. Las inserciones
+masivas fuera del ORM deben llamar a `recalcular` (ver `bench/semilla.py`).
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app.modelos.modelos import Cancha, Reserva, User
+
+# misma tabla en SQL (translate) y en Python (str.translate) para que el término y la columna coincidan
+_CON_TILDE = "ÁÉÍÓÚÜÑáéíóúüñ"
+_SIN_TILDE = "AEIOUUNaeiouun"
+_TABLA = str.maketrans(_CON_TILDE, _SIN_TILDE)
+
+_CAMPOS_RESERVA = ("cliente_id", "cancha_id", "payment_status")
+_CAMPOS_USER = ("first_name", "last_name", "email")
+
+
+def normalizar(valor: str) -> str:
+    return (valor or "").translate(_TABLA).lower()
+
+
+def _expresion():
+    cliente = (
+        select(func.concat_ws(" ", User.first_name, User.last_name, User.email))
+        .where(User.id == Reserva.cliente_id)
+        .scalar_subquery()
+    )
+    cancha = select(Cancha.nombre).where(Cancha.id == Reserva.cancha_id).scalar_subquery()
+    texto = func.concat_ws(" ", cliente, Reserva.payment_status, cancha)
+    return func.lower(func.translate(texto, _CON_TILDE, _SIN_TILDE))
+
+
+def recalcular(conn, *condiciones) -> int:
+    """UPDATE de `search_text` para las reservas que cumplen `condiciones` (todas si no hay)."""
+    tabla = Reserva.__table__
+    # updated_at explícito: recalcular el índice no es una modificación de la reserva
+    stmt = update(tabla).values(search_text=_expresion(), updated_at=tabla.c.updated_at)
+    if condiciones:
+        stmt = stmt.where(*condiciones)
+    return conn.execute(stmt).rowcount
+
+
+def filtro(search: str):
+    return Reserva.search_text.like(f"%{normalizar(search.strip())}%")
+
+
+def _modificado(obj, campos: tuple[str, ...]) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[c].history.has_changes() for c in campos)
+
+
+@event.listens_for(Session, "after_flush")
+def _sincronizar(session: Session, flush_context) -> None:
+    reservas: set[int] = set()
+    usuarios: set[int] = set()
+    canchas: set[int] = set()
+    for obj in session.new:
+        if isinstance(obj, Reserva):
+            reservas.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Reserva) and _modificado(obj, _CAMPOS_RESERVA):
+            reservas.add(obj.id)
+        elif isinstance(obj, User) and _modificado(obj, _CAMPOS_USER):
+            usuarios.add(obj.id)
+        elif isinstance(obj, Cancha) and _modificado(obj, ("nombre",)):
+            canchas.add(obj.id)
+    if not (reservas or usuarios or canchas):
+        return
+
+    # SQL directo sobre la conexión: no vuelve a disparar eventos ORM
+    conn = session.connection()
+    if reservas:
+        recalcular(conn, Reserva.id.in_(reservas))
+    if usuarios:
+        recalcular(conn, Reserva.cliente_id.in_(usuarios))
+    if canchas:
+        recalcular(conn, Reserva.cancha_id.in_(canchas))
@@ -0,0 +1,83 @@
+"""
+Secretos Culqi de los propietarios ya descifrados, en un cache corto en proceso.
+
+El checkout descifra la `culqi_sk` del propietario en cada cobro; con el
+cache se descifra una vez cada `CULQI_SK_CACHE_TTL_SECONDS`. La clave del
+cache incluye el token cifrado, así que un cambio de la sk (aunque lo haga
+otro worker) nunca devuelve la anterior; `invalidar` además la borra de
+memoria en el worker que atendió `PUT /panel/utilitarios/culqi`.
+
+`reencriptar` es la tarea de rotación: pasa a la clave vigente los tokens que
+sigan cifrados con una clave anterior (ver `app.core.crypto`).
+"""
+
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import update
+
+from app.core.cache import CacheTTL
+from app.core.config import settings
+from app.core.crypto import decrypt_secret, necesita_rotacion, rotar_token
+from app.db.conexion import SessionLocal
+from app.modelos.modelos import PaymentIntegration
+
+logger = logging.getLogger("app.secretos")
+
+LOTE = 500
+
+_culqi_sk: CacheTTL[str] = CacheTTL(max_items=settings.CULQI_SK_CACHE_MAX, ttl_s=settings.CULQI_SK_CACHE_TTL_SECONDS)
+
+
+def culqi_sk(integ: PaymentIntegration) -> str:
+    """sk en claro de la integración; ValueError si no se puede descifrar."""
+    clave = (integ.user_id, integ.culqi_sk_enc)
+    sk = _culqi_sk.get(clave)
+    if sk is None:
+        sk = decrypt_secret(integ.culqi_sk_enc)
+        _culqi_sk.set(clave, sk)
+    return sk
+
+
+def invalidar(user_id: int) -> None:
+    _culqi_sk.invalidar_donde(lambda clave, _: clave[0] == user_id)
+
+
+def reencriptar() -> int:
+    """Re-cifra con la clave vigente las sk cifradas con claves anteriores. Devuelve cuántas cambió."""
+    if not (settings.DATA_ENCRYPTION_KEYS_ANTERIORES or "").strip():
+        return 0
+    cambiadas = 0
+    ultimo_id = 0
+    with SessionLocal() as db:
+        while True:
+            filas = (
+                db.query(PaymentIntegration.id, PaymentIntegration.culqi_sk_enc)
+                .filter(PaymentIntegration.id > ultimo_id, PaymentIntegration.culqi_sk_enc.isnot(None))
+                .order_by(PaymentIntegration.id)
+                .limit(LOTE)
+                .all()
+            )
+            if not filas:
+                break
+            ultimo_id = filas[-1].id
+            for integ_id, token in filas:
+                if not necesita_rotacion(token):
+                    continue
+                try:
+                    nuevo = rotar_token(token)
+                except ValueError:
+                    logger.warning("culqi_sk de la integración %s no se descifra con ninguna clave", integ_id)
+                    continue
+                # condicionado al token leído: si el propietario la cambió entretanto, se respeta
+                res = db.execute(
+                    update(PaymentIntegration)
+                    .where(PaymentIntegration.id == integ_id, PaymentIntegration.culqi_sk_enc == token)
+                    .values(culqi_sk_enc=nuevo)
+                )
+                cambiadas += res.rowcount or 0
+            db.commit()
+    if cambiadas:
+        logger.info("Secretos re-cifrados con la clave vigente: %s", cambiadas)
+    return cambiadas
@@ -1,5 +1,37 @@
+"""
+Slugs: normalización y reserva de slugs únicos para complejos.
+
+`reservar` entrega un slug libre en una sola sentencia: un
+`INSERT ... ON CONFLICT DO UPDATE ... RETURNING` sobre `slug_contadores`
+(un contador de sufijos por base). La primera vez que se usa una base sale
+tal cual ("la-bombonera"), las siguientes con sufijo ("la-bombonera-2", ...).
+`reservar_lote` hace lo mismo para miles de nombres con una sola sentencia,
+para importaciones del catálogo.
+
+El contador no sabe de slugs editados a mano (que pueden pisar un
+"base-n" futuro): `insertar_complejo` reintenta con el siguiente número si el
+índice único de `complejos.slug` rechaza el alta, y `reservar_lote` descarta
+los que ya existen antes de devolverlos.
+"""
+
 import re
 import unicodedata
+from collections import Counter
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.modelos.modelos import Complejo, SlugContador
+
+# deja lugar para el sufijo dentro de complejos.slug (220)
+LARGO_BASE = 200
+# bases distintas por sentencia (2 parámetros por base)
+LOTE_CONTADORES = 5_000
+INTENTOS = 5
+
+_tabla = SlugContador.__table__
 
 
 def slugify(value: str) -> str:
@@ -7,3 +39,88 @@ def slugify(value: str) -> str:
     ascii_value = normalized.encode("ascii", "ignore").decode("ascii")
     cleaned = re.sub(r"[^a-zA-Z0-9]+", "-", ascii_value).strip("-").lower()
     return cleaned
+
+
+def normalizar_texto(value: str) -> str:
+    """Minúsculas, sin tildes y con cualquier separador convertido en un espacio.
+
+    Misma normalización que `slugify`, pensada para búsquedas: "Ñandú  F-7" -> "nandu f 7".
+    """
+    normalized = unicodedata.normalize("NFKD", value or "")
+    ascii_value = normalized.encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", " ", ascii_value.lower()).strip()
+
+
+def base_complejo(nombre: str) -> str:
+    return slugify(nombre)[:LARGO_BASE].strip("-") or "complejo"
+
+
+def _con_sufijo(base: str, numero: int) -> str:
+    return base if numero == 0 else f"{base}-{numero + 1}"
+
+
+def _reservar_bases(db: Session, cantidades: dict[str, int]) -> dict[str, int]:
+    """Reserva `cantidades[base]` números seguidos por base. Devuelve el último número de cada base."""
+    ins = pg_insert(_tabla)
+    # base nueva: 0..k-1; base existente con último u: u+1..u+k
+    ins = ins.on_conflict_do_update(
+        index_elements=[_tabla.c.base],
+        set_={"ultimo": _tabla.c.ultimo + ins.excluded.ultimo + 1},
+    ).returning(_tabla.c.base, _tabla.c.ultimo)
+    # executemany con RETURNING: SQLAlchemy lo manda como un INSERT multi-fila por página
+    filas = db.execute(
+        ins.execution_options(insertmanyvalues_page_size=LOTE_CONTADORES),
+        [{"base": b, "ultimo": k - 1} for b, k in cantidades.items()],
+    )
+    return dict(filas.tuples().all())
+
+
+def reservar(db: Session, nombre: str) -> str:
+    """Slug para un complejo nuevo con ese nombre, en una sentencia dentro de la transacción de `db`."""
+    base = base_complejo(nombre)
+    return _con_sufijo(base, _reservar_bases(db, {base: 1})[base])
+
+
+def reservar_lote(db: Session, nombres: list[str]) -> list[str]:
+    """Un slug libre por nombre (mismo orden), con una sentencia por ronda para todo el lote.
+
+    Comprueba contra `complejos` los slugs entregados y vuelve a reservar los
+    que ya estaban tomados (editados a mano); en la práctica una sola ronda.
+    """
+    bases = [base_complejo(n) for n in nombres]
+    slugs: list[str | None] = [None] * len(bases)
+    pendientes = list(range(len(bases)))
+    for _ in range(INTENTOS):
+        cantidades = Counter(bases[i] for i in pendientes)
+        ultimos = _reservar_bases(db, cantidades)
+        siguiente = {b: ultimos[b] - k + 1 for b, k in cantidades.items()}
+        for i in pendientes:
+            slugs[i] = _con_sufijo(bases[i], siguiente[bases[i]])
+            siguiente[bases[i]] += 1
+
+        candidatos = {slugs[i] for i in pendientes}
+        tomados = set(db.execute(select(Complejo.slug).where(Complejo.slug.in_(candidatos))).scalars())
+        # una base sola puede coincidir con el sufijo de otra ("club-2" vs "club" n.º 2)
+        vistos: set[str] = set()
+        repetir = []
+        for i, s in enumerate(slugs):
+            if s in tomados or s in vistos:
+                repetir.append(i)
+            vistos.add(s)
+        if not repetir:
+            return slugs
+        pendientes = repetir
+    raise RuntimeError("No se pudieron reservar slugs únicos para el lote")
+
+
+def insertar_complejo(db: Session, complejo: Complejo, nombre: str) -> Complejo:
+    """Agrega el complejo con un slug reservado; si el slug choca con uno editado a mano, toma el siguiente."""
+    for intento in range(INTENTOS):
+        complejo.slug = reservar(db, nombre)
+        try:
+            with db.begin_nested():
+                db.add(complejo)
+            return complejo
+        except IntegrityError as exc:
+            if "slug" not in str(exc.orig) or intento == INTENTOS - 1:
+                raise
@@ -0,0 +1,64 @@
+"""
+Tareas periódicas en proceso.
+
+Cada tarea es una función síncrona que se ejecuta en el threadpool cada
+`intervalo_s` segundos mientras la app está arriba. Con varios workers cada
+uno corre su propia copia, así que las tareas deben ser idempotentes (p. ej.
+reconciliaciones) o usar un lock en BD.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+logger = logging.getLogger("app.tareas")
+
+
+@dataclass
+class TareaPeriodica:
+    nombre: str
+    intervalo_s: float
+    funcion: Callable[[], object]
+    retraso_inicial_s: float = 0.0
+
+
+_tareas: list[TareaPeriodica] = []
+_en_curso: list[asyncio.Task] = []
+
+
+def registrar_periodica(nombre: str, intervalo_s: float, funcion: Callable[[], object], *, retraso_inicial_s: float = 0.0) -> None:
+    """Registra una tarea; un intervalo <= 0 la deja deshabilitada."""
+    if intervalo_s <= 0:
+        logger.info("Tarea %s deshabilitada (intervalo %s)", nombre, intervalo_s)
+        return
+    _tareas.append(TareaPeriodica(nombre, intervalo_s, funcion, retraso_inicial_s))
+
+
+async def _bucle(tarea: TareaPeriodica) -> None:
+    if tarea.retraso_inicial_s:
+        await asyncio.sleep(tarea.retraso_inicial_s)
+    while True:
+        try:
+            resultado = await asyncio.to_thread(tarea.funcion)
+            logger.info("Tarea %s ejecutada: %s", tarea.nombre, resultado)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Tarea %s falló", tarea.nombre)
+        await asyncio.sleep(tarea.intervalo_s)
+
+
+def iniciar_tareas() -> None:
+    loop = asyncio.get_running_loop()
+    for tarea in _tareas:
+        _en_curso.append(loop.create_task(_bucle(tarea), name=f"tarea:{tarea.nombre}"))
+
+
+async def detener_tareas() -> None:
+    for t in _en_curso:
+        t.cancel()
+    await asyncio.gather(*_en_curso, return_exceptions=True)
+    _en_curso.clear()
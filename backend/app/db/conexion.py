@@ -1,4 +1,8 @@
+import threading
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
@@ -13,6 +17,71 @@ def normalize_db_url(url: str) -> str:
 
 
 DATABASE_URL = normalize_db_url(settings.DATABASE_URL)
+DATABASE_READ_URL = normalize_db_url(settings.DATABASE_READ_URL.strip())
 
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+# ✅ Réplica de solo lectura; sin DATABASE_READ_URL se reutiliza la primaria
+read_engine = (
+    create_engine(
+        DATABASE_READ_URL,
+        pool_pre_ping=True,
+        execution_options={"postgresql_readonly": True},
+    )
+    if DATABASE_READ_URL
+    else engine
+)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+
+# ✅ Camino async (psycopg3) para los endpoints públicos más calientes: no ocupan
+# un hilo del threadpool mientras esperan a Postgres.
+async_engine = create_async_engine(DATABASE_URL, pool_pre_ping=True)
+async_read_engine = (
+    create_async_engine(
+        DATABASE_READ_URL,
+        pool_pre_ping=True,
+        execution_options={"postgresql_readonly": True},
+    )
+    if DATABASE_READ_URL
+    else async_engine
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+def replica_configurada() -> bool:
+    return read_engine is not engine
+
+
+# -------- Guardia de lag de replicación (read-your-writes) --------
+_MAX_CLIENTES_ESCRITURA = 10_000
+_escrituras_recientes: dict[str, float] = {}
+_escrituras_lock = threading.Lock()
+
+
+def registrar_escritura(clave: str) -> None:
+    """
+    Marca que el cliente `clave` acaba de escribir en la primaria; durante
+    READ_AFTER_WRITE_SECONDS sus lecturas no irán a la réplica.
+    """
+    if not replica_configurada() or not clave:
+        return
+    ahora = time.monotonic()
+    ventana = max(0, settings.READ_AFTER_WRITE_SECONDS)
+    with _escrituras_lock:
+        _escrituras_recientes[clave] = ahora
+        if len(_escrituras_recientes) > _MAX_CLIENTES_ESCRITURA:
+            vencidas = [k for k, t in _escrituras_recientes.items() if ahora - t > ventana]
+            for k in vencidas:
+                _escrituras_recientes.pop(k, None)
+
+
+def escritura_reciente(clave: str) -> bool:
+    if not replica_configurada() or not clave:
+        return False
+    with _escrituras_lock:
+        marca = _escrituras_recientes.get(clave)
+    if marca is None:
+        return False
+    return time.monotonic() - marca <= max(0, settings.READ_AFTER_WRITE_SECONDS)
@@ -4,11 +4,26 @@ from app.db.conexion import SessionLocal, engine
 from sqlalchemy import text
 from app.modelos.base import Base
 import app.modelos.modelos  # noqa: F401
-from app.modelos.modelos import Plan
+from app.modelos.modelos import Plan, Reserva
+from app.core.estadisticas import recalcular_rango as recalcular_estadisticas
+from app.core.likes import reconciliar as reconciliar_likes
+from app.core import reservas_busqueda
 from app.scripts.bootstrap_db import bootstrap_ubigeo
 
 logger = logging.getLogger(__name__)
 
+# filtros del panel: rango por cancha, pagos Culqi, solape de fechas (ver app/core/rangos.py) y FKs de los joins
+INDICES_PANEL = (
+    "CREATE INDEX IF NOT EXISTS ix_reservas_cancha_start ON public.reservas (cancha_id, start_at)",
+    "CREATE INDEX IF NOT EXISTS ix_reservas_culqi_cancha_start "
+    "ON public.reservas (cancha_id, start_at) WHERE payment_method = 'culqi'",
+    "CREATE INDEX IF NOT EXISTS ix_reservas_rango ON public.reservas USING gist (tsrange(start_at, end_at, '[]'))",
+    "CREATE INDEX IF NOT EXISTS ix_reservas_cliente_id ON public.reservas (cliente_id)",
+    "CREATE INDEX IF NOT EXISTS ix_canchas_complejo_id ON public.canchas (complejo_id)",
+    "CREATE INDEX IF NOT EXISTS ix_canchas_owner_id ON public.canchas (owner_id)",
+    "CREATE INDEX IF NOT EXISTS ix_complejos_owner_id ON public.complejos (owner_id)",
+)
+
 
 def _ensure_plan(db_session, codigo: str, defaults: dict) -> Plan:
     plan = db_session.query(Plan).filter(Plan.codigo == codigo).first()
@@ -78,6 +93,70 @@ END $$;
             conn.execute(text("ALTER TABLE public.payment_integrations DROP COLUMN IF EXISTS culqi_sk"))
     except Exception as exc:
         logger.warning("Add payment_ref failed: %s", exc)
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text("ALTER TABLE public.complejos ADD COLUMN IF NOT EXISTS likes_count INTEGER NOT NULL DEFAULT 0")
+            )
+            # el índice único no se puede crear con duplicados previos: se conserva el like más antiguo
+            conn.execute(
+                text(
+                    "DELETE FROM public.complejo_likes a USING public.complejo_likes b "
+                    "WHERE a.complejo_id = b.complejo_id AND a.user_id = b.user_id AND a.id > b.id"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS uq_complejo_likes_complejo_user "
+                    "ON public.complejo_likes (complejo_id, user_id)"
+                )
+            )
+        reconciliar_likes()
+    except Exception as exc:
+        logger.warning("Likes count migration failed: %s", exc)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE public.reservas ADD COLUMN IF NOT EXISTS search_text TEXT"))
+            reservas_busqueda.recalcular(conn, Reserva.search_text.is_(None))
+    except Exception as exc:
+        logger.warning("Reservas search_text migration failed: %s", exc)
+    try:
+        # aparte: sin permisos para CREATE EXTENSION la búsqueda sigue funcionando, solo sin índice
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_reservas_search_text_trgm "
+                    "ON public.reservas USING gin (search_text gin_trgm_ops)"
+                )
+            )
+    except Exception as exc:
+        logger.warning("Reservas search trigram index failed: %s", exc)
+    try:
+        with engine.begin() as conn:
+            for ddl in INDICES_PANEL:
+                conn.execute(text(ddl))
+    except Exception as exc:
+        logger.warning("Panel indexes migration failed: %s", exc)
+    try:
+        # los slugs existentes (o editados a mano fuera de la app) cuentan como bases tomadas
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO public.slug_contadores (base, ultimo) "
+                    "SELECT slug, 0 FROM public.complejos ON CONFLICT (base) DO NOTHING"
+                )
+            )
+    except Exception as exc:
+        logger.warning("Slug counters backfill failed: %s", exc)
+    try:
+        # primera vez: la tabla la crea create_all vacía y se llena desde el historial
+        with engine.connect() as conn:
+            vacia = conn.execute(text("SELECT NOT EXISTS (SELECT 1 FROM public.estadisticas_diarias)")).scalar()
+        if vacia:
+            recalcular_estadisticas()
+    except Exception as exc:
+        logger.warning("Estadisticas backfill failed: %s", exc)
     try:
         bootstrap_ubigeo()
     except Exception as exc:
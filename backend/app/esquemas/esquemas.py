@@ -249,6 +249,7 @@ class ComplejoOut(BaseModel):
 
     is_active: bool
     owner_id: Optional[int] = None
+    likes_count: int = 0
 
 class ComplejoPublicOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -275,10 +276,34 @@ class ComplejoPublicOut(BaseModel):
     owner_phone: Optional[str] = None
     culqi_enabled: Optional[bool] = None
     culqi_pk: Optional[str] = None
+    likes_count: int = 0
 
     canchas: list[CanchaOut] = Field(default_factory=list)
 
 
+class ComplejoCercaOut(BaseModel):
+    id: int
+    nombre: str
+    slug: str
+    distrito: Optional[str] = None
+    provincia: Optional[str] = None
+    departamento: Optional[str] = None
+    foto_url: Optional[str] = None
+    latitud: float
+    longitud: float
+    distancia_km: float
+
+
+class ResultadoBusquedaOut(BaseModel):
+    tipo: str  # complejo | cancha
+    id: int
+    nombre: str
+    slug: Optional[str] = None  # slug del complejo (también para canchas)
+    complejo_id: Optional[int] = None
+    distrito: Optional[str] = None
+    score: Optional[float] = None
+
+
 class ComplejoImagenOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -375,9 +400,10 @@ class ReservaOut(BaseModel):
 
 class PagosPageOut(BaseModel):
     items: list[ReservaOut] = Field(default_factory=list)
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 class PlanActualOut(BaseModel):
     plan_id: int
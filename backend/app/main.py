@@ -1,11 +1,24 @@
 from pathlib import Path
+import hmac
+import time
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import logging
 
 from app.core.config import settings
+from app.core.deps import clave_cliente
+from app.core.instrumentacion import finalizar_medicion, iniciar_medicion, registrar_peticion
+from app.core import metricas
+from app.core.bloqueos import barrer as barrer_bloqueos
+from app.core.estadisticas import reconciliar as reconciliar_estadisticas
+from app.core.idempotencia import barrer as barrer_idempotencia
+from app.core.likes import reconciliar as reconciliar_likes
+from app.core.limites import ContadoresPostgres, barrer as barrer_limites, contadores as contadores_limite
+from app.core.secretos import reencriptar as reencriptar_secretos
+from app.core.tareas import detener_tareas, iniciar_tareas, registrar_periodica
+from app.db.conexion import registrar_escritura
 from app.routers.auth import router as auth_router
 from app.routers.canchas_publicas import router as canchas_publicas_router
 from app.routers.complejos_publicos import router as complejos_publicos_router
@@ -21,6 +34,9 @@ from app.routers.ubigeo import router as ubigeo_router
 from app.routers.pagos_culqi import router as pagos_culqi_router
 from app.routers.utilitarios import router as utilitarios_router
 from app.routers.webhooks_culqi import router as webhooks_culqi_router
+from app.routers.admin_diagnostico import router as admin_diagnostico_router
+from app.routers.busqueda import router as busqueda_router
+from app.routers.calendario import router as calendario_router
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("app")
@@ -57,6 +73,41 @@ app.add_middleware(
     max_age=86400,  # ✅ cachea el preflight (OPTIONS) 24h
 )
 
+METODOS_ESCRITURA = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+@app.middleware("http")
+async def guardia_lectura_escritura(request: Request, call_next):
+    # ✅ tras una escritura exitosa, las lecturas del mismo cliente van a la primaria un rato
+    response = await call_next(request)
+    if request.method in METODOS_ESCRITURA and response.status_code < 400:
+        registrar_escritura(clave_cliente(request))
+    return response
+
+
+@app.middleware("http")
+async def medir_peticion(request: Request, call_next):
+    # ✅ nº de consultas y tiempo de BD por petición (Server-Timing + agregados por ruta)
+    # ✅ y métricas Prometheus por plantilla de ruta
+    medicion, token = iniciar_medicion(request.scope)
+    inicio = time.perf_counter()
+    status = 500
+    metricas.HTTP_EN_CURSO.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        finalizar_medicion(token)
+        metricas.HTTP_EN_CURSO.dec()
+        duracion = time.perf_counter() - inicio
+        metricas.HTTP_DURACION.labels(request.method, medicion.ruta, str(status)).observe(duracion)
+        metricas.HTTP_CONSULTAS_DB.labels(medicion.ruta).observe(medicion.consultas)
+    total_ms = duracion * 1000
+    registrar_peticion(medicion, request.method, total_ms)
+    response.headers["Server-Timing"] = medicion.server_timing(total_ms)
+    response.headers["X-DB-Queries"] = str(medicion.consultas)
+    return response
+
 
 # ✅ Routers
 app.include_router(auth_router)
@@ -73,12 +124,70 @@ app.include_router(ubigeo_router)
 app.include_router(pagos_culqi_router)
 app.include_router(utilitarios_router)
 app.include_router(webhooks_culqi_router)
+app.include_router(admin_diagnostico_router)
+app.include_router(busqueda_router)
+app.include_router(calendario_router)
 
 @app.get("/healthz")
 def health():
     return {"ok": True}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    # sin token no se publica: las métricas muestran tráfico por ruta, pools y errores de Culqi
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    esperado = f"Bearer {settings.METRICS_TOKEN}"
+    if not hmac.compare_digest(request.headers.get("authorization", ""), esperado):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    data, content_type = metricas.exportar()
+    return Response(content=data, media_type=content_type)
+
+
 @app.on_event("startup")
 def on_startup():
     init_db()
+
+
+@app.on_event("startup")
+async def arrancar_tareas():
+    registrar_periodica(
+        "reconciliar_likes",
+        settings.LIKES_RECONCILIAR_MINUTOS * 60,
+        reconciliar_likes,
+        retraso_inicial_s=settings.LIKES_RECONCILIAR_MINUTOS * 60,
+    )
+    registrar_periodica(
+        "reconciliar_estadisticas",
+        settings.ESTADISTICAS_RECONCILIAR_MINUTOS * 60,
+        reconciliar_estadisticas,
+    )
+    registrar_periodica(
+        "barrer_idempotencia",
+        settings.IDEMPOTENCIA_BARRER_MINUTOS * 60,
+        barrer_idempotencia,
+    )
+    registrar_periodica(
+        "barrer_bloqueos",
+        settings.BLOQUEOS_BARRER_MINUTOS * 60,
+        barrer_bloqueos,
+    )
+    if isinstance(contadores_limite, ContadoresPostgres):
+        registrar_periodica(
+            "barrer_limites",
+            settings.LIMITES_BARRER_MINUTOS * 60,
+            barrer_limites,
+        )
+    if settings.DATA_ENCRYPTION_KEYS_ANTERIORES.strip():
+        registrar_periodica(
+            "reencriptar_secretos",
+            settings.REENCRIPTAR_SECRETOS_MINUTOS * 60,
+            reencriptar_secretos,
+        )
+    iniciar_tareas()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await detener_tareas()
@@ -7,7 +7,11 @@ from sqlalchemy import (
     Numeric,
     Integer,
     DateTime,
+    Date,
+    JSON,
     ForeignKey,
+    Index,
+    UniqueConstraint,
     func,
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
@@ -125,7 +129,10 @@ class Complejo(Base):
     
     is_active = Column(Boolean, nullable=False, default=True)
 
-    owner_id = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    # contador desnormalizado de complejo_likes (ver app/core/likes.py)
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    owner_id = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
     created_by = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     
     owner = relationship("User", back_populates="complejos", foreign_keys=[owner_id])
@@ -183,13 +190,13 @@ class Cancha(Base):
     rating = Column(Numeric(3, 2), nullable=False, default=0)
     is_active = Column(Boolean, nullable=False, default=True)
 
-    owner_id = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    owner_id = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
     created_by = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
-    complejo_id = Column(BigInteger, ForeignKey("complejos.id", ondelete="SET NULL"), nullable=True)
+    complejo_id = Column(BigInteger, ForeignKey("complejos.id", ondelete="SET NULL"), nullable=True, index=True)
 
     complejo = relationship("Complejo", back_populates="canchas")
     owner = relationship("User", back_populates="canchas", foreign_keys=[owner_id])
@@ -309,6 +316,7 @@ class ComplejoImagen(Base):
 # =========================
 class ComplejoLike(Base):
     __tablename__ = "complejo_likes"
+    __table_args__ = (UniqueConstraint("complejo_id", "user_id", name="uq_complejo_likes_complejo_user"),)
 
     id = Column(BigInteger, primary_key=True, autoincrement=True, index=True)
     complejo_id = Column(BigInteger, ForeignKey("complejos.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -346,7 +354,7 @@ class Reserva(Base):
     id = Column(BigInteger, primary_key=True, autoincrement=True)
 
     cancha_id = Column(BigInteger, ForeignKey("canchas.id", ondelete="CASCADE"), nullable=False, index=True)
-    cliente_id = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    cliente_id = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
 
     start_at = Column(DateTime, nullable=False)  # TIMESTAMP (naive)
     end_at = Column(DateTime, nullable=False)
@@ -359,6 +367,8 @@ class Reserva(Base):
     payment_ref = Column(String(120))
 
     notas = Column(Text)
+    # cliente + estado + cancha normalizados, para el buscador del panel (ver app.core.reservas_busqueda)
+    search_text = Column(Text)
 
     created_by = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
 
@@ -382,6 +392,83 @@ class Reserva(Base):
         return self.cancha.complejo.nombre if (self.cancha and self.cancha.complejo) else None
 
 
+# =========================
+# Contadores de sufijos de slug por base (ver app/core/slug.py)
+# =========================
+class SlugContador(Base):
+    __tablename__ = "slug_contadores"
+
+    base = Column(String(220), primary_key=True)
+    # 0 = la base sola ya está tomada; n = el último sufijo entregado fue "-n"
+    ultimo = Column(Integer, nullable=False, default=0)
+
+
+# =========================
+# Bloqueos de horario durante el checkout (ver app/core/bloqueos.py)
+# =========================
+class BloqueoHorario(Base):
+    __tablename__ = "bloqueos_horario"
+    __table_args__ = (Index("ix_bloqueos_horario_cancha_start", "cancha_id", "start_at"),)
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    cancha_id = Column(BigInteger, ForeignKey("canchas.id", ondelete="CASCADE"), nullable=False)
+
+    start_at = Column(DateTime, nullable=False)  # mismas horas naive que reservas
+    end_at = Column(DateTime, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expira_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+# =========================
+# Estadísticas (rollups diarios por cancha, ver app/core/estadisticas.py)
+# =========================
+class EstadisticaDiaria(Base):
+    __tablename__ = "estadisticas_diarias"
+
+    cancha_id = Column(BigInteger, ForeignKey("canchas.id", ondelete="CASCADE"), primary_key=True)
+    fecha = Column(Date, primary_key=True)  # día de inicio de las reservas (hora local)
+
+    reservas = Column(Integer, nullable=False, default=0)  # no canceladas
+    canceladas = Column(Integer, nullable=False, default=0)
+    minutos = Column(Integer, nullable=False, default=0)
+    monto_total = Column(Numeric(12, 2), nullable=False, default=0)
+    monto_pagado = Column(Numeric(12, 2), nullable=False, default=0)
+    # 24 enteros: minutos reservados que caen en cada hora del día (mapa de calor)
+    minutos_por_hora = Column(JSON, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+# =========================
+# Claves de idempotencia (ver app/core/idempotencia.py)
+# =========================
+class ClaveIdempotencia(Base):
+    __tablename__ = "claves_idempotencia"
+
+    clave = Column(String(128), primary_key=True)  # cabecera Idempotency-Key del cliente
+    endpoint = Column(String(64), primary_key=True)
+    huella = Column(String(64), nullable=False)  # sha256 del cuerpo de la petición
+    estado = Column(String(20), nullable=False, default="en_curso")  # en_curso | completa
+    status_code = Column(Integer, nullable=True)
+    respuesta = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expira_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+# =========================
+# Límites de tasa compartidos entre workers (LIMITES_BACKEND=postgres, ver app/core/limites.py)
+# =========================
+class ContadorLimite(Base):
+    __tablename__ = "contadores_limite"
+
+    clave = Column(String(80), primary_key=True)  # politica:dimension:hash del valor
+    ventana = Column(BigInteger, primary_key=True)  # epoch // segundos de la ventana
+    cuenta = Column(Integer, nullable=False, default=0)
+    expira_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
 # =========================
 # Planes / Suscripciones
 # =========================
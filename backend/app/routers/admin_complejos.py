@@ -1,20 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy.orm import Session
 from sqlalchemy import update  # ✅ IMPORTANTE
-import uuid
 
+from app.core import importacion_catalogo
 from app.core.deps import get_db, require_role, get_usuario_actual
-from app.core.slug import slugify
+from app.core.slug import insertar_complejo, slugify
 from app.modelos.modelos import Complejo, Cancha, User
 from app.esquemas.esquemas import ComplejoCrear, ComplejoActualizar, ComplejoOut
 
 router = APIRouter(prefix="/admin/complejos", tags=["admin-complejos"])
 
 
-def _slug_base(nombre: str) -> str:
-    base = slugify(nombre or "")
-    return base or "complejo"
-
 
 @router.get("", response_model=list[ComplejoOut], dependencies=[Depends(require_role("admin"))])
 def listar(db: Session = Depends(get_db)):
@@ -23,24 +22,32 @@ def listar(db: Session = Depends(get_db)):
 
 @router.post("", response_model=ComplejoOut, dependencies=[Depends(require_role("admin"))])
 def crear(payload: ComplejoCrear, db: Session = Depends(get_db), u=Depends(get_usuario_actual)):
-    base = _slug_base(payload.nombre)
-    temp_slug = f"{base}-tmp-{uuid.uuid4().hex[:8]}"
-    c = Complejo(**payload.model_dump(exclude_none=True), created_by=u.id, slug=temp_slug)
-    db.add(c)
-    db.commit()
-    db.refresh(c)
-    existe = (
-        db.query(Complejo)
-        .filter(Complejo.slug == base, Complejo.id != c.id)
-        .first()
-    )
-    c.slug = f"{base}-{c.id}" if existe else base
-    db.add(c)
+    c = Complejo(**payload.model_dump(exclude_none=True), created_by=u.id)
+    insertar_complejo(db, c, payload.nombre)
     db.commit()
     db.refresh(c)
     return c
 
 
+@router.post("/importar", dependencies=[Depends(require_role("admin"))])
+def importar(
+    file: UploadFile = File(...),
+    simular: bool = Query(default=True, description="Solo reporta qué se insertaría/actualizaría"),
+    activos: bool = Query(default=True),
+    provincia: str = Query(default="Lima", description="Para distritos con nombre repetido en el país"),
+    departamento: str = Query(default="Lima"),
+    db: Session = Depends(get_db),
+):
+    """CSV de `generar_inserts.py` (distrito,nombre,latitud,longitud,direccion); ver app/core/importacion_catalogo.py."""
+    archivo = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        return importacion_catalogo.importar(
+            db, archivo, simular=simular, activos=activos, provincia=provincia, departamento=departamento
+        )
+    except (ValueError, csv.Error) as exc:
+        raise HTTPException(400, f"CSV inválido: {exc}")
+
+
 @router.patch("/{complejo_id}", response_model=ComplejoOut, dependencies=[Depends(require_role("admin"))])
 def actualizar(complejo_id: int, payload: ComplejoActualizar, db: Session = Depends(get_db)):
     c = db.query(Complejo).filter(Complejo.id == complejo_id).first()
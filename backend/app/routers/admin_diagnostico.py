@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+
+from app.core.deps import require_role
+from app.core.instrumentacion import reiniciar_agregados, resumen_por_ruta
+
+router = APIRouter(prefix="/admin/diagnostico", tags=["admin-diagnostico"])
+
+
+@router.get("/sql", dependencies=[Depends(require_role("admin"))])
+def estadisticas_sql():
+    """
+    Consultas y tiempo de BD acumulados por ruta desde el arranque (o el último reinicio),
+    ordenado por consultas promedio: las rutas N+1 quedan arriba.
+    """
+    return {"rutas": resumen_por_ruta()}
+
+
+@router.delete("/sql", dependencies=[Depends(require_role("admin"))])
+def reiniciar_estadisticas_sql():
+    reiniciar_agregados()
+    return {"ok": True}
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 from datetime import datetime, timedelta, timezone
 import secrets
 import json
 from urllib.parse import urlencode, quote
-from urllib.request import Request, urlopen
+from urllib.request import Request as UrlRequest, urlopen
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 
+from app.core import limites
 from app.core.deps import get_db, get_usuario_actual
 from app.core.config import settings
 from app.core.seguridad import hash_password, verify_password, crear_token
@@ -48,7 +49,7 @@ def _sanitize_next(value: str | None) -> str | None:
 
 def _post_form(url: str, data: dict) -> dict:
     body = urlencode(data).encode("utf-8")
-    req = Request(url, data=body, method="POST")
+    req = UrlRequest(url, data=body, method="POST")
     req.add_header("Content-Type", "application/x-www-form-urlencoded")
     with urlopen(req, timeout=15) as resp:
         payload = resp.read().decode("utf-8")
@@ -56,7 +57,7 @@ def _post_form(url: str, data: dict) -> dict:
 
 
 def _get_json(url: str, headers: dict | None = None) -> dict:
-    req = Request(url, method="GET")
+    req = UrlRequest(url, method="GET")
     for k, v in (headers or {}).items():
         req.add_header(k, v)
     with urlopen(req, timeout=15) as resp:
@@ -65,7 +66,13 @@ def _get_json(url: str, headers: dict | None = None) -> dict:
 
 
 @router.post("/register", response_model=UsuarioOut)
-def register(payload: UsuarioCrear, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def register(
+    payload: UsuarioCrear,
+    background_tasks: BackgroundTasks,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    limites.verificar("registro", request)
     if payload.role not in ("usuario", "propietario"):
         raise HTTPException(status_code=400, detail="Rol invalido")
     email = payload.email.strip().lower()
@@ -128,8 +135,9 @@ def register(payload: UsuarioCrear, background_tasks: BackgroundTasks, db: Sessi
 
 
 @router.post("/login", response_model=TokenOut)
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(request: Request, form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     username = (form.username or "").strip().lower()
+    limites.verificar("login", request, email=username)
     u = db.query(User).filter(User.email == username).first()
     if not u or not verify_password(form.password, u.hashed_password):
         raise HTTPException(status_code=401, detail="Credenciales invalidas")
@@ -294,11 +302,17 @@ def google_callback(
 
 
 @router.post("/otp/request")
-def request_otp(payload: OtpRequestIn, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def request_otp(
+    payload: OtpRequestIn,
+    background_tasks: BackgroundTasks,
+    request: Request,
+    db: Session = Depends(get_db),
+):
     """
     Genera un codigo OTP de 6 digitos y lo envia por email.
     """
     email = payload.email.strip().lower()
+    limites.verificar("otp", request, email=email)
     code = f"{secrets.randbelow(1_000_000):06d}"
     code_hash = hash_password(code)
 
@@ -337,10 +351,11 @@ def request_otp(payload: OtpRequestIn, background_tasks: BackgroundTasks, db: Se
 
 
 @router.post("/otp/verify", response_model=OtpVerifyOut)
-def verify_otp(payload: OtpVerifyIn, db: Session = Depends(get_db)):
+def verify_otp(payload: OtpVerifyIn, request: Request, db: Session = Depends(get_db)):
     """
     Verifica OTP y devuelve token. Si el usuario no existe, lo crea.
     """
+    limites.verificar("otp_verificar", request)
     email = payload.email.strip().lower()
     code = payload.code.strip()
 
@@ -0,0 +1,43 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import busqueda
+from app.core.deps import get_async_read_db
+from app.esquemas.esquemas import ResultadoBusquedaOut
+
+router = APIRouter(prefix="/public/buscar", tags=["public-busqueda"])
+
+
+def _item(doc: busqueda.Documento, score: float | None = None) -> dict:
+    return {
+        "tipo": doc.tipo,
+        "id": doc.id,
+        "nombre": doc.nombre,
+        "slug": doc.slug,
+        "complejo_id": doc.complejo_id,
+        "distrito": doc.distrito,
+        "score": round(score, 3) if score is not None else None,
+    }
+
+
+@router.get("", response_model=list[ResultadoBusquedaOut])
+async def buscar(
+    q: str = Query(..., min_length=1, max_length=120),
+    tipo: Literal["complejo", "cancha"] | None = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    idx = await busqueda.indice(db)
+    return [_item(doc, score) for score, doc in idx.buscar(q, tipo=tipo, limite=limit)]
+
+
+@router.get("/autocompletar", response_model=list[ResultadoBusquedaOut])
+async def autocompletar(
+    q: str = Query(..., min_length=1, max_length=120),
+    limit: int = Query(8, ge=1, le=20),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    idx = await busqueda.indice(db)
+    return [_item(doc) for doc in idx.autocompletar(q, limite=limit)]
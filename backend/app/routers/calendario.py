@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+
+from app.core import calendario
+from app.core.deps import get_read_db, get_usuario_actual, require_role
+
+router = APIRouter(prefix="/panel/calendario", tags=["panel-calendario"])
+
+
+def _etag(version: str, formato: str) -> str:
+    return f'W/"{version}-{formato}"'
+
+
+def _no_modificado(request: Request, etag: str) -> bool:
+    recibidos = request.headers.get("if-none-match") or ""
+    return etag in {x.strip() for x in recibidos.split(",")} or recibidos.strip() == "*"
+
+
+@router.get("", dependencies=[Depends(require_role("propietario", "admin"))])
+def calendario_mes(
+    request: Request,
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    formato: str = Query("json", pattern="^(json|ics)$"),
+    db: Session = Depends(get_read_db),
+    u=Depends(get_usuario_actual),
+):
+    """
+    Reservas del mes para el calendario del panel. Responde 304 si el
+    `If-None-Match` coincide con la versión actual del mes.
+    """
+    version = calendario.version(db, u, year, month)
+    etag = _etag(version, formato)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _no_modificado(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    doc, cuerpo = calendario.mes(db, u, year, month, version)
+    if formato == "ics":
+        headers["Content-Disposition"] = f'inline; filename="reservas-{year}-{month:02d}.ics"'
+        return Response(calendario.a_ical(doc), media_type="text/calendar; charset=utf-8", headers=headers)
+    return Response(cuerpo, media_type="application/json", headers=headers)
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.core.deps import get_db
+from app.core import json_rapido
+from app.core.deps import get_async_read_db
 from app.modelos.modelos import Cancha, Complejo, PaymentIntegration
 from app.esquemas.esquemas import CanchaOut, ComplejoPublicOut
 
@@ -9,22 +12,30 @@ router = APIRouter(prefix="", tags=["public-canchas"])
 
 
 @router.get("/complejos", response_model=list[ComplejoPublicOut])
-def listar_complejos_publicos(db: Session = Depends(get_db)):
-    complejos = (
-        db.query(Complejo)
+async def listar_complejos_publicos(db: AsyncSession = Depends(get_async_read_db)):
+    result = await db.execute(
+        select(Complejo)
         .options(
             joinedload(Complejo.canchas).joinedload(Cancha.imagenes),
+            # async: sin lazy loads al serializar, Cancha.complejo también va cargado
+            joinedload(Complejo.canchas).joinedload(Cancha.complejo),
             joinedload(Complejo.owner),
         )
-        .filter(Complejo.is_active == True)
+        .where(Complejo.is_active == True)
         .order_by(Complejo.id.desc())
-        .all()
     )
+    complejos = result.unique().scalars().all()
 
     owner_ids = {c.owner_id for c in complejos if c.owner_id}
     integrations = (
-        db.query(PaymentIntegration)
-        .filter(PaymentIntegration.user_id.in_(owner_ids), PaymentIntegration.enabled == True)
+        (
+            await db.execute(
+                select(PaymentIntegration).where(
+                    PaymentIntegration.user_id.in_(owner_ids), PaymentIntegration.enabled == True
+                )
+            )
+        )
+        .scalars()
         .all()
         if owner_ids
         else []
@@ -54,25 +65,26 @@ def listar_complejos_publicos(db: Session = Depends(get_db)):
                 "foto_url": c.foto_url,
                 "is_active": c.is_active,
                 "owner_phone": c.owner_phone,
+                "likes_count": c.likes_count,
                 "culqi_enabled": bool(culqi_pk),
                 "culqi_pk": culqi_pk,
                 "canchas": c.canchas,
             }
         )
-    return out
+    return json_rapido.lista(list[ComplejoPublicOut], out)
 
 
 @router.get("/canchas", response_model=list[CanchaOut])
-def listar_canchas_publicas(db: Session = Depends(get_db)):
-    canchas = (
-        db.query(Cancha)
+async def listar_canchas_publicas(db: AsyncSession = Depends(get_async_read_db)):
+    result = await db.execute(
+        select(Cancha)
         .options(
             joinedload(Cancha.complejo).joinedload(Complejo.owner),  # trae users.phone
             joinedload(Cancha.imagenes),
         )
         .order_by(Cancha.id.desc())
-        .all()
     )
+    canchas = result.unique().scalars().all()
 
     owner_ids = {
         (c.owner_id or (c.complejo.owner_id if c.complejo else None))
@@ -80,8 +92,14 @@ def listar_canchas_publicas(db: Session = Depends(get_db)):
         if c.owner_id or (c.complejo and c.complejo.owner_id)
     }
     integrations = (
-        db.query(PaymentIntegration)
-        .filter(PaymentIntegration.user_id.in_(owner_ids), PaymentIntegration.enabled == True)
+        (
+            await db.execute(
+                select(PaymentIntegration).where(
+                    PaymentIntegration.user_id.in_(owner_ids), PaymentIntegration.enabled == True
+                )
+            )
+        )
+        .scalars()
         .all()
         if owner_ids
         else []
@@ -121,4 +139,4 @@ def listar_canchas_publicas(db: Session = Depends(get_db)):
                 "culqi_pk": culqi_pk,
             }
         )
-    return out
+    return json_rapido.lista(list[CanchaOut], out)
@@ -2,15 +2,20 @@
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 import uuid
 
-from app.core.deps import get_db, get_usuario_actual, require_role
+from app.core.deps import get_async_read_db, get_db, get_read_db, get_usuario_actual, require_role
+from app.core import bloqueos, catalogo, geo
+from app.core.likes import a_bitmap, alternar_like, complejos_likeados, like_en_cache
 from app.core.images import resize_square_image, safe_unlink_upload, save_upload
 from app.core.seguridad import decodificar_token
 from app.core.slug import slugify
-from app.modelos.modelos import Complejo, ComplejoImagen, ComplejoLike, Cancha, Reserva, User, PaymentIntegration
-from app.esquemas.esquemas import ComplejoPerfilOut, ComplejoActualizar, ComplejoImagenOut
+from app.modelos.modelos import BloqueoHorario, Complejo, ComplejoImagen, ComplejoLike, Cancha, Reserva, User, PaymentIntegration
+from app.esquemas.esquemas import ComplejoPerfilOut, ComplejoActualizar, ComplejoImagenOut, ComplejoCercaOut
+from app.utils.time import HORA_APERTURA, HORA_CIERRE
 
 router = APIRouter(prefix="", tags=["public-complejos"])
 
@@ -25,11 +30,6 @@ ALLOWED = {
 }
 
 
-def _slug_base(nombre: str) -> str:
-    base = slugify(nombre or "")
-    return base or "complejo"
-
-
 def check_owner(u: User | None, owner_id: int | None) -> bool:
     return bool(u) and (u.role == "admin" or (owner_id is not None and owner_id == u.id))
 
@@ -56,9 +56,9 @@ def _float_or_none(v):
         return None
 
 
-def get_usuario_opcional(
+async def get_usuario_opcional(
     token: str | None = Depends(oauth2_optional),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ) -> User | None:
     if not token:
         return None
@@ -67,58 +67,20 @@ def get_usuario_opcional(
         user_id = int(data.get("sub"))
     except Exception:
         return None
-    u = db.query(User).filter(User.id == user_id).first()
+    u = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     if not u or not u.is_active:
         return None
     return u
 
 
-@router.get("/public/complejos/{slug}", response_model=ComplejoPerfilOut)
-def obtener_complejo_publico(
-    slug: str,
-    db: Session = Depends(get_db),
-    u: User | None = Depends(get_usuario_opcional),
-):
-    c = (
-        db.query(Complejo)
-        .options(
-            joinedload(Complejo.canchas).joinedload(Cancha.imagenes),
-            joinedload(Complejo.imagenes),
-            joinedload(Complejo.owner),
-        )
-        .filter(Complejo.slug == slug)
-        .first()
-    )
-    if not c or not c.is_active:
-        raise HTTPException(404, "Complejo no encontrado")
-
+def _perfil_doc(c: Complejo, culqi_pk: str | None) -> dict:
+    """Documento público del complejo, sin los campos que dependen del usuario."""
     imagenes = sorted(
         c.imagenes,
         key=lambda img: (not bool(img.is_cover), img.orden, img.id),
     )
     canchas = [cx for cx in (c.canchas or []) if cx.is_active]
-
-    likes_count = db.query(ComplejoLike).filter(ComplejoLike.complejo_id == c.id).count()
-    liked_by_me = False
-    if u:
-        liked_by_me = (
-            db.query(ComplejoLike)
-            .filter(ComplejoLike.complejo_id == c.id, ComplejoLike.user_id == u.id)
-            .first()
-            is not None
-        )
-
-    culqi_pk = None
-    if c.owner_id:
-        integ = (
-            db.query(PaymentIntegration)
-            .filter(PaymentIntegration.user_id == c.owner_id, PaymentIntegration.enabled == True)
-            .first()
-        )
-        if integ:
-            culqi_pk = integ.culqi_pk
-
-    return {
+    data = {
         "id": c.id,
         "nombre": c.nombre,
         "slug": c.slug,
@@ -143,10 +105,103 @@ def obtener_complejo_publico(
         "imagenes": imagenes,
         "canchas": canchas,
         "caracteristicas": caracteristicas_de(c),
-        "likes_count": likes_count,
-        "liked_by_me": liked_by_me,
-        "is_owner": check_owner(u, c.owner_id),
+        "likes_count": c.likes_count,
     }
+    # ✅ ya serializado: el documento se cachea y no debe retener objetos ORM
+    return ComplejoPerfilOut.model_validate(data).model_dump(mode="json", exclude={"liked_by_me", "is_owner"})
+
+
+async def _construir_perfil(db: AsyncSession, slug: str) -> dict:
+    result = await db.execute(
+        select(Complejo)
+        .options(
+            joinedload(Complejo.canchas).joinedload(Cancha.imagenes),
+            # async: sin lazy loads al serializar, Cancha.complejo también va cargado
+            joinedload(Complejo.canchas).joinedload(Cancha.complejo),
+            joinedload(Complejo.imagenes),
+            joinedload(Complejo.owner),
+        )
+        .where(Complejo.slug == slug)
+    )
+    c = result.unique().scalars().first()
+    if not c or not c.is_active:
+        raise HTTPException(404, "Complejo no encontrado")
+
+    culqi_pk = None
+    if c.owner_id:
+        culqi_pk = await db.scalar(
+            select(PaymentIntegration.culqi_pk)
+            .where(PaymentIntegration.user_id == c.owner_id, PaymentIntegration.enabled == True)
+            .limit(1)
+        )
+    return _perfil_doc(c, culqi_pk)
+
+
+# ⚠️ debe declararse antes de /public/complejos/{slug}
+@router.get("/public/complejos/cerca", response_model=list[ComplejoCercaOut])
+async def complejos_cerca(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(10, gt=0, le=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    idx = await geo.indice(db)
+    return [
+        {
+            "id": p.id,
+            "nombre": p.nombre,
+            "slug": p.slug,
+            "distrito": p.distrito,
+            "provincia": p.provincia,
+            "departamento": p.departamento,
+            "foto_url": p.foto_url,
+            "latitud": p.lat,
+            "longitud": p.lng,
+            "distancia_km": round(d, 3),
+        }
+        for d, p in idx.cerca(lat, lng, radius_km, limit)
+    ]
+
+
+@router.get("/public/complejos/{slug}", response_model=ComplejoPerfilOut)
+async def obtener_complejo_publico(
+    slug: str,
+    db: AsyncSession = Depends(get_async_read_db),
+    u: User | None = Depends(get_usuario_opcional),
+):
+    doc = catalogo.obtener_perfil(slug)
+    if doc is None:
+        doc = await _construir_perfil(db, slug)
+        catalogo.guardar_perfil(doc)
+
+    # solo los campos por usuario se calculan en cada vista
+    liked_by_me = False
+    if u:
+        liked_by_me = like_en_cache(u.id, doc["id"])
+        if liked_by_me is None:
+            liked_by_me = (
+                await db.scalar(
+                    select(ComplejoLike.id)
+                    .where(ComplejoLike.complejo_id == doc["id"], ComplejoLike.user_id == u.id)
+                    .limit(1)
+                )
+                is not None
+            )
+
+    return {**doc, "liked_by_me": liked_by_me, "is_owner": check_owner(u, doc["owner_id"])}
+
+
+@router.get("/complejos/likes/mios")
+def mis_likes(
+    formato: str = Query("ids", pattern="^(ids|bitmap)$"),
+    db: Session = Depends(get_read_db),
+    u: User = Depends(get_usuario_actual),
+):
+    ids = complejos_likeados(db, u.id)
+    if formato == "bitmap":
+        return {"total": len(ids), **a_bitmap(ids)}
+    return {"total": len(ids), "ids": list(ids)}
 
 
 @router.post("/complejos/{complejo_id}/like")
@@ -159,20 +214,7 @@ def toggle_like(
     if not c or not c.is_active:
         raise HTTPException(404, "Complejo no encontrado")
 
-    existing = (
-        db.query(ComplejoLike)
-        .filter(ComplejoLike.complejo_id == complejo_id, ComplejoLike.user_id == u.id)
-        .first()
-    )
-    if existing:
-        db.delete(existing)
-        liked = False
-    else:
-        db.add(ComplejoLike(complejo_id=complejo_id, user_id=u.id))
-        liked = True
-    db.commit()
-
-    likes_count = db.query(ComplejoLike).filter(ComplejoLike.complejo_id == complejo_id).count()
+    liked, likes_count = alternar_like(db, complejo_id, u.id)
     return {"likes_count": likes_count, "liked_by_me": liked}
 
 
@@ -310,12 +352,6 @@ def actualizar_complejo_publico(
     db.commit()
     db.refresh(c)
 
-    imagenes = sorted(
-        c.imagenes,
-        key=lambda img: (not bool(img.is_cover), img.orden, img.id),
-    )
-    canchas = [cx for cx in (c.canchas or []) if cx.is_active]
-    likes_count = db.query(ComplejoLike).filter(ComplejoLike.complejo_id == c.id).count()
     culqi_pk = None
     if c.owner_id:
         integ = (
@@ -326,42 +362,14 @@ def actualizar_complejo_publico(
         if integ:
             culqi_pk = integ.culqi_pk
 
-    return {
-        "id": c.id,
-        "nombre": c.nombre,
-        "slug": c.slug,
-        "descripcion": c.descripcion,
-        "direccion": c.direccion,
-        "distrito": c.distrito,
-        "provincia": c.provincia,
-        "departamento": c.departamento,
-        "latitud": _float_or_none(c.latitud),
-        "longitud": _float_or_none(c.longitud),
-        "techada": c.techada,
-        "iluminacion": c.iluminacion,
-        "vestuarios": c.vestuarios,
-        "estacionamiento": c.estacionamiento,
-        "cafeteria": c.cafeteria,
-        "foto_url": c.foto_url,
-        "is_active": c.is_active,
-        "owner_id": c.owner_id,
-        "owner_phone": c.owner_phone,
-        "culqi_enabled": bool(culqi_pk),
-        "culqi_pk": culqi_pk,
-        "imagenes": imagenes,
-        "canchas": canchas,
-        "caracteristicas": caracteristicas_de(c),
-        "likes_count": likes_count,
-        "liked_by_me": False,
-        "is_owner": check_owner(u, c.owner_id),
-    }
+    return {**_perfil_doc(c, culqi_pk), "liked_by_me": False, "is_owner": check_owner(u, c.owner_id)}
 
 
 @router.get("/public/canchas/{cancha_id}/horarios")
-def horarios_cancha_publica(
+async def horarios_cancha_publica(
     cancha_id: int,
     fecha: str | None = Query(None, description="YYYY-MM-DD; default hoy"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     if fecha:
         try:
@@ -371,20 +379,28 @@ def horarios_cancha_publica(
     else:
         target_date = date.today()
 
+    # ✅ una sola consulta por día (reservas + bloqueos de checkout vigentes); los 16 slots se resuelven en memoria
+    dia_inicio = datetime(target_date.year, target_date.month, target_date.day, HORA_APERTURA)
+    dia_fin = datetime(target_date.year, target_date.month, target_date.day, HORA_CIERRE)
+    reservas = select(Reserva.start_at, Reserva.end_at, literal(False).label("retenido")).where(
+        Reserva.cancha_id == cancha_id,
+        Reserva.payment_status != "cancelada",
+        Reserva.start_at < dia_fin,
+        Reserva.end_at > dia_inicio,
+    )
+    retenidos = select(BloqueoHorario.start_at, BloqueoHorario.end_at, literal(True).label("retenido")).where(
+        *bloqueos.vigentes(cancha_id, dia_inicio, dia_fin)
+    )
+    result = await db.execute(union_all(reservas, retenidos))
+    intervalos = result.all()
+
     slots: list[dict[str, str | bool]] = []
-    for hour in range(6, 22):
+    for hour in range(HORA_APERTURA, HORA_CIERRE):
         slot_start = datetime(target_date.year, target_date.month, target_date.day, hour)
         slot_end = slot_start + timedelta(hours=1)
-        ocupado = (
-            db.query(Reserva)
-            .filter(Reserva.cancha_id == cancha_id)
-            .filter(Reserva.payment_status != "cancelada")
-            .filter(Reserva.start_at < slot_end)
-            .filter(Reserva.end_at > slot_start)
-            .count()
-            > 0
-        )
-        slots.append({"hora": f"{hour:02d}:00", "ocupado": ocupado})
+        cruces = [bool(retenido) for start_at, end_at, retenido in intervalos if start_at < slot_end and end_at > slot_start]
+        # retenido: alguien lo está pagando ahora mismo; se libera si el pago no se completa
+        slots.append({"hora": f"{hour:02d}:00", "ocupado": bool(cruces), "retenido": bool(cruces) and all(cruces)})
 
     return {"cancha_id": cancha_id, "fecha": target_date.isoformat(), "slots": slots}
 
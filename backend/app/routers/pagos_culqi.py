@@ -2,14 +2,14 @@ import logging
 from datetime import datetime, timezone, timedelta
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from pydantic import BaseModel, EmailStr, Field
 import requests
 from sqlalchemy import or_
 from sqlalchemy.orm import Session, joinedload
 
+from app.core import bloqueos, circuito, idempotencia, metricas, secretos
 from app.core.config import settings
-from app.core.crypto import decrypt_secret
 from app.core.deps import get_db, get_usuario_actual
 from app.modelos.modelos import Cancha, Complejo, PaymentIntegration, Plan, Reserva, Suscripcion, User
 from app.utils.time import now_peru
@@ -82,7 +82,7 @@ class CulqiSubscriptionEmailIn(BaseModel):
     email: EmailStr
 
 
-CULQI_API_BASE = "https://api.culqi.com"
+CULQI_API_BASE = settings.CULQI_API_BASE.rstrip("/")
 
 SENSITIVE_KEYS = {"token_id", "source_id", "card_number", "cvv", "password"}
 
@@ -112,6 +112,10 @@ def _require_secret_key(secret_key: str | None, *, label: str) -> str:
     return secret_key
 
 
+class ResultadoIncierto(HTTPException):
+    """502 en que Culqi pudo haber procesado la petición: la conexión se cortó o venció después de enviarla, o la respuesta no se pudo leer."""
+
+
 def _culqi_request_raw(secret_key: str, method: str, path: str, data: dict | None = None) -> tuple[int, dict]:
     url = f"{CULQI_API_BASE}{path}"
     headers = {
@@ -119,17 +123,42 @@ def _culqi_request_raw(secret_key: str, method: str, path: str, data: dict | Non
         "Content-Type": "application/json",
     }
     safe_data = _redact(data or {})
+    operacion = metricas.operacion_culqi(path)
+    try:
+        circuito.culqi.permitir(operacion)
+    except circuito.CircuitoAbierto as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Culqi no responde en este momento. Intenta de nuevo en unos segundos.",
+            headers={"Retry-After": str(int(exc.reintentar_en_s))},
+        )
     try:
-        resp = requests.request(method, url, json=data, headers=headers, timeout=20)
+        with metricas.cronometrar(metricas.CULQI_DURACION, operation=operacion, method=method):
+            resp = requests.request(
+                method, url, json=data, headers=headers, timeout=circuito.presupuesto_culqi(method, operacion)
+            )
     except Exception as exc:
+        circuito.culqi.fallo()
+        metricas.CULQI_ERRORES.labels(operacion, "red").inc()
         logger.exception("Culqi request error (method=%s, path=%s, data=%s)", method, path, safe_data)
-        raise HTTPException(status_code=502, detail=f"Error al comunicarse con Culqi: {exc}")
+        # sin conexión la petición no llegó a Culqi; cualquier otro error pudo cortar una ya procesada
+        error = HTTPException if isinstance(exc, requests.exceptions.ConnectTimeout) else ResultadoIncierto
+        raise error(status_code=502, detail=f"Error al comunicarse con Culqi: {exc}")
+
+    # un 4xx es un error de negocio (tarjeta rechazada, datos inválidos): Culqi está sano
+    if resp.status_code >= 500:
+        circuito.culqi.fallo()
+    else:
+        circuito.culqi.exito()
+    if resp.status_code >= 400:
+        metricas.CULQI_ERRORES.labels(operacion, "5xx" if resp.status_code >= 500 else "4xx").inc()
 
     try:
         payload = resp.json()
     except Exception:
+        metricas.CULQI_ERRORES.labels(operacion, "respuesta_invalida").inc()
         logger.error("Culqi response no JSON (status=%s): %s", resp.status_code, resp.text)
-        raise HTTPException(status_code=502, detail="Respuesta inesperada de Culqi")
+        raise ResultadoIncierto(status_code=502, detail="Respuesta inesperada de Culqi")
 
     return resp.status_code, payload
 
@@ -447,7 +476,31 @@ def subscribe(
 
 
 @router.post("/charge", response_model=CulqiChargeOut)
-def charge(payload: CulqiChargeIn, db: Session = Depends(get_db)):
+def charge(
+    payload: CulqiChargeIn,
+    db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(default=None, alias=idempotencia.CABECERA),
+):
+    """Cobro de una reserva. Con `Idempotency-Key` los reintentos no vuelven a cobrar (ver app/core/idempotencia.py)."""
+    if not idempotency_key:
+        return _charge(payload, db)
+
+    reclamo = idempotencia.reclamar(idempotency_key, "culqi_charge", payload.model_dump(mode="json"))
+    if reclamo.repetida is not None:
+        return reclamo.repetida
+    try:
+        out = _charge(payload, db, reclamo)
+    except HTTPException as exc:
+        reclamo.fallo(exc)
+        raise
+    except BaseException:
+        reclamo.fallo(HTTPException(status_code=500, detail="Error interno en cobro"))
+        raise
+    reclamo.completar(200, out)
+    return out
+
+
+def _charge(payload: CulqiChargeIn, db: Session, reclamo: idempotencia.Reclamo | None = None) -> CulqiChargeOut:
     try:
         cancha = (
             db.query(Cancha)
@@ -469,23 +522,10 @@ def charge(payload: CulqiChargeIn, db: Session = Depends(get_db)):
             raise HTTPException(status_code=403, detail="Culqi no activo para este propietario")
 
         try:
-            sk = decrypt_secret(integ.culqi_sk_enc)
+            sk = secretos.culqi_sk(integ)
         except Exception:
             raise HTTPException(status_code=500, detail="No se pudo descifrar culqi_sk")
 
-        solape = (
-            db.query(Reserva)
-            .filter(
-                Reserva.cancha_id == payload.cancha_id,
-                Reserva.payment_status != "cancelada",
-                Reserva.start_at < payload.end_at,
-                Reserva.end_at > payload.start_at,
-            )
-            .first()
-        )
-        if solape:
-            raise HTTPException(status_code=409, detail="Ya existe una reserva en ese horario.")
-
         duration_hours = (payload.end_at - payload.start_at).total_seconds() / 3600
         if duration_hours <= 0:
             raise HTTPException(status_code=400, detail="Horario inválido")
@@ -499,63 +539,92 @@ def charge(payload: CulqiChargeIn, db: Session = Depends(get_db)):
         if amount_cents <= 0:
             raise HTTPException(status_code=400, detail="Monto inválido")
 
-        charge_body = {
-            "amount": amount_cents,
-            "currency_code": "PEN",
-            "email": payload.email,
-            "source_id": payload.token_id,
-            "description": f"Reserva cancha #{cancha.id}",
-            "metadata": {
-                "cancha_id": cancha.id,
-                "complejo_id": cancha.complejo_id,
-                "owner_id": owner_id,
-                "start_at": payload.start_at.isoformat(),
-                "end_at": payload.end_at.isoformat(),
-            },
-        }
-        antifraud = _build_antifraud_details(
-            payload.device_id,
-            email=payload.email,
-            first_name=payload.first_name,
-            last_name=payload.last_name,
-            phone=payload.phone,
-        )
-        if antifraud:
-            charge_body["antifraud_details"] = antifraud
-        if payload.authentication_3ds:
-            charge_body["authentication_3DS"] = payload.authentication_3ds
-
-        status, charge = _culqi_post_raw(
-            _require_secret_key(sk, label="propietario"),
-            "/v2/charges",
-            charge_body,
-        )
-        if status == 200 and charge.get("action_code") == "REVIEW":
-            raise HTTPException(status_code=409, detail="3DS_REQUIRED")
-        if status >= 400 or charge.get("object") == "error":
-            msg = charge.get("user_message") or charge.get("merchant_message") or charge.get("message") or "Error en Culqi"
-            raise HTTPException(status_code=502, detail=msg)
-
-        charge_id = charge.get("id")
-        if not charge_id:
-            raise HTTPException(status_code=502, detail="Culqi no devolvió charge_id")
-
-        r = Reserva(
-            cancha_id=payload.cancha_id,
-            cliente_id=None,
-            start_at=payload.start_at,
-            end_at=payload.end_at,
-            total_amount=total_amount,
-            paid_amount=total_amount,
-            payment_method="culqi",
-            payment_status="pagada",
-            payment_ref=charge_id,
-            notas="Reserva pagada en línea",
-            created_by=None,
-        )
-        db.add(r)
-        db.commit()
-        db.refresh(r)
+        # verifica solape y bloquea el horario antes del cobro (409 si otro cliente ya lo tiene)
+        bloqueo_id = bloqueos.tomar(payload.cancha_id, payload.start_at, payload.end_at)
+        cobrado = False
+        try:
+            charge_body = {
+                "amount": amount_cents,
+                "currency_code": "PEN",
+                "email": payload.email,
+                "source_id": payload.token_id,
+                "description": f"Reserva cancha #{cancha.id}",
+                "metadata": {
+                    "cancha_id": cancha.id,
+                    "complejo_id": cancha.complejo_id,
+                    "owner_id": owner_id,
+                    "start_at": payload.start_at.isoformat(),
+                    "end_at": payload.end_at.isoformat(),
+                },
+            }
+            antifraud = _build_antifraud_details(
+                payload.device_id,
+                email=payload.email,
+                first_name=payload.first_name,
+                last_name=payload.last_name,
+                phone=payload.phone,
+            )
+            if antifraud:
+                charge_body["antifraud_details"] = antifraud
+            if payload.authentication_3ds:
+                charge_body["authentication_3DS"] = payload.authentication_3ds
+
+            secret_key = _require_secret_key(sk, label="propietario")
+            try:
+                status, charge = _culqi_post_raw(secret_key, "/v2/charges", charge_body)
+            except ResultadoIncierto:
+                # no se sabe si Culqi cobró: se trata como cobrado (el horario queda retenido y la
+                # clave de idempotencia guarda este 502) para que un reintento no cobre dos veces
+                cobrado = True
+                if reclamo is not None:
+                    reclamo.comprometer()
+                logger.error(
+                    "Cobro Culqi sin confirmar (cancha_id=%s, start_at=%s, email=%s): revisar en Culqi",
+                    cancha.id,
+                    payload.start_at.isoformat(),
+                    payload.email,
+                )
+                raise HTTPException(
+                    status_code=502,
+                    detail="No pudimos confirmar el cobro con Culqi. No vuelvas a pagar: revisa tu correo o contáctanos.",
+                )
+            if status == 200 and charge.get("action_code") == "REVIEW":
+                raise HTTPException(status_code=409, detail="3DS_REQUIRED")
+            if status >= 400 or charge.get("object") == "error":
+                msg = charge.get("user_message") or charge.get("merchant_message") or charge.get("message") or "Error en Culqi"
+                raise HTTPException(status_code=502, detail=msg)
+
+            charge_id = charge.get("id")
+            if not charge_id:
+                raise HTTPException(status_code=502, detail="Culqi no devolvió charge_id")
+            # ya se cobró: de aquí en adelante ni se libera el horario ni un reintento vuelve a cobrar
+            cobrado = True
+            if reclamo is not None:
+                reclamo.comprometer()
+
+            r = Reserva(
+                cancha_id=payload.cancha_id,
+                cliente_id=None,
+                start_at=payload.start_at,
+                end_at=payload.end_at,
+                total_amount=total_amount,
+                paid_amount=total_amount,
+                payment_method="culqi",
+                payment_status="pagada",
+                payment_ref=charge_id,
+                notas="Reserva pagada en línea",
+                created_by=None,
+            )
+            db.add(r)
+            # la reserva reemplaza al bloqueo en el mismo commit
+            bloqueos.promover(db, bloqueo_id)
+            db.commit()
+            db.refresh(r)
+        except BaseException:
+            # si ya se cobró el bloqueo queda hasta vencer: el horario está pagado aunque falte la reserva
+            if not cobrado:
+                bloqueos.liberar(bloqueo_id)
+            raise
 
         return CulqiChargeOut(charge_id=charge_id, reserva_id=r.id, total_amount=float(total_amount))
     except HTTPException:
@@ -1,22 +1,22 @@
 ﻿from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
-from sqlalchemy import func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, aliased
 import uuid
 import io
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime, date, timezone
 
 from fastapi.responses import StreamingResponse
 from openpyxl import Workbook
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 
-from app.core.deps import get_db, require_role, get_usuario_actual
+from app.core import bloqueos, estadisticas, json_rapido, paginacion, reportes_pdf, reservas_busqueda
+from app.core.deps import get_db, get_read_db, require_role, get_usuario_actual
+from app.core.rangos import solapa_rango
 from app.core.images import resize_square_image, save_upload, safe_unlink_upload
-from app.core.slug import slugify
-from app.modelos.modelos import Complejo, Cancha, CanchaImagen, Reserva, Plan, Suscripcion, User
+from app.core.slug import insertar_complejo, slugify
+from app.modelos.modelos import Complejo, Cancha, CanchaImagen, Reserva, Plan, Suscripcion
 from app.utils.time import now_peru
 from app.esquemas.esquemas import (
     ComplejoCrear,
@@ -33,6 +33,7 @@ from app.esquemas.esquemas import (
 router = APIRouter(prefix="/panel", tags=["panel"])
 
 MAX_BYTES = 2 * 1024 * 1024
+PAGINA_RESERVAS = 100
 ALLOWED = {
     "image/jpeg": ".jpg",
     "image/png": ".png",
@@ -45,10 +46,6 @@ def check_owner(u, owner_id: int | None):
     return u.role == "admin" or (owner_id is not None and owner_id == u.id)
 
 
-def _slug_base(nombre: str) -> str:
-    base = slugify(nombre or "")
-    return base or "complejo"
-
 def _plan_actual(db: Session, user_id: int) -> Plan | None:
     now = now_peru()
     fila = (
@@ -98,17 +95,7 @@ def owner_filter_reservas(q, u):
 def _apply_reserva_search(q, search: str | None):
     if not search:
         return q
-    term = f"%{search.strip().lower()}%"
-    q = q.outerjoin(User, Reserva.cliente)
-    return q.filter(
-        or_(
-            func.lower(User.username).like(term),
-            func.lower(User.first_name).like(term),
-            func.lower(User.last_name).like(term),
-            func.lower(Reserva.payment_status).like(term),
-            Reserva.cancha.has(Cancha.nombre.ilike(term)),
-        )
-    )
+    return q.filter(reservas_busqueda.filtro(search))
 
 
 def _apply_reserva_fecha(q, fecha: date | None, fecha_inicio: date | None, fecha_fin: date | None):
@@ -123,7 +110,7 @@ def _apply_reserva_fecha(q, fecha: date | None, fecha_inicio: date | None, fecha
         end = datetime(fecha.year, fecha.month, fecha.day, 23, 59, 59)
 
     if start and end:
-        return q.filter(Reserva.start_at <= end, Reserva.end_at >= start)
+        return q.filter(solapa_rango(Reserva.start_at, Reserva.end_at, start, end))
     if start:
         return q.filter(Reserva.end_at >= start)
     if end:
@@ -205,25 +192,12 @@ def crear_complejo(payload: ComplejoCrear, db: Session = Depends(get_db), u=Depe
                 status_code=403,
                 detail=f"Has alcanzado el limite de complejos de tu plan ({limite}).",
             )
-    base = _slug_base(payload.nombre)
-    temp_slug = f"{base}-tmp-{uuid.uuid4().hex[:8]}"
     c = Complejo(
         **payload.model_dump(exclude_none=True),
         owner_id=u.id,
         created_by=u.id,
-        slug=temp_slug,
-    )
-    db.add(c)
-    db.commit()
-    db.refresh(c)
-
-    existe = (
-        db.query(Complejo)
-        .filter(Complejo.slug == base, Complejo.id != c.id)
-        .first()
     )
-    c.slug = f"{base}-{c.id}" if existe else base
-    db.add(c)
+    insertar_complejo(db, c, payload.nombre)
     db.commit()
     db.refresh(c)
     return c
@@ -465,6 +439,54 @@ def actualizar_cancha(
 # - usuario: ve SUS reservas (historial)
 # - propietario/admin: ve reservas de sus complejos (o todo si admin)
 # ==========================
+def _cursor_param(cursor: str | None):
+    if not cursor:
+        return None
+    try:
+        return paginacion.decodificar(cursor)
+    except ValueError:
+        raise HTTPException(400, "Cursor inválido")
+
+
+def _listado_reservas(
+    q,
+    *,
+    cursor: str | None,
+    limit: int | None,
+    formato: str,
+    construir,
+):
+    """
+    Sin `limit` ni `cursor` devuelve la lista completa como siempre. Con `limit`
+    pagina por (start_at, id) y deja el cursor siguiente en `X-Next-Cursor`;
+    `formato=ndjson` transmite todo el rango (desde el cursor) en lotes.
+    """
+    desde = _cursor_param(cursor)
+    if formato == "ndjson":
+        return paginacion.ndjson(construir, reserva_dict, desde)
+    if limit is None and desde is None:
+        return json_rapido.lista(list[ReservaOut], [reserva_dict(r) for r in paginacion.ordenar(q).all()])
+    rows, siguiente = paginacion.pagina(q, desde, limit or PAGINA_RESERVAS)
+    headers = {paginacion.CABECERA_CURSOR: siguiente} if siguiente else None
+    return json_rapido.lista(list[ReservaOut], [reserva_dict(r) for r in rows], headers=headers)
+
+
+def _query_reservas(db: Session, u, cancha_id, fecha, fecha_inicio, fecha_fin, search):
+    q = db.query(Reserva)
+
+    # ✅ usuario: solo reservas donde es cliente
+    if u.role == "usuario":
+        q = q.filter(Reserva.cliente_id == u.id)
+    else:
+        q = owner_filter_reservas(q, u)
+
+    if cancha_id is not None:
+        q = q.filter(Reserva.cancha_id == cancha_id)
+
+    q = _apply_reserva_fecha(q, fecha, fecha_inicio, fecha_fin)
+    return _apply_reserva_search(q, search)
+
+
 @router.get(
     "/reservas",
     response_model=list[ReservaOut],
@@ -476,25 +498,16 @@ def listar_reservas(
     fecha_inicio: date | None = Query(default=None),
     fecha_fin: date | None = Query(default=None),
     search: str | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=500),
+    formato: Literal["json", "ndjson"] = Query(default="json"),
     db: Session = Depends(get_db),
     u=Depends(get_usuario_actual),
 ):
-    q = db.query(Reserva)
-
-    # ✅ usuario: solo reservas donde es cliente
-    if u.role == "usuario":
-        q = q.filter(Reserva.cliente_id == u.id)
-    else:
-        q = owner_filter_reservas(q, u)
-
-    if cancha_id is not None:
-        q = q.filter(Reserva.cancha_id == cancha_id)
+    def construir(sesion: Session):
+        return _query_reservas(sesion, u, cancha_id, fecha, fecha_inicio, fecha_fin, search)
 
-    q = _apply_reserva_fecha(q, fecha, fecha_inicio, fecha_fin)
-    q = _apply_reserva_search(q, search)
-
-    rows = q.order_by(Reserva.start_at.asc()).all()
-    return [reserva_dict(r) for r in rows]
+    return _listado_reservas(construir(db), cursor=cursor, limit=limit, formato=formato, construir=construir)
 
 
 @router.get(
@@ -511,23 +524,42 @@ def listar_pagos_culqi(
     search: str | None = Query(default=None),
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = Query(default=None),
+    total: Literal["exacto", "estimado", "no"] = Query(default="exacto"),
 ):
+    """
+    `cursor` (el `next_cursor` de la respuesta anterior) reemplaza a `page`:
+    keyset sobre (start_at, id) descendente, sin OFFSET. `total=estimado` usa
+    la estimación del planner y `total=no` omite el conteo.
+    """
     q = db.query(Reserva).filter(Reserva.payment_method == "culqi")
     q = owner_filter_reservas(q, u)
     q = _apply_reserva_fecha(q, fecha, fecha_inicio, fecha_fin)
     q = _apply_reserva_search(q, search)
-    total = q.count()
-    rows = (
-        q.order_by(Reserva.start_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
+
+    if total == "exacto":
+        conteo = q.count()
+    elif total == "estimado":
+        conteo = paginacion.total_estimado(db, q)
+    else:
+        conteo = None
+
+    desde = _cursor_param(cursor)
+    if desde is None and page > 1:
+        # compatibilidad: paginación por número de página
+        rows = paginacion.ordenar(q, desc=True).offset((page - 1) * page_size).limit(page_size + 1).all()
+        siguiente = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            siguiente = paginacion.codificar(rows[-1].start_at, rows[-1].id)
+    else:
+        rows, siguiente = paginacion.pagina(q, desde, page_size, desc=True)
     return {
         "items": [reserva_dict(r) for r in rows],
-        "total": total,
+        "total": conteo,
         "page": page,
         "page_size": page_size,
+        "next_cursor": siguiente,
     }
 
 
@@ -544,7 +576,8 @@ def crear_reserva(payload: ReservaCrear, db: Session = Depends(get_db), u=Depend
     if not check_owner(u, cancha.owner_id):
         raise HTTPException(403, "No autorizado")
 
-    # validar solape
+    # validar solape con el mismo candado por cancha que el checkout en línea (hasta el commit)
+    bloqueos.serializar(db, payload.cancha_id)
     solape = (
         db.query(Reserva)
         .filter(
@@ -557,6 +590,8 @@ def crear_reserva(payload: ReservaCrear, db: Session = Depends(get_db), u=Depend
     )
     if solape:
         raise HTTPException(409, "Ya existe una reserva en ese horario para esta cancha.")
+    if bloqueos.retenido(db, payload.cancha_id, payload.start_at, payload.end_at):
+        raise HTTPException(409, "Un cliente está pagando ese horario en línea. Intenta en unos minutos.")
 
     total = float(payload.total_amount or 0)
     paid = float(payload.paid_amount or 0)
@@ -661,7 +696,7 @@ def cancelar_reserva(reserva_id: int, db: Session = Depends(get_db), u=Depends(g
     dependencies=[Depends(require_role("propietario", "admin"))],
 )
 def export_reservas_excel(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     u=Depends(get_usuario_actual),
     fecha: date | None = Query(default=None),
     fecha_inicio: date | None = Query(default=None),
@@ -715,12 +750,69 @@ def export_reservas_excel(
 
 
 # -------- EXPORT PDF --------
+def _filas_pdf(q):
+    """Columnas que usan los reportes, con el nombre de la cancha en el mismo SELECT, leídas por lotes."""
+    cancha = aliased(Cancha)
+    return q.outerjoin(cancha, cancha.id == Reserva.cancha_id).with_entities(
+        Reserva.cancha_id,
+        cancha.nombre.label("cancha_nombre"),
+        Reserva.start_at,
+        Reserva.end_at,
+        Reserva.total_amount,
+        Reserva.paid_amount,
+        Reserva.payment_method,
+        Reserva.payment_ref,
+        Reserva.payment_status,
+    ).yield_per(1_000)
+
+
+def _cancha_pdf(r) -> str:
+    return r.cancha_nombre or f"#{r.cancha_id}"
+
+
+def _dia_pdf(r) -> str:
+    return r.start_at.strftime("%Y-%m-%d")
+
+
+def _subtitulo_pdf(fecha: date | None, fecha_inicio: date | None, fecha_fin: date | None, search: str | None) -> str:
+    partes = []
+    if fecha_inicio or fecha_fin:
+        partes.append(f"Del {fecha_inicio or '…'} al {fecha_fin or '…'}")
+    elif fecha:
+        partes.append(f"Fecha {fecha.isoformat()}")
+    if search:
+        partes.append(f"Búsqueda: {search}")
+    partes.append(f"Generado {now_peru().strftime('%Y-%m-%d %H:%M')}")
+    return " · ".join(partes)
+
+
+COLUMNAS_PDF_RESERVAS = [
+    reportes_pdf.Columna("Cancha", _cancha_pdf, ancho=2.2),
+    reportes_pdf.Columna("Inicio", lambda r: r.start_at, ancho=1.6, formato=reportes_pdf.fecha_hora),
+    reportes_pdf.Columna("Fin", lambda r: r.end_at, ancho=1.6, formato=reportes_pdf.fecha_hora),
+    reportes_pdf.Columna("Monto", lambda r: r.total_amount, alinear="der", total=True, ancho=1.3, formato=reportes_pdf.soles),
+    reportes_pdf.Columna("Pagado", lambda r: r.paid_amount, alinear="der", total=True, ancho=1.3, formato=reportes_pdf.soles),
+    reportes_pdf.Columna("Pago", lambda r: r.payment_method),
+    reportes_pdf.Columna("Estado", lambda r: r.payment_status),
+]
+
+COLUMNAS_PDF_PAGOS = [
+    reportes_pdf.Columna("Cancha", _cancha_pdf, ancho=2.2),
+    reportes_pdf.Columna("Inicio", lambda r: r.start_at, ancho=1.6, formato=reportes_pdf.fecha_hora),
+    reportes_pdf.Columna("Fin", lambda r: r.end_at, ancho=1.6, formato=reportes_pdf.fecha_hora),
+    reportes_pdf.Columna("Monto", lambda r: r.total_amount, alinear="der", total=True, ancho=1.3, formato=reportes_pdf.soles),
+    reportes_pdf.Columna("Pago", lambda r: r.payment_method, ancho=0.8),
+    reportes_pdf.Columna("Ref", lambda r: r.payment_ref, ancho=1.6),
+    reportes_pdf.Columna("Estado", lambda r: r.payment_status),
+]
+
+
 @router.get(
     "/reservas/export.pdf",
     dependencies=[Depends(require_role("propietario", "admin"))],
 )
 def export_reservas_pdf(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     u=Depends(get_usuario_actual),
     fecha: date | None = Query(default=None),
     fecha_inicio: date | None = Query(default=None),
@@ -733,50 +825,17 @@ def export_reservas_pdf(
     q = _apply_reserva_fecha(q, fecha, fecha_inicio, fecha_fin)
     q = _apply_reserva_search(q, search)
 
-    rows = q.order_by(Reserva.start_at.asc()).all()
-
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
     title = "Reporte de Reservas" if fecha is None else f"Reporte de Reservas - {fecha.isoformat()}"
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(40, height - 40, title)
-
-    c.setFont("Helvetica", 9)
-    y = height - 70
-
-    headers = ["Cancha", "Inicio", "Fin", "Monto", "Pagado", "Pago", "Estado"]
-    c.drawString(40, y, " | ".join(headers))
-    y -= 14
-    c.line(40, y, width - 40, y)
-    y -= 14
-
-    for r in rows:
-        line = " | ".join([
-            (r.cancha_nombre or f"#{r.cancha_id}")[:18],
-            r.start_at.strftime("%m-%d %H:%M"),
-            r.end_at.strftime("%m-%d %H:%M"),
-            f"S/{float(r.total_amount or 0):.0f}",
-            f"S/{float(r.paid_amount or 0):.0f}",
-            (r.payment_method or "")[:10],
-            (r.payment_status or "")[:10],
-        ])
-        c.drawString(40, y, line)
-        y -= 12
-        if y < 60:
-            c.showPage()
-            c.setFont("Helvetica", 9)
-            y = height - 50
-
-    c.save()
-    buffer.seek(0)
-
     filename = "reservas.pdf" if fecha is None else f"reservas_{fecha.isoformat()}.pdf"
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    return reportes_pdf.respuesta(
+        title,
+        COLUMNAS_PDF_RESERVAS,
+        _filas_pdf(q.order_by(Reserva.start_at.asc(), Reserva.id.asc())),
+        filename,
+        subtitulo=_subtitulo_pdf(fecha, fecha_inicio, fecha_fin, search),
+        agrupar_por=_dia_pdf,
+        resumir_por=_cancha_pdf,
+        titulo_resumen="Resumen por cancha",
     )
 
 
@@ -786,7 +845,7 @@ def export_reservas_pdf(
     dependencies=[Depends(require_role("propietario", "admin"))],
 )
 def export_pagos_excel(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     u=Depends(get_usuario_actual),
     fecha: date | None = Query(default=None),
     fecha_inicio: date | None = Query(default=None),
@@ -842,7 +901,7 @@ def export_pagos_excel(
     dependencies=[Depends(require_role("propietario", "admin"))],
 )
 def export_pagos_pdf(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     u=Depends(get_usuario_actual),
     fecha: date | None = Query(default=None),
     fecha_inicio: date | None = Query(default=None),
@@ -853,50 +912,18 @@ def export_pagos_pdf(
     q = owner_filter_reservas(q, u)
     q = _apply_reserva_fecha(q, fecha, fecha_inicio, fecha_fin)
     q = _apply_reserva_search(q, search)
-    rows = q.order_by(Reserva.start_at.desc()).all()
-
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
 
     title = "Reporte de Pagos Culqi" if fecha is None else f"Reporte de Pagos Culqi - {fecha.isoformat()}"
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(40, height - 40, title)
-
-    c.setFont("Helvetica", 9)
-    y = height - 70
-
-    headers = ["Cancha", "Inicio", "Fin", "Monto", "Pago", "Ref", "Estado"]
-    c.drawString(40, y, " | ".join(headers))
-    y -= 14
-    c.line(40, y, width - 40, y)
-    y -= 14
-
-    for r in rows:
-        line = " | ".join([
-            (r.cancha_nombre or f"#{r.cancha_id}")[:18],
-            r.start_at.strftime("%m-%d %H:%M"),
-            r.end_at.strftime("%m-%d %H:%M"),
-            f"S/{float(r.total_amount or 0):.0f}",
-            (r.payment_method or "")[:8],
-            (r.payment_ref or "")[:10],
-            (r.payment_status or "")[:10],
-        ])
-        c.drawString(40, y, line)
-        y -= 12
-        if y < 60:
-            c.showPage()
-            c.setFont("Helvetica", 9)
-            y = height - 50
-
-    c.save()
-    buffer.seek(0)
-
     filename = "pagos_culqi.pdf" if fecha is None else f"pagos_culqi_{fecha.isoformat()}.pdf"
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    return reportes_pdf.respuesta(
+        title,
+        COLUMNAS_PDF_PAGOS,
+        _filas_pdf(q.order_by(Reserva.start_at.desc(), Reserva.id.desc())),
+        filename,
+        subtitulo=_subtitulo_pdf(fecha, fecha_inicio, fecha_fin, search),
+        agrupar_por=_dia_pdf,
+        resumir_por=_cancha_pdf,
+        titulo_resumen="Resumen por cancha",
     )
 
 # -------- 16 de enero --------
@@ -908,9 +935,40 @@ def _month_range(year: int, month: int):
         end = datetime(year, month + 1, 1)
     return start, end
 
+@router.get(
+    "/estadisticas",
+    dependencies=[Depends(require_role("propietario", "admin"))],
+    response_class=json_rapido.RespuestaORJSON,
+)
+def estadisticas_panel(
+    desde: date = Query(...),
+    hasta: date = Query(...),
+    complejo_id: int | None = Query(default=None),
+    cancha_id: int | None = Query(default=None),
+    db: Session = Depends(get_read_db),
+    u=Depends(get_usuario_actual),
+):
+    """
+    Ocupación e ingresos del rango (solo planes con estadísticas). Se responde
+    desde los rollups diarios, sin recorrer las reservas.
+    """
+    if hasta < desde:
+        raise HTTPException(400, "Rango inválido: 'hasta' no puede ser menor que 'desde'.")
+    if (hasta - desde).days > 366 * 3:
+        raise HTTPException(400, "Rango demasiado grande (máximo 3 años).")
+    if u.role != "admin":
+        plan = _plan_actual(db, u.id)
+        if not plan or not plan.permite_estadisticas:
+            raise HTTPException(403, "Tu plan no incluye estadísticas.")
+
+    canchas = estadisticas.canchas_del_propietario(db, u, complejo_id, cancha_id)
+    return estadisticas.consultar(db, canchas, desde, hasta)
+
+
 @router.get(
     "/reservas/mes",
     dependencies=[Depends(require_role("propietario", "admin"))],
+    response_class=json_rapido.RespuestaORJSON,
 )
 def reservas_mes(
     year: int = Query(..., ge=2000, le=2100),
@@ -969,30 +1027,33 @@ def listar_reservas_rango(
     desde: date = Query(..., alias="from"),
     hasta: date = Query(..., alias="to"),
     cancha_id: int | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=500),
+    formato: Literal["json", "ndjson"] = Query(default="json"),
     db: Session = Depends(get_db),
     u=Depends(get_usuario_actual),
 ):
     if hasta < desde:
         raise HTTPException(400, "Rango inválido: 'to' no puede ser menor que 'from'.")
 
-    q = db.query(Reserva)
+    start = datetime(desde.year, desde.month, desde.day, 0, 0, 0)
+    end = datetime(hasta.year, hasta.month, hasta.day, 23, 59, 59)
 
-    if u.role == "usuario":
-        q = q.filter(Reserva.cliente_id == u.id)
-    else:
-        q = owner_filter_reservas(q, u)
+    def construir(sesion: Session):
+        q = sesion.query(Reserva)
 
-    if cancha_id is not None:
-        q = q.filter(Reserva.cancha_id == cancha_id)
+        if u.role == "usuario":
+            q = q.filter(Reserva.cliente_id == u.id)
+        else:
+            q = owner_filter_reservas(q, u)
 
-    start = datetime(desde.year, desde.month, desde.day, 0, 0, 0)
-    end = datetime(hasta.year, hasta.month, hasta.day, 23, 59, 59)
+        if cancha_id is not None:
+            q = q.filter(Reserva.cancha_id == cancha_id)
 
-    # mismo criterio que tu listar_reservas (solape por rango)
-    q = q.filter(Reserva.start_at <= end, Reserva.end_at >= start)
+        # mismo criterio que tu listar_reservas (solape por rango)
+        return q.filter(solapa_rango(Reserva.start_at, Reserva.end_at, start, end))
 
-    rows = q.order_by(Reserva.start_at.asc()).all()
-    return [reserva_dict(r) for r in rows]
+    return _listado_reservas(construir(db), cursor=cursor, limit=limit, formato=formato, construir=construir)
 
 
 
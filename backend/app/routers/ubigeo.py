@@ -3,7 +3,7 @@ import logging
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
-from app.core.deps import get_db
+from app.core.deps import get_read_db
 from app.modelos.modelos import UbigeoDepartment, UbigeoProvince, UbigeoDistrict
 from app.esquemas.esquemas import UbigeoDepartmentOut, UbigeoProvinceOut, UbigeoDistrictOut
 
@@ -13,7 +13,7 @@ router = APIRouter(prefix="/ubigeo", tags=["ubigeo"])
 
 
 @router.get("/departamentos", response_model=list[UbigeoDepartmentOut])
-def listar_departamentos(db: Session = Depends(get_db)):
+def listar_departamentos(db: Session = Depends(get_read_db)):
     result = db.query(UbigeoDepartment).order_by(UbigeoDepartment.name.asc()).all()
     if not result:
         logger.warning("Ubigeo: no se encontraron departamentos")
@@ -23,7 +23,7 @@ def listar_departamentos(db: Session = Depends(get_db)):
 @router.get("/provincias", response_model=list[UbigeoProvinceOut])
 def listar_provincias(
     department_id: str = Query(..., min_length=2, max_length=2),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     result = (
         db.query(UbigeoProvince)
@@ -39,7 +39,7 @@ def listar_provincias(
 @router.get("/distritos", response_model=list[UbigeoDistrictOut])
 def listar_distritos(
     province_id: str = Query(..., min_length=4, max_length=4),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     # OJO: tu tabla permite NULL, así que filtramos por provincia_id
     result = (
@@ -5,7 +5,8 @@ from pydantic import BaseModel, Field
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from app.core.crypto import decrypt_secret, encrypt_secret
+from app.core import secretos
+from app.core.crypto import encrypt_secret
 from app.core.deps import get_db, get_usuario_actual
 from app.modelos.modelos import PaymentIntegration, Plan, Suscripcion, User
 from app.utils.time import now_peru
@@ -103,6 +104,7 @@ def guardar_culqi(payload: CulqiConfigIn, db: Session = Depends(get_db), u: User
         db.add(integ)
 
     db.commit()
+    secretos.invalidar(u.id)
     db.refresh(integ)
 
     return CulqiConfigOut(
@@ -117,6 +119,6 @@ def _get_culqi_sk_or_404(db: Session, user_id: int) -> str:
     if not integ or not integ.enabled:
         raise HTTPException(status_code=404, detail="Culqi no activo")
     try:
-        return decrypt_secret(integ.culqi_sk_enc)
+        return secretos.culqi_sk(integ)
     except Exception:
         raise HTTPException(status_code=500, detail="No se pudo descifrar culqi_sk")
@@ -7,6 +7,7 @@ import requests
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
+from app.core import circuito, metricas
 from app.core.config import settings
 from app.core.deps import get_db
 from app.modelos.modelos import Suscripcion, User
@@ -126,15 +127,28 @@ def _fetch_charge_sxn_id(charge_id: str) -> str | None:
     secret_key = settings.CULQI_SECRET_KEY
     if not secret_key:
         return None
+    operacion = metricas.operacion_culqi("/v2/charges/{id}")
     try:
-        resp = requests.get(
-            f"https://api.culqi.com/v2/charges/{charge_id}",
-            headers={"Authorization": f"Bearer {secret_key}"},
-            timeout=15,
-        )
+        # con Culqi caído el webhook sigue sin el fallback, en vez de esperar el timeout
+        circuito.culqi.permitir(operacion)
+    except circuito.CircuitoAbierto:
+        return None
+    try:
+        with metricas.cronometrar(metricas.CULQI_DURACION, operation=operacion, method="GET"):
+            resp = requests.get(
+                f"{settings.CULQI_API_BASE.rstrip('/')}/v2/charges/{charge_id}",
+                headers={"Authorization": f"Bearer {secret_key}"},
+                timeout=circuito.presupuesto_culqi("GET", operacion),
+            )
         data = resp.json() if resp.content else {}
     except Exception:
+        circuito.culqi.fallo()
+        metricas.CULQI_ERRORES.labels(operacion, "red").inc()
         return None
+    if resp.status_code >= 500:
+        circuito.culqi.fallo()
+    else:
+        circuito.culqi.exito()
     if isinstance(data, dict):
         found = _find_sxn_id(data)
         if found:
@@ -244,12 +258,33 @@ def _apply_renewal(s: Suscripcion, now: datetime, days: int = 30) -> bool:
     return True
 
 
+def _observar_lag(payload: dict) -> None:
+    # creation_date de Culqi viene como epoch en segundos o en milisegundos
+    creado = payload.get("creation_date")
+    if not creado and isinstance(payload.get("data"), dict):
+        creado = payload["data"].get("creation_date")
+    try:
+        creado = float(creado)
+    except (TypeError, ValueError):
+        return
+    if creado > 1e12:
+        creado /= 1000
+    lag = datetime.now(timezone.utc).timestamp() - creado
+    if lag >= 0:
+        metricas.WEBHOOK_LAG.observe(lag)
+
+
 @router.post("")
 @router.post("/")
 async def culqi_webhook(request: Request, db: Session = Depends(get_db)):
     _require_basic_auth(request)
     payload = await request.json()
+    _observar_lag(payload)
+    with metricas.cronometrar(metricas.WEBHOOK_DURACION):
+        return _procesar_webhook(payload, db)
+
 
+def _procesar_webhook(payload: dict, db: Session) -> dict:
     sub_id = _extract_subscription_id(payload)
     event_type = (payload.get("type") or payload.get("action") or "").lower()
     status = str(payload.get("status") or payload.get("result") or "").lower()
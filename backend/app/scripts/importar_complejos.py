@@ -0,0 +1,38 @@
+"""Importa complejos desde un CSV de `generar_inserts.py` (p. ej. LIMA_TODOS.csv).
+
+Uso: python -m app.scripts.importar_complejos salida_lima_departamento/LIMA_TODOS.csv [--aplicar]
+Sin `--aplicar` solo muestra el diff (inserciones, actualizaciones, descartes y distritos sin ubigeo).
+"""
+
+import argparse
+import json
+import logging
+
+from app.core import importacion_catalogo
+from app.db.conexion import SessionLocal
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv")
+    parser.add_argument("--aplicar", action="store_true", help="escribe en la base (por defecto solo simula)")
+    parser.add_argument("--inactivos", action="store_true", help="carga los complejos nuevos con is_active=false")
+    parser.add_argument("--provincia", default="Lima")
+    parser.add_argument("--departamento", default="Lima")
+    args = parser.parse_args()
+
+    with open(args.csv, encoding="utf-8-sig", errors="replace", newline="") as archivo, SessionLocal() as db:
+        resumen = importacion_catalogo.importar(
+            db,
+            archivo,
+            simular=not args.aplicar,
+            activos=not args.inactivos,
+            provincia=args.provincia,
+            departamento=args.departamento,
+        )
+    print(json.dumps(resumen, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
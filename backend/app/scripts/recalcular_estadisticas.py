@@ -0,0 +1,26 @@
+"""Reconstruye los rollups de estadisticas_diarias a partir de las reservas.
+
+Uso: python -m app.scripts.recalcular_estadisticas [--desde 2025-01-01] [--hasta 2025-12-31]
+"""
+
+import argparse
+import logging
+from datetime import date
+
+from app.core.estadisticas import recalcular_rango
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Recalcula estadisticas_diarias")
+    parser.add_argument("--desde", type=date.fromisoformat, default=None)
+    parser.add_argument("--hasta", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+    escritas = recalcular_rango(args.desde, args.hasta)
+    logger.info("estadisticas_diarias recalculadas: %s filas", escritas)
+
+
+if __name__ == "__main__":
+    main()
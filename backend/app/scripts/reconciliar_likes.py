@@ -0,0 +1,20 @@
+"""Recalcula complejos.likes_count a partir de complejo_likes.
+
+Uso: python -m app.scripts.reconciliar_likes
+"""
+
+import logging
+
+from app.core.likes import reconciliar
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    corregidas = reconciliar()
+    logger.info("likes_count reconciliado: %s complejos corregidos", corregidas)
+
+
+if __name__ == "__main__":
+    main()
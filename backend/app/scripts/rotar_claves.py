@@ -0,0 +1,21 @@
+"""Re-cifra con DATA_ENCRYPTION_KEY los secretos cifrados con DATA_ENCRYPTION_KEYS_ANTERIORES.
+
+Uso: python -m app.scripts.rotar_claves
+Cuando termina sin pendientes, la clave anterior se puede quitar de la configuración.
+"""
+
+import logging
+
+from app.core.secretos import reencriptar
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    cambiadas = reencriptar()
+    logger.info("Secretos re-cifrados: %s", cambiadas)
+
+
+if __name__ == "__main__":
+    main()
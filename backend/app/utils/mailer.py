@@ -1,9 +1,11 @@
 import logging
 import smtplib
+import time
 import logging
 from email.message import EmailMessage
 from typing import Optional
 
+from app.core import metricas
 from app.core.config import settings
 
 logger = logging.getLogger("app.utils.mailer")
@@ -26,9 +28,11 @@ def _is_configured() -> bool:
 def send_email(to_email: str, subject: str, text: str, html: str | None = None) -> None:
     from_email = _get_from_email()
     if settings.SMTP_DISABLED:
+        metricas.MAIL_ENVIOS.labels("deshabilitado").inc()
         logger.info("SMTP deshabilitado (se omitió el envío a %s)", to_email)
         return
     if not _is_configured() or not from_email:
+        metricas.MAIL_ENVIOS.labels("no_configurado").inc()
         logger.warning("SMTP no configurado (se omitió el envío a %s)", to_email)
         return
 
@@ -41,6 +45,7 @@ def send_email(to_email: str, subject: str, text: str, html: str | None = None)
         msg.add_alternative(html, subtype="html")
 
     server = None
+    inicio = time.perf_counter()
     try:
         server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=15)
         if settings.SMTP_USE_TLS:
@@ -48,10 +53,13 @@ def send_email(to_email: str, subject: str, text: str, html: str | None = None)
         if settings.SMTP_USER:
             server.login(settings.SMTP_USER, settings.SMTP_PASS)
         server.send_message(msg)
+        metricas.MAIL_ENVIOS.labels("ok").inc()
         logger.info("Correo enviado a %s", to_email)
     except Exception as exc:
+        metricas.MAIL_ENVIOS.labels("error").inc()
         logger.exception("Error al enviar correo a %s: %s", to_email, exc)
     finally:
+        metricas.MAIL_DURACION.observe(time.perf_counter() - inicio)
         if server:
             try:
                 server.quit()
@@ -5,6 +5,10 @@ from zoneinfo import ZoneInfo
 
 PERU_TZ = ZoneInfo("America/Lima")
 
+# horario de atención de las canchas (slots públicos y ocupación en estadísticas)
+HORA_APERTURA = 6
+HORA_CIERRE = 22
+
 
 def now_peru() -> datetime:
     return datetime.now(PERU_TZ)
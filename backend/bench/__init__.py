@@ -0,0 +1 @@
+# Benchmarks y pruebas de carga del backend (no se despliegan con la API).
@@ -0,0 +1,120 @@
+"""
+Prueba de carga del catálogo público y la disponibilidad.
+
+Lanza N clientes concurrentes (500 por defecto) contra `/canchas`, `/complejos`,
+`/public/complejos/{slug}` y `/public/canchas/{id}/horarios` durante un tiempo
+fijo y reporta RPS, latencias y errores. Para comparar el camino sync con el
+async, levanta dos instancias (p. ej. el commit anterior en :8001 y el actual
+en :8000) y pásalas juntas:
+
+    python -m bench.carga_publica --base-url http://127.0.0.1:8000 \\
+        --comparar-con http://127.0.0.1:8001 --clientes 500 --duracion 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+
+@dataclass
+class Resultado:
+    base_url: str
+    clientes: int
+    duracion_s: float
+    latencias_ms: list[float] = field(default_factory=list)
+    errores: int = 0
+
+    @property
+    def total(self) -> int:
+        return len(self.latencias_ms) + self.errores
+
+    def resumen(self) -> dict:
+        lat = sorted(self.latencias_ms)
+        return {
+            "base_url": self.base_url,
+            "clientes": self.clientes,
+            "peticiones": self.total,
+            "errores": self.errores,
+            "rps": round(len(lat) / self.duracion_s, 1) if self.duracion_s else 0.0,
+            "p50_ms": round(percentil(lat, 50), 2),
+            "p95_ms": round(percentil(lat, 95), 2),
+            "p99_ms": round(percentil(lat, 99), 2),
+            "media_ms": round(statistics.fmean(lat), 2) if lat else 0.0,
+        }
+
+
+def percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    k = (len(valores) - 1) * (p / 100)
+    f = int(k)
+    c = min(f + 1, len(valores) - 1)
+    return valores[f] + (valores[c] - valores[f]) * (k - f)
+
+
+async def _descubrir_rutas(client: httpx.AsyncClient, fecha: str) -> list[str]:
+    rutas = ["/canchas", "/complejos"]
+    resp = await client.get("/complejos")
+    resp.raise_for_status()
+    complejos = resp.json()
+    for c in complejos[:20]:
+        rutas.append(f"/public/complejos/{c['slug']}")
+        for cx in (c.get("canchas") or [])[:2]:
+            rutas.append(f"/public/canchas/{cx['id']}/horarios?fecha={fecha}")
+    return rutas
+
+
+async def _cliente(client: httpx.AsyncClient, rutas: list[str], fin: float, res: Resultado) -> None:
+    rnd = random.Random()
+    while time.perf_counter() < fin:
+        ruta = rnd.choice(rutas)
+        t0 = time.perf_counter()
+        try:
+            resp = await client.get(ruta)
+            ok = resp.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            res.latencias_ms.append((time.perf_counter() - t0) * 1000)
+        else:
+            res.errores += 1
+
+
+async def correr(base_url: str, clientes: int, duracion: float, fecha: str) -> Resultado:
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+    async with httpx.AsyncClient(base_url=base_url, limits=limites, timeout=60) as client:
+        rutas = await _descubrir_rutas(client, fecha)
+        res = Resultado(base_url=base_url, clientes=clientes, duracion_s=duracion)
+        fin = time.perf_counter() + duracion
+        await asyncio.gather(*(_cliente(client, rutas, fin, res) for _ in range(clientes)))
+    return res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--comparar-con", default=None, help="segunda instancia (p. ej. versión sync)")
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--duracion", type=float, default=30.0, help="segundos por instancia")
+    parser.add_argument("--fecha", default=time.strftime("%Y-%m-%d"))
+    args = parser.parse_args()
+
+    resumenes = [asyncio.run(correr(args.base_url, args.clientes, args.duracion, args.fecha)).resumen()]
+    if args.comparar_con:
+        resumenes.append(asyncio.run(correr(args.comparar_con, args.clientes, args.duracion, args.fecha)).resumen())
+        base, otro = resumenes
+        if otro["rps"]:
+            print(f"Throughput {args.base_url} vs {args.comparar_con}: x{base['rps'] / otro['rps']:.2f}")
+    print(json.dumps(resumenes, indent=2))
+
+
+if __name__ == "__main__":
+    main()
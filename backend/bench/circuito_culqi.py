@@ -0,0 +1,90 @@
+"""
+Circuit breaker de Culqi contra el stub con fallas inyectadas.
+
+Levanta `bench.culqi_stub` y llama a Culqi por el mismo camino que los
+endpoints (`_culqi_request_raw`) desde varios hilos, en tres fases: sano,
+apagón (todas las llamadas lentas o con 503) y recuperación. Por fase
+reporta respuestas OK, 5xx de Culqi, errores de red/timeout, rechazos
+rápidos del breaker (503 nuestro), latencias y estado final del circuito:
+
+    python -m bench.circuito_culqi --falla lentas --hilos 8 --llamadas 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PUERTO = 8911
+os.environ["CULQI_API_BASE"] = f"http://127.0.0.1:{PUERTO}"
+
+from fastapi import HTTPException  # noqa: E402
+
+from app.core import circuito  # noqa: E402
+from app.routers import pagos_culqi  # noqa: E402
+from bench import culqi_stub  # noqa: E402
+from bench.carga_publica import percentil  # noqa: E402
+
+
+def _llamar() -> tuple[str, float]:
+    t0 = time.perf_counter()
+    try:
+        status, _payload = pagos_culqi._culqi_request_raw("sk_test_bench", "GET", "/v2/charges/chr_bench_1")
+        resultado = "ok" if status < 500 else "culqi_5xx"
+    except HTTPException as exc:
+        resultado = "rechazo_breaker" if exc.status_code == 503 else "error_red"
+    return resultado, (time.perf_counter() - t0) * 1000
+
+
+def _fase(nombre: str, hilos: int, llamadas: int, ritmo_ms: float) -> dict:
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        futuros = []
+        for _ in range(llamadas):
+            futuros.append(pool.submit(_llamar))
+            time.sleep(ritmo_ms / 1000)
+        resultados = [f.result() for f in futuros]
+    tiempos = sorted(ms for _, ms in resultados)
+    return {
+        "fase": nombre,
+        **{k: sum(1 for r, _ in resultados if r == k) for k in ("ok", "culqi_5xx", "error_red", "rechazo_breaker")},
+        "p50_ms": round(percentil(tiempos, 50), 1),
+        "p95_ms": round(percentil(tiempos, 95), 1),
+        "estado_final": circuito.culqi.estado,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--falla", choices=("lentas", "errores"), default="lentas")
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--llamadas", type=int, default=40, help="llamadas por fase")
+    parser.add_argument("--ritmo-ms", type=float, default=25.0, help="pausa entre llamadas lanzadas")
+    parser.add_argument("--enfriamiento", type=float, default=2.0, help="segundos abierto (sobrescribe la config)")
+    args = parser.parse_args()
+
+    # cada timeout loguea su traceback; aquí solo interesa el resumen
+    logging.getLogger(pagos_culqi.__name__).setLevel(logging.CRITICAL)
+    circuito.culqi.enfriamiento_s = args.enfriamiento
+    server = culqi_stub.arrancar(PUERTO, latencia_ms=20)
+    modo = server.RequestHandlerClass.modo
+    try:
+        fases = [_fase("sano", args.hilos, args.llamadas, args.ritmo_ms)]
+        if args.falla == "lentas":
+            modo.update(lentas=1.0, lenta_ms=30_000)
+        else:
+            modo.update(errores=1.0)
+        fases.append(_fase("apagon", args.hilos, args.llamadas, args.ritmo_ms))
+        modo.update(lentas=0.0, errores=0.0)
+        time.sleep(args.enfriamiento)
+        fases.append(_fase("recuperacion", args.hilos, args.llamadas, args.ritmo_ms))
+    finally:
+        server.shutdown()
+    print(json.dumps(fases, indent=2))
+
+
+if __name__ == "__main__":
+    main()
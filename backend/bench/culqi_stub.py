@@ -0,0 +1,112 @@
+"""
+Stub mínimo de la API de Culqi para benchmarks.
+
+Responde `POST /v2/charges` con un cargo aprobado y cualquier `GET` con un
+objeto vacío, tras una latencia configurable. Se usa arrancando la API con
+`CULQI_API_BASE=http://127.0.0.1:8900`:
+
+    python -m bench.culqi_stub --puerto 8900 --latencia-ms 150
+
+Para probar el circuit breaker inyecta fallas: `--errores 0.5` responde 503 a
+esa fracción de llamadas y `--lentas 0.2 --lenta-ms 30000` demora esa otra
+fracción (más que cualquier timeout). El modo se cambia en caliente con
+`POST /_stub {"errores": 1.0}` (mismos nombres que los argumentos).
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_contador = itertools.count(1)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # compartido por todas las conexiones; se cambia con POST /_stub
+    modo = {"latencia_ms": 0.0, "errores": 0.0, "lentas": 0.0, "lenta_ms": 30_000.0}
+
+    def _responder(self, status: int, payload: dict) -> None:
+        cuerpo = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _falla_inyectada(self) -> bool:
+        """Aplica la latencia del modo; True si ya respondió un 503."""
+        modo = self.modo
+        lenta = random.random() < modo["lentas"]
+        time.sleep((modo["lenta_ms"] if lenta else modo["latencia_ms"]) / 1000)
+        if random.random() < modo["errores"]:
+            self._responder(503, {"object": "error", "merchant_message": "stub: falla inyectada"})
+            return True
+        return False
+
+    def do_POST(self):  # noqa: N802
+        largo = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(largo) or b"{}")
+        if self.path == "/_stub":
+            self.modo.update({k: float(v) for k, v in body.items() if k in self.modo})
+            self._responder(200, dict(self.modo))
+            return
+        if self._falla_inyectada():
+            return
+        if self.path.startswith("/v2/charges"):
+            self._responder(
+                201,
+                {
+                    "object": "charge",
+                    "id": f"chr_bench_{next(_contador)}",
+                    "amount": body.get("amount"),
+                    "currency_code": body.get("currency_code"),
+                    "outcome": {"type": "venta_exitosa"},
+                },
+            )
+            return
+        self._responder(201, {"object": "generic", "id": f"obj_bench_{next(_contador)}"})
+
+    def do_GET(self):  # noqa: N802
+        if self._falla_inyectada():
+            return
+        self._responder(200, {"object": "list", "data": []})
+
+    def log_message(self, format, *args):  # silencio: el ruido de logs distorsiona la medición
+        return
+
+
+def arrancar(
+    puerto: int, latencia_ms: float, *, errores: float = 0.0, lentas: float = 0.0, lenta_ms: float = 30_000.0
+) -> ThreadingHTTPServer:
+    """Arranca el stub en un hilo daemon y devuelve el servidor (para `shutdown()`)."""
+    modo = {"latencia_ms": latencia_ms, "errores": errores, "lentas": lentas, "lenta_ms": lenta_ms}
+    handler = type("Handler", (_Handler,), {"modo": modo})
+    server = ThreadingHTTPServer(("127.0.0.1", puerto), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=8900)
+    parser.add_argument("--latencia-ms", type=float, default=150.0)
+    parser.add_argument("--errores", type=float, default=0.0, help="fracción de llamadas que responden 503")
+    parser.add_argument("--lentas", type=float, default=0.0, help="fracción de llamadas que tardan --lenta-ms")
+    parser.add_argument("--lenta-ms", type=float, default=30_000.0)
+    args = parser.parse_args()
+    server = arrancar(args.puerto, args.latencia_ms, errores=args.errores, lentas=args.lentas, lenta_ms=args.lenta_ms)
+    print(f"Stub Culqi escuchando en http://127.0.0.1:{args.puerto}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
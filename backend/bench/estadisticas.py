@@ -0,0 +1,89 @@
+"""
+Benchmark de `/panel/estadisticas`: rollups diarios contra recorrer `reservas`.
+
+Sobre una base sembrada con un año de reservas densas, reconstruye los rollups
+(tiempo de backfill) y mide, para el propietario con más canchas, el resumen
+de 30, 90 y 365 días leyendo `estadisticas_diarias` y calculándolo directo
+desde las reservas del rango:
+
+    python -m bench.semilla --meses 12 --reservas-dia 12
+    python -m bench.estadisticas --repeticiones 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.core import estadisticas
+from app.db.conexion import SessionLocal
+from app.modelos.modelos import Cancha, Complejo, Reserva, User
+from bench.carga_publica import percentil
+
+
+def _medir(fn, repeticiones: int) -> list[float]:
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return sorted(tiempos)
+
+
+def _desde_reservas(db, canchas: dict[int, str], desde: date, hasta: date) -> int:
+    filas = db.execute(
+        select(*estadisticas.COLUMNAS_RESERVA).where(
+            Reserva.cancha_id.in_(list(canchas)),
+            Reserva.start_at >= datetime.combine(desde, datetime.min.time()),
+            Reserva.start_at < datetime.combine(hasta + timedelta(days=1), datetime.min.time()),
+        )
+    ).all()
+    return len(estadisticas.calcular(filas))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--sin-backfill", action="store_true", help="usa los rollups ya existentes")
+    args = parser.parse_args()
+
+    backfill_ms = None
+    if not args.sin_backfill:
+        t0 = time.perf_counter()
+        filas = estadisticas.recalcular_rango()
+        backfill_ms = round((time.perf_counter() - t0) * 1000, 1)
+        print(f"backfill: {filas} filas en {backfill_ms} ms")
+
+    with SessionLocal() as db:
+        owner_id = db.execute(
+            select(Complejo.owner_id)
+            .join(Cancha, Cancha.complejo_id == Complejo.id)
+            .where(Complejo.owner_id.isnot(None))
+            .group_by(Complejo.owner_id)
+            .order_by(func.count(Cancha.id).desc())
+            .limit(1)
+        ).scalar_one_or_none()
+        if owner_id is None:
+            raise SystemExit("No hay canchas sembradas: corre antes `python -m bench.semilla`.")
+        owner = db.get(User, owner_id)
+        canchas = estadisticas.canchas_del_propietario(db, owner)
+
+        hoy = date.today()
+        resumen = {"canchas": len(canchas), "backfill_ms": backfill_ms, "rangos": {}}
+        for dias in (30, 90, 365):
+            desde = hoy - timedelta(days=dias - 1)
+            rollup = _medir(lambda: estadisticas.consultar(db, canchas, desde, hoy), args.repeticiones)
+            directo = _medir(lambda: _desde_reservas(db, canchas, desde, hoy), args.repeticiones)
+            resumen["rangos"][f"{dias}d"] = {
+                "rollup": {f"p{p}_ms": round(percentil(rollup, p), 2) for p in (50, 95)},
+                "reservas": {f"p{p}_ms": round(percentil(directo, p), 2) for p in (50, 95)},
+            }
+    print(json.dumps(resumen, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Microbenchmark del índice geográfico (`app.core.geo.IndiceGeo`).
+
+Genera N complejos sintéticos repartidos por Perú (concentrados en ciudades,
+como el catálogo real), construye la rejilla y compara consultas "cerca de mí"
+contra el barrido completo que hacía el cliente:
+
+    python -m bench.geo_cerca --complejos 50000 --consultas 2000 --radio-km 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from app.core.geo import IndiceGeo, PuntoComplejo, distancia_km
+from bench.carga_publica import percentil
+
+CIUDADES = [
+    (-12.0464, -77.0428, 0.25),  # Lima
+    (-16.4090, -71.5375, 0.08),  # Arequipa
+    (-8.1116, -79.0288, 0.06),  # Trujillo
+    (-6.7714, -79.8409, 0.05),  # Chiclayo
+    (-13.5320, -71.9675, 0.05),  # Cusco
+    (-5.1945, -80.6328, 0.05),  # Piura
+    (-3.7437, -73.2516, 0.04),  # Iquitos
+]
+
+
+def generar(n: int, rnd: random.Random) -> list[PuntoComplejo]:
+    puntos = []
+    for i in range(n):
+        if rnd.random() < 0.8:
+            lat0, lng0, disp = rnd.choice(CIUDADES)
+            lat, lng = rnd.gauss(lat0, disp), rnd.gauss(lng0, disp)
+        else:
+            lat, lng = rnd.uniform(-18.3, -0.1), rnd.uniform(-81.3, -68.7)
+        puntos.append(PuntoComplejo(i + 1, lat, lng, f"Complejo {i}", f"complejo-{i}", None, None, None, None))
+    return puntos
+
+
+def _medir(fn, consultas) -> list[float]:
+    tiempos = []
+    for q in consultas:
+        t0 = time.perf_counter()
+        fn(*q)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return sorted(tiempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--complejos", type=int, default=50_000)
+    parser.add_argument("--consultas", type=int, default=2_000)
+    parser.add_argument("--radio-km", type=float, default=10.0)
+    parser.add_argument("--limite", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semilla)
+    puntos = generar(args.complejos, rnd)
+
+    t0 = time.perf_counter()
+    idx = IndiceGeo(puntos)
+    construccion_ms = (time.perf_counter() - t0) * 1000
+
+    consultas = []
+    for _ in range(args.consultas):
+        lat0, lng0, disp = rnd.choice(CIUDADES)
+        consultas.append((rnd.gauss(lat0, disp), rnd.gauss(lng0, disp), args.radio_km, args.limite))
+
+    def barrido(lat, lng, radio, limite):
+        cerca = [(d, p) for p in puntos if (d := distancia_km(lat, lng, p.lat, p.lng)) <= radio]
+        cerca.sort(key=lambda x: (x[0], x[1].id))
+        return cerca[:limite]
+
+    # mismo resultado que el barrido completo
+    for q in consultas[:50]:
+        assert [p.id for _, p in idx.cerca(*q)] == [p.id for _, p in barrido(*q)]
+
+    rejilla = _medir(idx.cerca, consultas)
+    completo = _medir(barrido, consultas[: max(1, args.consultas // 10)])
+    resumen = {
+        "complejos": args.complejos,
+        "radio_km": args.radio_km,
+        "construccion_ms": round(construccion_ms, 1),
+        "rejilla": {f"p{p}_ms": round(percentil(rejilla, p), 3) for p in (50, 95, 99)},
+        "barrido": {f"p{p}_ms": round(percentil(completo, p), 3) for p in (50, 95, 99)},
+    }
+    print(json.dumps(resumen, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Importación masiva del catálogo (`app.core.importacion_catalogo`) contra un Postgres local.
+
+Genera un CSV con el formato de `generar_inserts.py` (distritos de Lima,
+nombres repetidos en distintos puntos, ~5% de filas duplicadas a pocos metros
+y algunas filas inválidas) y mide tres pasadas: simulación, importación real
+(slugs por lote + COPY) y una segunda simulación que debe dar 0 inserciones.
+Los complejos importados llevan nombre "Bench ..." (slug `bench-...`) y se
+borran al terminar con `bench.semilla.limpiar`:
+
+    python -m bench.importacion --filas 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import random
+import tempfile
+import time
+
+from sqlalchemy import delete
+
+from app.core import importacion_catalogo
+from app.db.conexion import SessionLocal, engine
+from app.modelos.modelos import SlugContador
+from bench.semilla import PREFIJO_SLUG, limpiar
+
+DISTRITOS = [
+    ("Miraflores", -12.1211, -77.0297),
+    ("San Isidro", -12.0975, -77.0365),
+    ("Santiago de Surco", -12.1459, -76.9920),
+    ("La Molina", -12.0794, -76.9418),
+    ("San Juan de Lurigancho", -11.9826, -77.0056),
+    ("Comas", -11.9371, -77.0491),
+    ("Lurin", -12.2741, -76.8706),
+    ("Villa El Salvador", -12.2131, -76.9364),
+]
+TIPOS = ("Losa Deportiva", "Complejo Deportivo", "Estadio", "Cancha Sintética", "Club")
+
+
+def generar_csv(ruta: str, filas: int, semilla: int) -> None:
+    rnd = random.Random(semilla)
+    with open(ruta, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f)
+        w.writerow(["distrito", "nombre", "latitud", "longitud", "direccion"])
+        anterior = None
+        for i in range(filas):
+            if anterior and rnd.random() < 0.05:
+                # el mismo lugar visto como nodo y como área en OSM: mismo nombre, pocos metros
+                distrito, nombre, lat, lng, _ = anterior
+                w.writerow([distrito, nombre.upper(), lat + 0.0002, lng - 0.0002, "Calle duplicada 1"])
+                continue
+            if rnd.random() < 0.01:
+                w.writerow([rnd.choice(DISTRITOS)[0], "", "", "", ""])
+                continue
+            distrito, lat0, lng0 = rnd.choice(DISTRITOS)
+            # pocos nombres distintos: los repetidos solo se juntan si además están cerca
+            nombre = f"Bench {rnd.choice(TIPOS)} {i % 5_000}"
+            fila = [distrito, nombre, lat0 + rnd.uniform(-0.05, 0.05), lng0 + rnd.uniform(-0.05, 0.05), ""]
+            fila[4] = f"Av. Bench {i}" if rnd.random() < 0.3 else ""
+            w.writerow(fila)
+            anterior = fila
+
+
+def _pasada(ruta: str, simular: bool) -> dict:
+    with open(ruta, encoding="utf-8-sig", newline="") as archivo, SessionLocal() as db:
+        resumen = importacion_catalogo.importar(db, archivo, simular=simular)
+    return {k: v for k, v in resumen.items() if not k.startswith("muestra")}
+
+
+def _limpiar() -> None:
+    with engine.begin() as conn:
+        limpiar(conn)
+        conn.execute(delete(SlugContador).where(SlugContador.base.like(f"{PREFIJO_SLUG}%")))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=100_000)
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--no-limpiar", dest="limpiar", action="store_false", help="deja los complejos importados")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".csv") as tmp:
+        t0 = time.perf_counter()
+        generar_csv(tmp.name, args.filas, args.semilla)
+        generado_s = time.perf_counter() - t0
+        _limpiar()
+        try:
+            resultados = {
+                "csv_generado_s": round(generado_s, 2),
+                "simulacion": _pasada(tmp.name, simular=True),
+                "importacion": _pasada(tmp.name, simular=False),
+                "reimportacion_simulada": _pasada(tmp.name, simular=True),
+            }
+        finally:
+            if args.limpiar:
+                _limpiar()
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
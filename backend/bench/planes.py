@@ -0,0 +1,138 @@
+"""
+Snapshot de planes (`EXPLAIN`) de las consultas de reservas del panel.
+
+Llama en proceso a los endpoints del panel como el primer propietario sembrado,
+captura el SQL que emiten sobre `reservas` y pide su plan a Postgres. Falla
+(código de salida 1) si alguna consulta recorre `reservas` con `Seq Scan`:
+
+    python -m bench.semilla --reservas-dia 8 --meses 12
+    python -m bench.planes
+    python -m bench.planes --actualizar         # guarda un snapshot local
+
+El snapshot (`bench/planes_esperados.json`) es solo local y no se versiona:
+los planes dependen de lo sembrado y de la versión de Postgres. Sirve para
+comparar corridas sobre la misma base (antes y después de tocar una consulta
+o un índice); si existe, se muestran las diferencias contra él.
+
+Con pocas filas Postgres prefiere barrer la tabla aunque exista el índice:
+usa una base sembrada con volúmenes realistas (y el `ANALYZE` que hace el script).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import date, timedelta
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select, text
+from sqlalchemy.engine import Engine
+
+from app.core.seguridad import crear_token
+from app.db.conexion import SessionLocal, engine
+from app.main import app
+from app.modelos.modelos import Cancha, User
+from bench.semilla import email_propietario
+
+SNAPSHOT = Path(__file__).with_name("planes_esperados.json")
+TABLA = "reservas"
+
+
+def consultas(cancha_id: int) -> dict[str, tuple[str, dict]]:
+    hoy = date.today()
+    semana = {"fecha_inicio": (hoy - timedelta(days=7)).isoformat(), "fecha_fin": hoy.isoformat()}
+    return {
+        "reservas_semana": ("/panel/reservas", semana),
+        "reservas_cancha_dia": ("/panel/reservas", {"cancha_id": cancha_id, "fecha": hoy.isoformat()}),
+        "reservas_busqueda": ("/panel/reservas", {**semana, "search": "pagada"}),
+        "pagos_semana": ("/panel/pagos", semana),
+        "reservas_mes": ("/panel/reservas/mes", {"year": hoy.year, "month": hoy.month}),
+        "reservas_rango": ("/panel/reservas/rango", {"from": semana["fecha_inicio"], "to": semana["fecha_fin"]}),
+    }
+
+
+def _capturar(client: TestClient, ruta: str, params: dict, headers: dict) -> list[tuple[str, dict]]:
+    capturadas: list[tuple[str, dict]] = []
+
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and TABLA in statement:
+            capturadas.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", _antes)
+    try:
+        resp = client.get(ruta, params=params, headers=headers)
+    finally:
+        event.remove(Engine, "before_cursor_execute", _antes)
+    resp.raise_for_status()
+    return capturadas
+
+
+def _nodos(plan: dict):
+    yield plan
+    for hijo in plan.get("Plans", ()):
+        yield from _nodos(hijo)
+
+
+def resumir(plan: dict) -> list[str]:
+    """Nodos que leen `reservas`, p. ej. 'Bitmap Index Scan ix_reservas_rango' o 'Seq Scan'."""
+    out = []
+    for nodo in _nodos(plan):
+        if nodo.get("Relation Name") == TABLA or TABLA in str(nodo.get("Index Name", "")):
+            out.append(" ".join(x for x in (nodo["Node Type"], nodo.get("Index Name")) if x))
+    return out
+
+
+def explicar(conn, statement: str, parameters) -> dict:
+    fila = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar_one()
+    return (json.loads(fila) if isinstance(fila, str) else fila)[0]["Plan"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--propietario", type=int, default=0, help="índice del propietario sembrado")
+    parser.add_argument("--actualizar", action="store_true", help="reescribe el snapshot con los planes actuales")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("bench.planes necesita Postgres (DATABASE_URL).")
+
+    with SessionLocal() as db:
+        owner = db.execute(select(User).where(User.email == email_propietario(args.propietario))).scalar_one_or_none()
+        if owner is None:
+            raise SystemExit("No hay propietarios sembrados: corre antes `python -m bench.semilla`.")
+        cancha_id = db.execute(select(Cancha.id).where(Cancha.owner_id == owner.id).limit(1)).scalar_one()
+        headers = {"Authorization": f"Bearer {crear_token(owner.id, owner.role)}"}
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE reservas, canchas, complejos"))
+
+    client = TestClient(app)
+    actuales: dict[str, list[list[str]]] = {}
+    secuenciales: list[str] = []
+    for nombre, (ruta, params) in consultas(cancha_id).items():
+        sentencias = _capturar(client, ruta, params, headers)
+        with engine.connect() as conn:
+            actuales[nombre] = [resumir(explicar(conn, s, p)) for s, p in sentencias]
+        for i, nodos in enumerate(actuales[nombre]):
+            if "Seq Scan" in nodos:
+                secuenciales.append(f"{nombre}[{i}]")
+        print(f"{nombre:22} {ruta:24} {actuales[nombre]}")
+
+    if args.actualizar:
+        SNAPSHOT.write_text(json.dumps(actuales, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Snapshot escrito en {SNAPSHOT}")
+    elif SNAPSHOT.exists():
+        esperados = json.loads(SNAPSHOT.read_text(encoding="utf-8"))
+        for nombre, nodos in actuales.items():
+            if esperados.get(nombre) != nodos:
+                print(f"CAMBIO {nombre}: esperado {esperados.get(nombre)} -> actual {nodos}")
+    else:
+        print("Sin snapshot local: --actualizar lo guarda para comparar la próxima corrida.")
+
+    if secuenciales:
+        raise SystemExit(f"Seq Scan sobre {TABLA} en: {', '.join(secuenciales)}")
+
+
+if __name__ == "__main__":
+    main()
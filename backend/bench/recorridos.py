@@ -0,0 +1,215 @@
+"""
+Benchmark de los recorridos principales a concurrencia fija.
+
+Requiere una base sembrada con `bench.semilla` y la API apuntando al stub de
+Culqi (`CULQI_API_BASE=http://127.0.0.1:8900`, ver `bench.culqi_stub`).
+Cada recorrido corre `--duracion` segundos con `--concurrencia` clientes y se
+reporta RPS, p50/p95/p99 y consultas SQL por petición (cabecera
+`X-DB-Queries`). El resultado va a un JSON con el commit actual para comparar
+entre versiones:
+
+    python -m bench.recorridos --salida bench-$(git rev-parse --short HEAD).json
+    python -m bench.recorridos --comparar-con bench-abc1234.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable
+
+import httpx
+
+from bench.carga_publica import percentil
+from bench.semilla import BENCH_PASSWORD, email_propietario
+
+RECORRIDOS = ("catalogo", "perfil", "disponibilidad", "checkout", "panel_reservas", "exportes")
+
+
+@dataclass
+class Medicion:
+    recorrido: str
+    duracion_s: float
+    latencias_ms: list[float] = field(default_factory=list)
+    consultas: list[int] = field(default_factory=list)
+    errores: int = 0
+    conflictos: int = 0
+
+    def registrar(self, resp: httpx.Response | None, ms: float) -> None:
+        if resp is None or (resp.status_code >= 400 and resp.status_code != 409):
+            self.errores += 1
+            return
+        if resp.status_code == 409:
+            self.conflictos += 1
+        self.latencias_ms.append(ms)
+        q = resp.headers.get("x-db-queries")
+        if q is not None and q.isdigit():
+            self.consultas.append(int(q))
+
+    def resumen(self) -> dict:
+        lat = sorted(self.latencias_ms)
+        return {
+            "peticiones": len(lat) + self.errores,
+            "errores": self.errores,
+            "conflictos": self.conflictos,
+            "rps": round(len(lat) / self.duracion_s, 1) if self.duracion_s else 0.0,
+            "p50_ms": round(percentil(lat, 50), 2),
+            "p95_ms": round(percentil(lat, 95), 2),
+            "p99_ms": round(percentil(lat, 99), 2),
+            "consultas_db_media": round(statistics.fmean(self.consultas), 2) if self.consultas else None,
+            "consultas_db_max": max(self.consultas) if self.consultas else None,
+        }
+
+
+@dataclass
+class Contexto:
+    complejos: list[dict]
+    canchas: list[int]
+    tokens: list[str]
+    slots: itertools.count = field(default_factory=itertools.count)
+
+
+def commit_actual() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _preparar(client: httpx.AsyncClient, propietarios: int) -> Contexto:
+    resp = await client.get("/complejos")
+    resp.raise_for_status()
+    complejos = [c for c in resp.json() if str(c.get("slug", "")).startswith("bench-")]
+    if not complejos:
+        raise SystemExit("No hay complejos sembrados: corre antes `python -m bench.semilla`.")
+    canchas = [cx["id"] for c in complejos for cx in (c.get("canchas") or [])]
+    tokens = []
+    for i in range(propietarios):
+        r = await client.post("/auth/login", data={"username": email_propietario(i), "password": BENCH_PASSWORD})
+        if r.status_code == 200:
+            tokens.append(r.json()["access_token"])
+    if not tokens:
+        raise SystemExit("No se pudo iniciar sesión con ningún propietario sembrado.")
+    return Contexto(complejos=complejos, canchas=canchas, tokens=tokens)
+
+
+def _peticion(ctx: Contexto, recorrido: str, rnd: random.Random) -> Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]:
+    hoy = date.today()
+    if recorrido == "catalogo":
+        ruta = rnd.choice(["/complejos", "/canchas"])
+        return lambda c: c.get(ruta)
+    if recorrido == "perfil":
+        slug = rnd.choice(ctx.complejos)["slug"]
+        return lambda c: c.get(f"/public/complejos/{slug}")
+    if recorrido == "disponibilidad":
+        cancha = rnd.choice(ctx.canchas)
+        fecha = hoy - timedelta(days=rnd.randrange(0, 30))
+        return lambda c: c.get(f"/public/canchas/{cancha}/horarios", params={"fecha": fecha.isoformat()})
+    if recorrido == "checkout":
+        # cada cobro usa un slot distinto en el futuro para no chocar con reservas previas
+        n = next(ctx.slots)
+        cancha = ctx.canchas[n % len(ctx.canchas)]
+        vuelta = n // len(ctx.canchas)
+        dia = hoy + timedelta(days=30 + vuelta // 16)
+        start = datetime(dia.year, dia.month, dia.day, 6 + vuelta % 16)
+        body = {
+            "token_id": "tkn_test_bench_000",
+            "cancha_id": cancha,
+            "start_at": start.isoformat(),
+            "end_at": (start + timedelta(hours=1)).isoformat(),
+            "email": "checkout@example.com",
+        }
+        return lambda c: c.post("/payments/culqi/charge", json=body)
+
+    headers = {"Authorization": f"Bearer {rnd.choice(ctx.tokens)}"}
+    desde = hoy - timedelta(days=30)
+    params = {"fecha_inicio": desde.isoformat(), "fecha_fin": hoy.isoformat()}
+    if recorrido == "panel_reservas":
+        ruta = rnd.choice(["/panel/reservas", "/panel/pagos"])
+        return lambda c: c.get(ruta, params=params, headers=headers)
+    if recorrido == "exportes":
+        ruta = rnd.choice(
+            ["/panel/reservas/export.xlsx", "/panel/reservas/export.pdf", "/panel/pagos/export.xlsx", "/panel/pagos/export.pdf"]
+        )
+        return lambda c: c.get(ruta, params=params, headers=headers)
+    raise ValueError(f"Recorrido desconocido: {recorrido}")
+
+
+async def _cliente(client: httpx.AsyncClient, ctx: Contexto, recorrido: str, fin: float, med: Medicion) -> None:
+    rnd = random.Random()
+    while time.perf_counter() < fin:
+        hacer = _peticion(ctx, recorrido, rnd)
+        t0 = time.perf_counter()
+        try:
+            resp = await hacer(client)
+        except httpx.HTTPError:
+            resp = None
+        med.registrar(resp, (time.perf_counter() - t0) * 1000)
+
+
+async def correr(args: argparse.Namespace) -> dict:
+    limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limites, timeout=120) as client:
+        ctx = await _preparar(client, args.propietarios)
+        resultados = {}
+        for recorrido in args.recorridos:
+            med = Medicion(recorrido=recorrido, duracion_s=args.duracion)
+            fin = time.perf_counter() + args.duracion
+            await asyncio.gather(*(_cliente(client, ctx, recorrido, fin, med) for _ in range(args.concurrencia)))
+            resultados[recorrido] = med.resumen()
+            print(f"{recorrido:>16}: {resultados[recorrido]}")
+    return {
+        "commit": commit_actual(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "base_url": args.base_url,
+        "concurrencia": args.concurrencia,
+        "duracion_s": args.duracion,
+        "recorridos": resultados,
+    }
+
+
+def comparar(actual: dict, previo: dict) -> None:
+    print(f"\nComparación {str(previo.get('commit'))[:10]} -> {str(actual.get('commit'))[:10]}")
+    for nombre, r in actual["recorridos"].items():
+        p = previo.get("recorridos", {}).get(nombre)
+        if not p:
+            continue
+        deltas = []
+        for clave in ("rps", "p95_ms", "p99_ms", "consultas_db_media"):
+            a, b = r.get(clave), p.get(clave)
+            if a is None or not b:
+                continue
+            deltas.append(f"{clave} {b} -> {a} ({(a - b) / b * 100:+.1f}%)")
+        print(f"{nombre:>16}: " + ", ".join(deltas))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--duracion", type=float, default=20.0, help="segundos por recorrido")
+    parser.add_argument("--propietarios", type=int, default=20, help="propietarios sembrados con los que iniciar sesión")
+    parser.add_argument("--recorridos", nargs="+", choices=RECORRIDOS, default=list(RECORRIDOS))
+    parser.add_argument("--salida", default="bench-resultados.json")
+    parser.add_argument("--comparar-con", default=None, help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    resultado = asyncio.run(correr(args))
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"Resultados en {args.salida}")
+    if args.comparar_con:
+        with open(args.comparar_con, encoding="utf-8") as f:
+            comparar(resultado, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
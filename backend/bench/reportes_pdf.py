@@ -0,0 +1,92 @@
+"""
+Benchmark del motor de reportes PDF (`app.core.reportes_pdf`) con filas sintéticas.
+
+No necesita base: genera N reservas al vuelo (varias canchas, ~40 por día) y
+arma el mismo reporte que `/panel/reservas/export.pdf` (subtotales por día y
+resumen por cancha). Mide tiempo, pico de memoria de Python (tracemalloc),
+páginas y tamaño del PDF:
+
+    python -m bench.reportes_pdf --filas 1000 10000 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Iterator
+
+from app.core import reportes_pdf
+from app.routers.panel_propietario import COLUMNAS_PDF_RESERVAS, _cancha_pdf, _dia_pdf
+
+ESTADOS = ("pendiente", "parcial", "pagada", "cancelada")
+METODOS = ("culqi", "yape", "efectivo", None)
+
+
+def filas_sinteticas(n: int, canchas: int = 12) -> Iterator[SimpleNamespace]:
+    inicio = datetime(2025, 1, 1, 8)
+    for i in range(n):
+        dia, slot = divmod(i, 40)
+        start = inicio + timedelta(days=dia, minutes=20 * slot)
+        total = Decimal(60 + 10 * (i % 5))
+        yield SimpleNamespace(
+            cancha_id=i % canchas + 1,
+            cancha_nombre=f"Cancha {i % canchas + 1} · Complejo de prueba con nombre largo",
+            start_at=start,
+            end_at=start + timedelta(hours=1),
+            total_amount=total,
+            paid_amount=total if i % 3 == 0 else Decimal(0),
+            payment_method=METODOS[i % len(METODOS)],
+            payment_ref=f"chr_{i:012d}",
+            payment_status=ESTADOS[i % len(ESTADOS)],
+        )
+
+
+def _generar(n: int, destino) -> reportes_pdf.ReportePDF:
+    return reportes_pdf.generar(
+        destino,
+        "Reporte de Reservas",
+        COLUMNAS_PDF_RESERVAS,
+        filas_sinteticas(n),
+        agrupar_por=_dia_pdf,
+        resumir_por=_cancha_pdf,
+        titulo_resumen="Resumen por cancha",
+    )
+
+
+def medir(n: int) -> dict:
+    # tiempo y memoria en pasadas separadas: tracemalloc hace varias veces más lento el dibujo
+    with tempfile.TemporaryFile() as destino:
+        t0 = time.perf_counter()
+        reporte = _generar(n, destino)
+        segundos = time.perf_counter() - t0
+        tamano = destino.tell()
+    with tempfile.TemporaryFile() as destino:
+        tracemalloc.start()
+        _generar(n, destino)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "filas": n,
+        "segundos": round(segundos, 3),
+        "filas_por_segundo": round(n / segundos) if segundos else None,
+        "paginas": reporte.pagina,
+        "pdf_kb": round(tamano / 1024, 1),
+        "pico_memoria_mb": round(pico / 1024 / 1024, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    args = parser.parse_args()
+    print(json.dumps([medir(n) for n in args.filas], indent=2))
+
+
+if __name__ == "__main__":
+    main()
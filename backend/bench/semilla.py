@@ -0,0 +1,321 @@
+"""
+Carga un Postgres local con datos sintéticos para los benchmarks.
+
+Todo lo sembrado queda marcado (emails `@bench.local`, slugs `bench-...`) y se
+borra antes de cada siembra sin tocar datos reales (`--no-limpiar` lo evita).
+Los volúmenes se controlan por parámetros:
+
+    python -m bench.semilla --propietarios 50 --complejos 4 --canchas 3 \\
+        --imagenes 3 --meses 6 --reservas-dia 6 --usuarios 2000 --likes 10
+
+Cada propietario recibe suscripción PRO activa e integración Culqi (con una
+llave secreta ficticia cifrada), así el checkout se puede medir contra el
+stub de `bench.culqi_stub`. La contraseña de todos los usuarios sembrados es
+`BENCH_PASSWORD`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from app.core import reservas_busqueda
+from app.core.crypto import encrypt_secret
+from app.core.seguridad import hash_password
+from app.db.conexion import engine
+from app.db.init_db import init_db
+from app.modelos.modelos import (
+    Cancha,
+    CanchaImagen,
+    Complejo,
+    ComplejoImagen,
+    ComplejoLike,
+    EstadisticaDiaria,
+    PaymentIntegration,
+    Plan,
+    Reserva,
+    Suscripcion,
+    User,
+)
+
+DOMINIO = "bench.local"
+BENCH_PASSWORD = "bench-secret"
+PREFIJO_SLUG = "bench-"
+LOTE = 5_000
+
+DISTRITOS = [
+    ("Miraflores", "Lima", "Lima", -12.1211, -77.0297),
+    ("San Isidro", "Lima", "Lima", -12.0975, -77.0365),
+    ("Surco", "Lima", "Lima", -12.1459, -76.9920),
+    ("La Molina", "Lima", "Lima", -12.0794, -76.9418),
+    ("Cercado", "Arequipa", "Arequipa", -16.3989, -71.5350),
+    ("Trujillo", "Trujillo", "La Libertad", -8.1116, -79.0288),
+    ("Cusco", "Cusco", "Cusco", -13.5320, -71.9675),
+]
+TIPOS = ["Fútbol 5", "Fútbol 7", "Fútbol 11"]
+PASTOS = ["sintetico", "natural"]
+
+
+def email_propietario(i: int) -> str:
+    return f"owner{i}@{DOMINIO}"
+
+
+def email_usuario(i: int) -> str:
+    return f"user{i}@{DOMINIO}"
+
+
+def _insertar(conn, tabla, filas: list[dict], *, con_ids: bool = False) -> list[int]:
+    ids: list[int] = []
+    for i in range(0, len(filas), LOTE):
+        lote = filas[i : i + LOTE]
+        if con_ids:
+            stmt = insert(tabla).returning(tabla.c.id, sort_by_parameter_order=True)
+            ids.extend(conn.execute(stmt, lote).scalars().all())
+        else:
+            conn.execute(insert(tabla), lote)
+    return ids
+
+
+def limpiar(conn) -> None:
+    # borrado explícito hijo -> padre: no depende de que los ON DELETE CASCADE estén al día
+    complejos = select(Complejo.id).where(Complejo.slug.like(f"{PREFIJO_SLUG}%"))
+    canchas = select(Cancha.id).where(Cancha.complejo_id.in_(complejos))
+    usuarios = select(User.id).where(User.email.like(f"%@{DOMINIO}"))
+    conn.execute(delete(Reserva).where(Reserva.cancha_id.in_(canchas)))
+    conn.execute(delete(EstadisticaDiaria).where(EstadisticaDiaria.cancha_id.in_(canchas)))
+    conn.execute(delete(CanchaImagen).where(CanchaImagen.cancha_id.in_(canchas)))
+    conn.execute(delete(Cancha).where(Cancha.complejo_id.in_(complejos)))
+    conn.execute(delete(ComplejoLike).where(ComplejoLike.complejo_id.in_(complejos)))
+    conn.execute(delete(ComplejoLike).where(ComplejoLike.user_id.in_(usuarios)))
+    conn.execute(delete(ComplejoImagen).where(ComplejoImagen.complejo_id.in_(complejos)))
+    conn.execute(delete(Complejo).where(Complejo.slug.like(f"{PREFIJO_SLUG}%")))
+    conn.execute(delete(Suscripcion).where(Suscripcion.user_id.in_(usuarios)))
+    conn.execute(delete(PaymentIntegration).where(PaymentIntegration.user_id.in_(usuarios)))
+    conn.execute(delete(User).where(User.email.like(f"%@{DOMINIO}")))
+
+
+def sembrar(args: argparse.Namespace) -> dict:
+    rnd = random.Random(args.semilla)
+    hashed = hash_password(BENCH_PASSWORD)
+    sk_enc = encrypt_secret("sk_test_bench")
+    ahora = datetime.utcnow()
+    conteos: dict[str, int] = {}
+
+    with engine.begin() as conn:
+        if args.limpiar:
+            limpiar(conn)
+        plan_pro = conn.execute(select(Plan.id).where(Plan.codigo == "pro")).scalar_one()
+
+        owner_ids = _insertar(
+            conn,
+            User.__table__,
+            [
+                {
+                    "role": "propietario",
+                    "first_name": "Owner",
+                    "last_name": str(i),
+                    "email": email_propietario(i),
+                    "hashed_password": hashed,
+                    "phone": f"9{i:08d}",
+                    "is_active": True,
+                }
+                for i in range(args.propietarios)
+            ],
+            con_ids=True,
+        )
+        user_ids = _insertar(
+            conn,
+            User.__table__,
+            [
+                {
+                    "role": "usuario",
+                    "first_name": "User",
+                    "last_name": str(i),
+                    "email": email_usuario(i),
+                    "hashed_password": hashed,
+                    "is_active": True,
+                }
+                for i in range(args.usuarios)
+            ],
+            con_ids=True,
+        )
+        _insertar(
+            conn,
+            Suscripcion.__table__,
+            [
+                {
+                    "user_id": oid,
+                    "plan_id": plan_pro,
+                    "estado": "activa",
+                    "inicio": ahora - timedelta(days=10),
+                    "fin": ahora + timedelta(days=365),
+                    "proveedor": "bench",
+                    "renovaciones": 0,
+                    "dias_pagados": 30,
+                }
+                for oid in owner_ids
+            ],
+        )
+        _insertar(
+            conn,
+            PaymentIntegration.__table__,
+            [
+                {"user_id": oid, "provider": "culqi", "enabled": True, "culqi_pk": "pk_test_bench", "culqi_sk_enc": sk_enc}
+                for oid in owner_ids
+            ],
+        )
+
+        filas_complejos = []
+        duenos = []
+        for oid in owner_ids:
+            for _ in range(args.complejos):
+                n = len(filas_complejos)
+                distrito, provincia, departamento, lat, lng = rnd.choice(DISTRITOS)
+                filas_complejos.append(
+                    {
+                        "nombre": f"Complejo Bench {n}",
+                        "slug": f"{PREFIJO_SLUG}{n}",
+                        "descripcion": "Complejo generado para benchmarks",
+                        "direccion": f"Av. Bench {n}",
+                        "distrito": distrito,
+                        "provincia": provincia,
+                        "departamento": departamento,
+                        "latitud": round(lat + rnd.uniform(-0.05, 0.05), 6),
+                        "longitud": round(lng + rnd.uniform(-0.05, 0.05), 6),
+                        "techada": rnd.random() < 0.3,
+                        "iluminacion": True,
+                        "vestuarios": rnd.random() < 0.5,
+                        "estacionamiento": rnd.random() < 0.5,
+                        "cafeteria": rnd.random() < 0.2,
+                        "is_active": True,
+                        "owner_id": oid,
+                        "created_by": oid,
+                    }
+                )
+                duenos.append(oid)
+        complejo_ids = _insertar(conn, Complejo.__table__, filas_complejos, con_ids=True)
+
+        _insertar(
+            conn,
+            ComplejoImagen.__table__,
+            [
+                {"complejo_id": cid, "url": f"/uploads/bench/complejo-{cid}-{k}.jpg", "orden": k, "is_cover": k == 0}
+                for cid in complejo_ids
+                for k in range(args.imagenes)
+            ],
+        )
+
+        filas_canchas = []
+        for cid, oid in zip(complejo_ids, duenos):
+            for k in range(args.canchas):
+                filas_canchas.append(
+                    {
+                        "nombre": f"Cancha {k + 1}",
+                        "tipo": rnd.choice(TIPOS),
+                        "pasto": rnd.choice(PASTOS),
+                        "precio_hora": rnd.choice([60, 80, 100, 120, 150]),
+                        "rating": 0,
+                        "is_active": True,
+                        "owner_id": oid,
+                        "created_by": oid,
+                        "complejo_id": cid,
+                    }
+                )
+        cancha_ids = _insertar(conn, Cancha.__table__, filas_canchas, con_ids=True)
+
+        _insertar(
+            conn,
+            CanchaImagen.__table__,
+            [
+                {"cancha_id": cid, "url": f"/uploads/bench/cancha-{cid}-{k}.jpg", "orden": k}
+                for cid in cancha_ids
+                for k in range(args.imagenes)
+            ],
+        )
+
+        # Reservas: desde hace M meses hasta hoy, `reservas_dia` horas ocupadas por cancha y día
+        inicio = date.today() - timedelta(days=30 * args.meses)
+        dias = (date.today() - inicio).days
+        horas = list(range(6, 22))
+        reservas = 0
+        filas: list[dict] = []
+        for cid, fila in zip(cancha_ids, filas_canchas):
+            precio = fila["precio_hora"]
+            for d in range(dias):
+                dia = inicio + timedelta(days=d)
+                for h in rnd.sample(horas, min(args.reservas_dia, len(horas))):
+                    start = datetime(dia.year, dia.month, dia.day, h)
+                    pagada = rnd.random() < 0.6
+                    filas.append(
+                        {
+                            "cancha_id": cid,
+                            "cliente_id": rnd.choice(user_ids) if user_ids else None,
+                            "start_at": start,
+                            "end_at": start + timedelta(hours=1),
+                            "total_amount": precio,
+                            "paid_amount": precio if pagada else 0,
+                            "payment_method": "culqi" if pagada and rnd.random() < 0.5 else "efectivo",
+                            "payment_status": "pagada" if pagada else "pendiente",
+                            "payment_ref": f"chr_bench_{cid}_{d}_{h}" if pagada else None,
+                            "notas": "bench",
+                            "created_by": fila["owner_id"],
+                        }
+                    )
+                if len(filas) >= LOTE:
+                    _insertar(conn, Reserva.__table__, filas)
+                    reservas += len(filas)
+                    filas = []
+        if filas:
+            _insertar(conn, Reserva.__table__, filas)
+            reservas += len(filas)
+        # los INSERT masivos no pasan por la sesión: el texto de búsqueda se calcula aquí
+        reservas_busqueda.recalcular(conn, Reserva.cancha_id.in_(cancha_ids))
+
+        likes = [
+            {"complejo_id": cid, "user_id": uid}
+            for uid in user_ids
+            for cid in rnd.sample(complejo_ids, min(args.likes, len(complejo_ids)))
+        ]
+        _insertar(conn, ComplejoLike.__table__, likes)
+
+    conteos.update(
+        propietarios=len(owner_ids),
+        usuarios=len(user_ids),
+        complejos=len(complejo_ids),
+        canchas=len(cancha_ids),
+        imagenes=(len(complejo_ids) + len(cancha_ids)) * args.imagenes,
+        reservas=reservas,
+        likes=len(likes),
+    )
+    return conteos
+
+
+def parser_args() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--propietarios", type=int, default=50)
+    parser.add_argument("--complejos", type=int, default=4, help="complejos por propietario")
+    parser.add_argument("--canchas", type=int, default=3, help="canchas por complejo")
+    parser.add_argument("--imagenes", type=int, default=3, help="imágenes por complejo y por cancha")
+    parser.add_argument("--meses", type=int, default=6, help="meses de historial de reservas")
+    parser.add_argument("--reservas-dia", type=int, default=6, help="reservas por cancha y día")
+    parser.add_argument("--usuarios", type=int, default=2000)
+    parser.add_argument("--likes", type=int, default=10, help="likes por usuario")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--no-limpiar", dest="limpiar", action="store_false", help="no borrar lo sembrado antes")
+    return parser
+
+
+def main() -> None:
+    args = parser_args().parse_args()
+    init_db()
+    t0 = time.perf_counter()
+    conteos = sembrar(args)
+    print(f"Sembrado en {time.perf_counter() - t0:.1f}s: {conteos}")
+
+
+if __name__ == "__main__":
+    main()
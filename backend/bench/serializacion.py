@@ -0,0 +1,202 @@
+"""
+Benchmark de serialización de listados (`app.core.json_rapido`) sin base.
+
+Arma las mismas listas que devuelven `/canchas`, `/complejos` y
+`/panel/reservas` (dicts con `Decimal`, fechas y objetos anidados tipo ORM) y
+compara, por listado:
+
+- `response_model`: lo que hace FastAPI con un endpoint que devuelve la lista
+  (validar contra el modelo, pasar a tipos Python y `json.dumps` de la stdlib);
+- `type_adapter`: `json_rapido.lista`, validación y JSON en una sola pasada;
+- `orjson_directo`: `json_rapido.dumps` de los dicts sin validar (cota inferior,
+  solo sirve para datos que ya tienen la forma final).
+
+Reporta la mediana de `--repeticiones` corridas en ms y verifica que las dos
+primeras produzcan el mismo JSON:
+
+    python -m bench.serializacion --canchas 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core import json_rapido
+from app.esquemas.esquemas import CanchaOut, ComplejoPublicOut, ReservaOut
+
+DISTRITOS = ("Miraflores", "Surco", "San Borja", "La Molina", "Los Olivos")
+
+
+def _imagenes(cancha_id: int, n: int = 3) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(id=cancha_id * 10 + i, cancha_id=cancha_id, url=f"/uploads/canchas/{cancha_id}_{i}.webp", orden=i)
+        for i in range(n)
+    ]
+
+
+def cancha(i: int, complejo_id: int) -> dict:
+    # misma forma que arma listar_canchas_publicas (imagenes como objetos ORM)
+    return {
+        "id": i,
+        "nombre": f"Cancha {i}",
+        "distrito": DISTRITOS[i % len(DISTRITOS)],
+        "provincia": "Lima",
+        "departamento": "Lima",
+        "tipo": "Fútbol 7",
+        "pasto": "sintético",
+        "precio_hora": Decimal(60 + 5 * (i % 8)),
+        "rating": Decimal("4.35"),
+        "techada": i % 2 == 0,
+        "iluminacion": True,
+        "vestuarios": i % 3 == 0,
+        "estacionamiento": True,
+        "cafeteria": False,
+        "imagen_principal": f"/uploads/canchas/{i}_0.webp",
+        "is_active": True,
+        "propietario_phone": "+51999888777",
+        "latitud": Decimal("-12.1211") + Decimal(i % 100) / 1000,
+        "longitud": Decimal("-77.0297") - Decimal(i % 100) / 1000,
+        "complejo_id": complejo_id,
+        "complejo_nombre": f"Complejo {complejo_id}",
+        "complejo_foto_url": f"/uploads/complejos/{complejo_id}.webp",
+        "imagenes": _imagenes(i),
+        "culqi_enabled": i % 4 == 0,
+        "culqi_pk": "pk_test_bench" if i % 4 == 0 else None,
+    }
+
+
+def canchas(n: int) -> list[dict]:
+    return [cancha(i, i // 5 + 1) for i in range(1, n + 1)]
+
+
+def complejos(n_canchas: int, por_complejo: int = 5) -> list[dict]:
+    out = []
+    for cid in range(1, n_canchas // por_complejo + 1):
+        hijas = [
+            SimpleNamespace(**{**cancha(cid * por_complejo + k, cid), "owner_id": cid})
+            for k in range(por_complejo)
+        ]
+        out.append(
+            {
+                "id": cid,
+                "nombre": f"Complejo {cid}",
+                "slug": f"complejo-{cid}",
+                "descripcion": "Complejo deportivo de prueba",
+                "direccion": f"Av. Siempre Viva {cid}",
+                "distrito": DISTRITOS[cid % len(DISTRITOS)],
+                "provincia": "Lima",
+                "departamento": "Lima",
+                "latitud": Decimal("-12.1211"),
+                "longitud": Decimal("-77.0297"),
+                "techada": False,
+                "iluminacion": True,
+                "vestuarios": True,
+                "estacionamiento": True,
+                "cafeteria": False,
+                "foto_url": None,
+                "is_active": True,
+                "owner_phone": "+51999888777",
+                "culqi_enabled": False,
+                "culqi_pk": None,
+                "canchas": hijas,
+            }
+        )
+    return out
+
+
+def reservas(n: int) -> list[dict]:
+    inicio = datetime(2025, 1, 1, 8)
+    out = []
+    for i in range(1, n + 1):
+        start = inicio + timedelta(hours=i)
+        estado = ("pendiente", "parcial", "pagada")[i % 3]
+        out.append(
+            {
+                "id": i,
+                "cancha_id": i % 12 + 1,
+                "cliente_id": i % 50 or None,
+                "estado": estado,
+                "cancha_nombre": f"Cancha {i % 12 + 1}",
+                "fecha_inicio": start,
+                "fecha_fin": start + timedelta(hours=1),
+                "start_at": start,
+                "end_at": start + timedelta(hours=1),
+                "total_amount": 80.0,
+                "paid_amount": 40.0 if estado == "parcial" else 0.0,
+                "payment_method": "yape",
+                "payment_status": estado,
+                "payment_ref": None,
+                "notas": None,
+                "created_by": 1,
+            }
+        )
+    return out
+
+
+def via_response_model(tipo) -> Callable[[list], bytes]:
+    campo = create_model_field(name="Response", type_=tipo, mode="serialization")
+
+    def serializar(filas: list) -> bytes:
+        contenido = asyncio.run(serialize_response(field=campo, response_content=filas))
+        return JSONResponse(contenido).body
+
+    return serializar
+
+
+def medir(fn: Callable[[], bytes], repeticiones: int) -> tuple[float, bytes]:
+    tiempos, cuerpo = [], b""
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        cuerpo = fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos), cuerpo
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--canchas", type=int, default=5000)
+    parser.add_argument("--reservas", type=int, default=5000)
+    parser.add_argument("--repeticiones", type=int, default=7)
+    args = parser.parse_args()
+
+    casos = [
+        ("/canchas", list[CanchaOut], canchas(args.canchas)),
+        ("/complejos", list[ComplejoPublicOut], complejos(args.canchas)),
+        ("/panel/reservas", list[ReservaOut], reservas(args.reservas)),
+    ]
+    resultados = []
+    for nombre, tipo, filas in casos:
+        antes = via_response_model(tipo)
+        json_rapido.adaptador(tipo)  # lo compila la primera petición; fuera de la medición
+        ms_antes, cuerpo_antes = medir(lambda: antes(filas), args.repeticiones)
+        ms_ta, cuerpo_ta = medir(lambda: json_rapido.lista(tipo, filas).body, args.repeticiones)
+        ms_directo, _ = medir(lambda: json_rapido.dumps(filas), args.repeticiones) if nombre == "/panel/reservas" else (None, b"")
+        resultados.append(
+            {
+                "listado": nombre,
+                "filas": len(filas),
+                "kb": round(len(cuerpo_ta) / 1024),
+                "response_model_ms": round(ms_antes, 1),
+                "type_adapter_ms": round(ms_ta, 1),
+                "orjson_directo_ms": round(ms_directo, 1) if ms_directo is not None else None,
+                "aceleracion": round(ms_antes / ms_ta, 1),
+                "mismo_json": json.loads(cuerpo_antes) == json.loads(cuerpo_ta),
+            }
+        )
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+-- Contador desnormalizado de likes + unicidad (complejo, usuario)
+ALTER TABLE public.complejos
+  ADD COLUMN IF NOT EXISTS likes_count INTEGER NOT NULL DEFAULT 0;
+
+-- Quita likes duplicados (conserva el más antiguo) antes del índice único
+DELETE FROM public.complejo_likes a
+USING public.complejo_likes b
+WHERE a.complejo_id = b.complejo_id
+  AND a.user_id = b.user_id
+  AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_complejo_likes_complejo_user
+  ON public.complejo_likes (complejo_id, user_id);
+
+-- Backfill (la app además lo reconcilia periódicamente)
+UPDATE public.complejos c
+SET likes_count = coalesce(l.total, 0)
+FROM public.complejos c2
+LEFT JOIN (
+  SELECT complejo_id, count(*) AS total
+  FROM public.complejo_likes
+  GROUP BY complejo_id
+) l ON l.complejo_id = c2.id
+WHERE c.id = c2.id AND c.likes_count IS DISTINCT FROM coalesce(l.total, 0);
@@ -0,0 +1,20 @@
+-- Texto de búsqueda normalizado de reservas (cliente, estado, cancha) + índice de trigramas
+ALTER TABLE public.reservas
+  ADD COLUMN IF NOT EXISTS search_text TEXT;
+
+-- Backfill (la app lo mantiene al día en cada flush, ver app/core/reservas_busqueda.py)
+UPDATE public.reservas r
+SET search_text = lower(translate(
+  concat_ws(' ',
+    (SELECT concat_ws(' ', u.first_name, u.last_name, u.email) FROM public.users u WHERE u.id = r.cliente_id),
+    r.payment_status,
+    (SELECT c.nombre FROM public.canchas c WHERE c.id = r.cancha_id)
+  ),
+  'ÁÉÍÓÚÜÑáéíóúüñ', 'AEIOUUNaeiouun'
+))
+WHERE r.search_text IS NULL;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS ix_reservas_search_text_trgm
+  ON public.reservas USING gin (search_text gin_trgm_ops);
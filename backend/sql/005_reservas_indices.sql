@@ -0,0 +1,21 @@
+-- Índices para los filtros de reservas del panel
+
+-- Rango de fechas por cancha (calendario, /panel/reservas/mes, exportes)
+CREATE INDEX IF NOT EXISTS ix_reservas_cancha_start
+  ON public.reservas (cancha_id, start_at);
+
+-- /panel/pagos y sus exportes solo listan cobros Culqi
+CREATE INDEX IF NOT EXISTS ix_reservas_culqi_cancha_start
+  ON public.reservas (cancha_id, start_at)
+  WHERE payment_method = 'culqi';
+
+-- Solape de rangos: tsrange(start_at, end_at, '[]') && tsrange(:inicio, :fin, '[]')
+-- (la expresión debe coincidir con la de app/core/rangos.py)
+CREATE INDEX IF NOT EXISTS ix_reservas_rango
+  ON public.reservas USING gist (tsrange(start_at, end_at, '[]'));
+
+-- FKs usadas en los joins propietario -> complejo -> cancha -> reserva
+CREATE INDEX IF NOT EXISTS ix_reservas_cliente_id ON public.reservas (cliente_id);
+CREATE INDEX IF NOT EXISTS ix_canchas_complejo_id ON public.canchas (complejo_id);
+CREATE INDEX IF NOT EXISTS ix_canchas_owner_id ON public.canchas (owner_id);
+CREATE INDEX IF NOT EXISTS ix_complejos_owner_id ON public.complejos (owner_id);
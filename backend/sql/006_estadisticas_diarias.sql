@@ -0,0 +1,15 @@
+-- Rollup diario por cancha para /panel/estadisticas (ver app/core/estadisticas.py).
+-- La app lo mantiene en cada escritura de reservas; el backfill inicial lo hace
+-- init_db o `python -m app.scripts.recalcular_estadisticas`.
+CREATE TABLE IF NOT EXISTS public.estadisticas_diarias (
+  cancha_id BIGINT NOT NULL REFERENCES public.canchas (id) ON DELETE CASCADE,
+  fecha DATE NOT NULL,
+  reservas INTEGER NOT NULL DEFAULT 0,
+  canceladas INTEGER NOT NULL DEFAULT 0,
+  minutos INTEGER NOT NULL DEFAULT 0,
+  monto_total NUMERIC(12, 2) NOT NULL DEFAULT 0,
+  monto_pagado NUMERIC(12, 2) NOT NULL DEFAULT 0,
+  minutos_por_hora JSON NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (cancha_id, fecha)
+);
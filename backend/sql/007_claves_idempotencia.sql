@@ -0,0 +1,15 @@
+-- Claves de idempotencia de POST /payments/culqi/charge (ver app/core/idempotencia.py).
+-- Las vencidas las borra por lotes la tarea periódica `barrer_idempotencia`.
+CREATE TABLE IF NOT EXISTS public.claves_idempotencia (
+  clave VARCHAR(128) NOT NULL,
+  endpoint VARCHAR(64) NOT NULL,
+  huella VARCHAR(64) NOT NULL,
+  estado VARCHAR(20) NOT NULL DEFAULT 'en_curso',
+  status_code INTEGER,
+  respuesta JSON,
+  created_at TIMESTAMPTZ NOT NULL,
+  expira_at TIMESTAMPTZ NOT NULL,
+  PRIMARY KEY (clave, endpoint)
+);
+
+CREATE INDEX IF NOT EXISTS ix_claves_idempotencia_expira_at ON public.claves_idempotencia (expira_at);
@@ -0,0 +1,13 @@
+-- Bloqueos de horario durante el checkout con Culqi (ver app/core/bloqueos.py).
+-- Solo cuentan mientras expira_at > now(); la tarea `barrer_bloqueos` borra los vencidos.
+CREATE TABLE IF NOT EXISTS public.bloqueos_horario (
+  id BIGSERIAL PRIMARY KEY,
+  cancha_id BIGINT NOT NULL REFERENCES public.canchas (id) ON DELETE CASCADE,
+  start_at TIMESTAMP NOT NULL,
+  end_at TIMESTAMP NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL,
+  expira_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_bloqueos_horario_cancha_start ON public.bloqueos_horario (cancha_id, start_at);
+CREATE INDEX IF NOT EXISTS ix_bloqueos_horario_expira_at ON public.bloqueos_horario (expira_at);
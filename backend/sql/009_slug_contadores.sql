@@ -0,0 +1,11 @@
+-- Contador de sufijos por base de slug (ver app/core/slug.py): un slug nuevo
+-- se reserva con un solo INSERT ... ON CONFLICT DO UPDATE ... RETURNING.
+CREATE TABLE IF NOT EXISTS public.slug_contadores (
+  base VARCHAR(220) PRIMARY KEY,
+  ultimo INTEGER NOT NULL DEFAULT 0
+);
+
+-- los slugs existentes cuentan como bases tomadas (init_db también lo hace al arrancar)
+INSERT INTO public.slug_contadores (base, ultimo)
+SELECT slug, 0 FROM public.complejos
+ON CONFLICT (base) DO NOTHING;
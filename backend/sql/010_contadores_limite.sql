@@ -0,0 +1,13 @@
+-- Contadores de los límites de tasa de auth/OTP cuando LIMITES_BACKEND=postgres
+-- (ver app/core/limites.py): una fila por clave y ventana fija, se suma con
+-- INSERT ... ON CONFLICT DO UPDATE ... RETURNING y la tarea barrer_limites
+-- borra las vencidas.
+CREATE TABLE IF NOT EXISTS public.contadores_limite (
+  clave VARCHAR(80) NOT NULL,
+  ventana BIGINT NOT NULL,
+  cuenta INTEGER NOT NULL DEFAULT 0,
+  expira_at TIMESTAMPTZ NOT NULL,
+  PRIMARY KEY (clave, ventana)
+);
+
+CREATE INDEX IF NOT EXISTS ix_contadores_limite_expira_at ON public.contadores_limite (expira_at);
@@ -0,0 +1,87 @@
+"""
+Corre `generar_inserts.py --offline` contra las respuestas guardadas de esta
+carpeta (Miraflores y Barranco) y verifica el resultado, sin red:
+
+- `iter_elements` lee los mismos elementos que `json.load`, también con
+  bloques chicos que parten los elementos entre lecturas;
+- `parse_elements` descarta repetidos, sin nombre y sin coordenadas;
+- el consolidado LIMA_TODOS.csv sale completo y un distrito sin respuesta
+  en el cache termina con error y código 1.
+
+    python fixtures/overpass/verificar.py
+
+Los archivos se nombran por el hash de `build_query(distrito)`: si cambia la
+consulta hay que regenerarlos (sale "sin respuesta en cache").
+"""
+
+import csv
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+CARPETA = Path(__file__).resolve().parent
+sys.path.insert(0, str(CARPETA.parents[1]))
+
+import generar_inserts as gi  # noqa: E402
+
+ESPERADO = [
+    ["Barranco", "Club Barranco", "-12.149", "-77.021", "Malecón"],
+    ["Barranco", "Polideportivo Municipal", "-12.1445", "-77.0195", ""],
+    ["Miraflores", 'Cancha Sintética "El Golazo"', "-12.1188", "-77.0412", "Jr. Tarapacá"],
+    ["Miraflores", "Complejo Ñandú", "-12.1302", "-77.0255", "Calle Los Pinos 345, Miraflores"],
+    ["Miraflores", "estadio Manuel Bonilla", "-12.1235", "-77.033", ""],
+    ["Miraflores", "Losa Deportiva Reducto", "-12.1215", "-77.0301", "Av. Reducto 1200"],
+]
+
+
+def _correr(*args: str) -> int:
+    argv, sys.argv = sys.argv, ["generar_inserts.py", *args]
+    try:
+        gi.main()
+        return 0
+    except SystemExit as e:
+        return e.code or 0
+    finally:
+        sys.argv = argv
+
+
+def verificar_iter_elements() -> None:
+    bloque = gi.BLOQUE
+    try:
+        for ruta in sorted(CARPETA.glob("*.json")):
+            if ruta.name.endswith(".meta.json"):
+                continue
+            esperado = json.loads(ruta.read_text(encoding="utf-8"))["elements"]
+            for tamano in (7, 64, bloque):
+                gi.BLOQUE = tamano
+                assert list(gi.iter_elements(ruta)) == esperado, (ruta.name, tamano)
+    finally:
+        gi.BLOQUE = bloque
+
+
+def verificar_offline() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        codigo = _correr("--offline", "--cache", str(CARPETA), "--salida", tmp, "--distritos", "Miraflores", "Barranco")
+        assert codigo == 0, codigo
+        with open(Path(tmp) / "LIMA_TODOS.csv", encoding="utf-8-sig", newline="") as f:
+            filas = list(csv.reader(f))
+        assert filas[0] == ["distrito", "nombre", "latitud", "longitud", "direccion"], filas[0]
+        assert filas[1:] == ESPERADO, filas[1:]
+        assert (Path(tmp) / "Miraflores.csv").exists()
+
+        # sin respuesta guardada: no sale a la red, falla ese distrito y el resto se escribe igual
+        codigo = _correr("--offline", "--cache", str(CARPETA), "--salida", tmp, "--distritos", "Barranco", "Surquillo")
+        assert codigo == 1, codigo
+        with open(Path(tmp) / "LIMA_TODOS.csv", encoding="utf-8-sig", newline="") as f:
+            assert len(list(csv.reader(f))) == 3
+
+
+def main() -> None:
+    verificar_iter_elements()
+    verificar_offline()
+    print("OK: fixtures de Overpass verificados")
+
+
+if __name__ == "__main__":
+    main()
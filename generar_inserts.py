@@ -1,11 +1,48 @@
+"""
+Extrae canchas/centros deportivos de fútbol de OpenStreetMap (Overpass) por
+distrito de Lima y escribe un CSV por distrito más el consolidado
+LIMA_TODOS.csv (lo carga `python -m app.scripts.importar_complejos`).
+
+- Consultas en paralelo (`--concurrencia`, por defecto 2: Overpass da pocos
+  slots por IP) bajo un token bucket (`--por-minuto`), con reintentos y
+  backoff ante 429/5xx y errores de red.
+- Cache en disco por hash de la consulta (`--cache`): una respuesta más nueva
+  que `--max-edad-horas` no se vuelve a pedir; una vieja se pide con
+  If-Modified-Since y, si Overpass falla, se usa la vieja. Cada respuesta se
+  escribe a un temporal y se renombra al terminar, así una corrida cortada no
+  deja el cache a medias y la siguiente retoma donde quedó (los distritos ya
+  bajados salen del cache).
+- Las respuestas van de la red al disco sin pasar por memoria y los elementos
+  se leen de a uno (`iter_elements`), sin cargar el JSON entero.
+- `--offline` solo usa el cache (p. ej. fixtures guardados): nunca sale a la red.
+
+    python generar_inserts.py --concurrencia 2 --por-minuto 20
+    python generar_inserts.py --offline --cache fixtures/overpass --distritos Miraflores Barranco
+
+`fixtures/overpass` guarda respuestas sintéticas con el formato de Overpass (Miraflores y
+Barranco); `python fixtures/overpass/verificar.py` corre el modo offline
+contra ellas y revisa `iter_elements`, `parse_elements` y el consolidado.
+"""
+
+import argparse
 import csv
+import email.utils
+import hashlib
 import json
+import os
+import random
+import sys
+import threading
 import time
+import urllib.error
 import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+USER_AGENT = "MiFuturo/1.0 (contact: tu-email@example.com)"
+BLOQUE = 64 * 1024
 
 DISTRITOS = [
     "Lima",
@@ -95,15 +132,180 @@ area(area.lima_dep)["boundary"="administrative"]["admin_level"="8"]["name"="{dis
 out center tags;
 """
 
-def fetch_overpass(query: str) -> dict:
+class TokenBucket:
+    """Ritmo de peticiones compartido entre hilos: ráfaga de `capacidad`, recarga de `por_segundo`."""
+
+    def __init__(self, por_segundo: float, capacidad: int = 1):
+        self.por_segundo = por_segundo
+        self.capacidad = capacidad
+        self.tokens = float(capacidad)
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def tomar(self):
+        while True:
+            with self.lock:
+                ahora = time.monotonic()
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.por_segundo)
+                self.ultimo = ahora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                espera = (1 - self.tokens) / self.por_segundo
+            time.sleep(espera)
+
+class RespuestaIncompleta(Exception):
+    """Overpass respondió 200 pero cortó la consulta (timeout/memoria del servidor)."""
+
+class OverpassCache:
+    """Respuestas crudas por hash de la consulta: <hash>.json + <hash>.meta.json (la meta se escribe al final)."""
+
+    def __init__(self, carpeta: Path):
+        self.carpeta = carpeta
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def clave(query: str) -> str:
+        return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+    def ruta(self, clave: str) -> Path:
+        return self.carpeta / f"{clave}.json"
+
+    def _ruta_meta(self, clave: str) -> Path:
+        return self.carpeta / f"{clave}.meta.json"
+
+    def leer_meta(self, clave: str):
+        try:
+            meta = json.loads(self._ruta_meta(clave).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return meta if self.ruta(clave).exists() else None
+
+    def guardar_meta(self, clave: str, meta: dict):
+        tmp = self._ruta_meta(clave).with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self._ruta_meta(clave))
+
+    def guardar(self, clave: str, origen, meta: dict):
+        """Copia la respuesta al disco por bloques; solo reemplaza el cache si llegó completa."""
+        tmp = self.ruta(clave).with_suffix(".part")
+        try:
+            with tmp.open("wb") as f:
+                while True:
+                    bloque = origen.read(BLOQUE)
+                    if not bloque:
+                        break
+                    f.write(bloque)
+            # los errores de ejecución de Overpass llegan como "remark" al final del JSON
+            with tmp.open("rb") as f:
+                f.seek(max(0, tmp.stat().st_size - 4096))
+                cola = f.read().decode("utf-8", "ignore")
+            if '"remark"' in cola and "error" in cola:
+                raise RespuestaIncompleta(cola[cola.find('"remark"'):].strip()[:300])
+            os.replace(tmp, self.ruta(clave))
+        finally:
+            tmp.unlink(missing_ok=True)
+        self.guardar_meta(clave, meta)
+
+def _espera_reintento(intento: int, error) -> float:
+    retry_after = getattr(error, "headers", None) and error.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return min(120.0, 5.0 * 2 ** intento) + random.uniform(0, 1)
+
+def fetch_overpass(
+    query: str,
+    cache: OverpassCache,
+    bucket: TokenBucket,
+    *,
+    max_edad_s: float,
+    offline: bool = False,
+    reintentos: int = 4,
+    timeout: float = 240,
+):
+    """Ruta de la respuesta en el cache (bajándola si hace falta) y de dónde salió."""
+    clave = cache.clave(query)
+    meta = cache.leer_meta(clave)
+    if meta and (offline or time.time() - meta["descargado_en"] < max_edad_s):
+        return cache.ruta(clave), "cache"
+    if offline:
+        raise FileNotFoundError(f"sin respuesta en cache para la consulta {clave[:12]} (--offline)")
+
+    headers = {"User-Agent": USER_AGENT}
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
     data = urllib.parse.urlencode({"data": query}).encode("utf-8")
-    req = urllib.request.Request(
-        OVERPASS_URL,
-        data=data,
-        headers={"User-Agent": "MiFuturo/1.0 (contact: tu-email@example.com)"},
-    )
-    with urllib.request.urlopen(req, timeout=240) as resp:
-        return json.loads(resp.read())
+    error = None
+    for intento in range(reintentos + 1):
+        bucket.tomar()
+        try:
+            req = urllib.request.Request(OVERPASS_URL, data=data, headers=headers)
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                cache.guardar(clave, resp, {
+                    "descargado_en": time.time(),
+                    "last_modified": resp.headers.get("Last-Modified") or email.utils.formatdate(usegmt=True),
+                })
+            return cache.ruta(clave), "red"
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and meta:
+                cache.guardar_meta(clave, {**meta, "descargado_en": time.time()})
+                return cache.ruta(clave), "sin_cambios"
+            error = e
+            if e.code not in (429, 500, 502, 503, 504):
+                break
+        except (urllib.error.URLError, OSError, RespuestaIncompleta) as e:
+            error = e
+        if intento < reintentos:
+            time.sleep(_espera_reintento(intento, error))
+
+    if meta:
+        print(f"  ! Overpass falló ({error}); se usa la respuesta guardada", file=sys.stderr)
+        return cache.ruta(clave), "cache_vencido"
+    raise error
+
+def iter_elements(path: Path):
+    """Elementos del arreglo "elements" de una respuesta de Overpass, de a uno (sin cargar el JSON entero)."""
+    decoder = json.JSONDecoder()
+    marca = '"elements"'
+    with path.open(encoding="utf-8") as f:
+        buf = ""
+        while True:
+            i = buf.find(marca)
+            j = buf.find("[", i) if i >= 0 else -1
+            if j >= 0:
+                break
+            # conservar lo justo para no partir la marca entre dos bloques
+            buf = buf[i:] if i >= 0 else buf[-len(marca):]
+            bloque = f.read(BLOQUE)
+            if not bloque:
+                return
+            buf += bloque
+        buf, pos = buf[j + 1:], 0
+
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buf):
+                bloque = f.read(BLOQUE)
+                if not bloque:
+                    return
+                buf, pos = bloque, 0
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                el, fin = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # elemento partido entre bloques: leer más y reintentar
+                bloque = f.read(BLOQUE)
+                if not bloque:
+                    raise
+                buf, pos = buf[pos:] + bloque, 0
+                continue
+            yield el
+            pos = fin
+            if pos > BLOQUE:
+                buf, pos = buf[pos:], 0
 
 def get_lat_lon(el: dict):
     lat = el.get("lat") or (el.get("center") or {}).get("lat")
@@ -124,11 +326,14 @@ def build_direccion(tags: dict) -> str:
         return street
     return ""
 
-def parse_elements(osm_json: dict):
+def parse_elements(elements):
+    """Acepta el iterador de `iter_elements` (o, como antes, el JSON ya cargado)."""
+    if isinstance(elements, dict):
+        elements = elements.get("elements", [])
     results = []
     seen = set()
 
-    for el in osm_json.get("elements", []):
+    for el in elements:
         key = (el.get("type"), el.get("id"))
         if key in seen:
             continue
@@ -161,34 +366,54 @@ def write_csv(path: Path, rows):
         w.writeheader()
         w.writerows(rows)
 
+def harvest_distrito(distrito: str, out_dir: Path, cache: OverpassCache, bucket: TokenBucket, args):
+    path, origen = fetch_overpass(
+        build_query(distrito),
+        cache,
+        bucket,
+        max_edad_s=args.max_edad_horas * 3600,
+        offline=args.offline,
+        reintentos=args.reintentos,
+        timeout=args.timeout,
+    )
+    rows = parse_elements(iter_elements(path))
+    write_csv(out_dir / f"{safe_filename(distrito)}.csv", rows)
+    return rows, origen
+
 def main():
-    out_dir = Path("salida_lima_departamento")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--salida", default="salida_lima_departamento")
+    parser.add_argument("--cache", help="carpeta del cache (default: <salida>/.cache_overpass)")
+    parser.add_argument("--concurrencia", type=int, default=2)
+    parser.add_argument("--por-minuto", type=float, default=30, help="peticiones a Overpass por minuto")
+    parser.add_argument("--rafaga", type=int, default=2)
+    parser.add_argument("--max-edad-horas", type=float, default=24 * 7, help="respuestas más nuevas no se vuelven a pedir")
+    parser.add_argument("--reintentos", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=240)
+    parser.add_argument("--offline", action="store_true", help="solo cache, sin red")
+    parser.add_argument("--distritos", nargs="*", help="subconjunto de DISTRITOS")
+    args = parser.parse_args()
+
+    out_dir = Path(args.salida)
     out_dir.mkdir(exist_ok=True)
+    cache = OverpassCache(Path(args.cache) if args.cache else out_dir / ".cache_overpass")
+    bucket = TokenBucket(args.por_minuto / 60, args.rafaga)
+    distritos = args.distritos or DISTRITOS
 
     all_rows = []
-
-    for distrito in DISTRITOS:
-        print(f"\n=== {distrito} (Lima, Perú) ===")
-        q = build_query(distrito)
-
-        try:
-            j = fetch_overpass(q)
-        except Exception as e:
-            print(f"ERROR consultando {distrito}: {e}")
-            continue
-
-        rows = parse_elements(j)
-        print("Total encontrados:", len(rows))
-
-        csv_name = f"{safe_filename(distrito)}.csv"
-        write_csv(out_dir / csv_name, rows)
-        print("OK ->", csv_name)
-
-        for r in rows:
-            all_rows.append({"distrito": distrito, **r})
-
-        # para no saturar Overpass
-        time.sleep(2)
+    fallidos = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrencia)) as pool:
+        futuros = {pool.submit(harvest_distrito, d, out_dir, cache, bucket, args): d for d in distritos}
+        for futuro in as_completed(futuros):
+            distrito = futuros[futuro]
+            try:
+                rows, origen = futuro.result()
+            except Exception as e:
+                fallidos[distrito] = e
+                print(f"ERROR {distrito}: {e}")
+                continue
+            print(f"{distrito}: {len(rows)} encontrados ({origen})")
+            all_rows.extend({"distrito": distrito, **r} for r in rows)
 
     # Consolidado
     all_rows.sort(key=lambda x: (x["distrito"].lower(), x["nombre"].lower()))
@@ -199,6 +424,10 @@ def main():
 
     print("\n✅ Listo. Archivos en:", out_dir.resolve())
     print("✅ Consolidado:", (out_dir / "LIMA_TODOS.csv").resolve())
+    if fallidos:
+        # lo bajado quedó en cache: volver a correr retoma solo estos
+        print(f"⚠️  {len(fallidos)} distrito(s) fallaron: {', '.join(fallidos)}. Vuelve a correr para reintentarlos.")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()